@@ -0,0 +1,39 @@
+"""
+Benchmark: memory and per-request cost of the deactivated-user set
+
+Fills a DeactivatedUsers set with random user IDs and reports the memory it
+holds (set table plus the ID strings) and the cost of the membership check
+get_current_user does on every request.
+
+No database needed. Run from the repository root:
+    python -m benchmarks.bench_account_status [deactivated_users]
+
+The default is 10M, i.e. every user of a 10M-user deployment deactivated;
+memory scales linearly, so divide by the real deactivated fraction.
+"""
+import sys
+import time
+import uuid
+
+from utils.account_status import DeactivatedUsers
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+    store = DeactivatedUsers()
+
+    for _ in range(count):
+        store.handle_notification(f"{uuid.uuid4()}:false")
+    memory = sys.getsizeof(store._ids) + sum(sys.getsizeof(user_id) for user_id in store._ids)
+    print(f"{count} deactivated users: {memory / 2 ** 20:.0f} MiB ({memory / count:.0f} bytes per user)")
+
+    probes = [str(uuid.uuid4()) for _ in range(100_000)]
+    start = time.perf_counter()
+    for user_id in probes:
+        user_id in store
+    latency = (time.perf_counter() - start) / len(probes)
+    print(f"membership check: {latency * 1e9:.0f} ns")
+
+
+if __name__ == "__main__":
+    main()
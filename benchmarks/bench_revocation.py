@@ -0,0 +1,43 @@
+"""
+Benchmark: per-request cost of the token revocation pre-check
+
+Measures RevocationStore.might_be_revoked() for tokens that were never
+revoked (the common case in get_current_user) with an empty filter and with
+the filter at its configured capacity, and reports the false positive rate,
+i.e. how often the check falls through to a revoked_tokens query.
+
+No database needed. Run from the repository root:
+    python -m benchmarks.bench_revocation [revoked]
+"""
+import sys
+import time
+import uuid
+
+from config import REVOCATION_BLOOM_CAPACITY
+from utils.revocation import RevocationStore
+
+
+def measure(store: RevocationStore, probes: list) -> float:
+    start = time.perf_counter()
+    for token_id in probes:
+        store.might_be_revoked(token_id)
+    return (time.perf_counter() - start) / len(probes)
+
+
+def main():
+    revoked = int(sys.argv[1]) if len(sys.argv) > 1 else REVOCATION_BLOOM_CAPACITY
+    probes = [str(uuid.uuid4()) for _ in range(100_000)]
+
+    empty = RevocationStore(REVOCATION_BLOOM_CAPACITY)
+    print(f"  empty: {measure(empty, probes) * 1e9:.0f} ns per check")
+
+    full = RevocationStore(REVOCATION_BLOOM_CAPACITY)
+    for _ in range(revoked):
+        full._add(str(uuid.uuid4()))
+    latency = measure(full, probes)
+    false_positives = sum(full.might_be_revoked(token_id) for token_id in probes) / len(probes)
+    print(f"{revoked:>7}: {latency * 1e9:.0f} ns per check, {false_positives:.2%} false positives")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark: serializing a 100-row admin user page
+
+Compares the previous path (profile.__dict__ -> model_validate -> model_dump -> model_validate,
+then FastAPI response_model validation + jsonable_encoder + json) with the direct
+row -> model_construct -> orjson path used by the users/admin routers.
+
+Run from the repository root:
+    python -m benchmarks.bench_serialization
+"""
+import json
+import timeit
+import uuid
+from datetime import datetime, timezone
+
+from fastapi.encoders import jsonable_encoder
+
+from models import Profile
+from routers.admin.schemas import UserListItem, UserListResponse
+from routers.users.schemas import UserProfileResponse
+from utils.serialization import FastJSONResponse, profile_to_dict
+
+ROWS = 100
+ITERATIONS = 200
+
+
+def make_profiles(count: int) -> list:
+    now = datetime.now(timezone.utc)
+    return [
+        Profile(
+            id=uuid.uuid4(),
+            email=f"user{i}@example.com",
+            first_name="First",
+            last_name="Last",
+            avatar_url=f"https://cdn.example.com/profile-images/{i}.png",
+            phone="+15555550100",
+            bio="Lorem ipsum dolor sit amet " * 10,
+            is_active=True,
+            created_at=now,
+            updated_at=now,
+        )
+        for i in range(count)
+    ]
+
+
+def previous_path(profiles: list) -> bytes:
+    users = [
+        UserProfileResponse.model_validate({**profile.__dict__, "user_id": str(profile.id), "role": "user"})
+        for profile in profiles
+    ]
+    items = [UserListItem.model_validate(user.model_dump()) for user in users]
+    page = UserListResponse(users=items, page=1, limit=ROWS, total=ROWS, total_pages=1)
+    # FastAPI validates the returned value against response_model before encoding it
+    validated = UserListResponse.model_validate(page.model_dump())
+    return json.dumps(jsonable_encoder(validated)).encode()
+
+
+def fast_path(profiles: list) -> bytes:
+    users = [UserProfileResponse.model_construct(**profile_to_dict(profile)) for profile in profiles]
+    items = [UserListItem.model_construct(**user.__dict__) for user in users]
+    page = UserListResponse.model_construct(users=items, page=1, limit=ROWS, total=ROWS, total_pages=1)
+    return FastJSONResponse(page).body
+
+
+def main():
+    profiles = make_profiles(ROWS)
+    assert json.loads(previous_path(profiles))["users"][0]["id"] == json.loads(fast_path(profiles))["users"][0]["id"]
+
+    for name, fn in (("previous", previous_path), ("fast", fast_path)):
+        best = min(timeit.repeat(lambda: fn(profiles), number=ITERATIONS, repeat=5))
+        print(f"{name:>8}: {best / ITERATIONS * 1e3:.3f} ms per {ROWS}-row page")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Benchmark: worker cold start (import + lifespan startup)
+
+Each sample runs in a fresh interpreter, like a new worker under autoscaling,
+and measures importing main, entering the app lifespan, and the first use of
+the Supabase admin client (which is now built lazily).
+
+Run from the repository root:
+    python -m benchmarks.bench_startup [samples]
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+SAMPLE = r"""
+import asyncio, json, time
+t0 = time.perf_counter()
+import main
+t1 = time.perf_counter()
+
+async def startup():
+    async with main.app.router.lifespan_context(main.app):
+        pass
+
+asyncio.run(startup())
+t2 = time.perf_counter()
+
+import config
+config.get_supabase_admin()
+t3 = time.perf_counter()
+print(json.dumps({"import": t1 - t0, "lifespan": t2 - t1, "first_client": t3 - t2}))
+"""
+
+
+def main():
+    samples = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    env = {
+        "SUPABASE_URL": "http://localhost",
+        "SUPABASE_ANON_KEY": "benchmark",
+        "SUPABASE_KEY": "benchmark",
+        **os.environ,
+    }
+
+    timings = {"import": [], "lifespan": [], "first_client": []}
+    for _ in range(samples):
+        output = subprocess.run(
+            [sys.executable, "-c", SAMPLE], env=env, check=True, capture_output=True, text=True
+        ).stdout
+        for key, value in json.loads(output.strip().splitlines()[-1]).items():
+            timings[key].append(value)
+
+    for key, values in timings.items():
+        print(f"{key:>12}: median {statistics.median(values) * 1e3:.1f} ms, max {max(values) * 1e3:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Benchmark: per-query latency with and without asyncpg statement caching
+
+Runs the /users/me profile lookup repeatedly on one connection using the
+"pooled" connect args (no prepared statement reuse, as required behind a
+transaction-mode pgbouncer) and the "direct" ones (statement cache enabled).
+
+Requires DATABASE_URL pointing at a database with the profiles table.
+Run from the repository root:
+    python -m benchmarks.bench_statement_cache [queries]
+"""
+import asyncio
+import sys
+import time
+import uuid
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from config import DATABASE_URL, asyncpg_database_url, asyncpg_connect_args
+from models import Profile
+
+
+async def measure(mode: str, queries: int) -> float:
+    engine = create_async_engine(
+        asyncpg_database_url(DATABASE_URL),
+        pool_size=1,
+        connect_args=asyncpg_connect_args(mode)
+    )
+    stmt = select(Profile).where(Profile.id == uuid.uuid4())
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(stmt)  # connect + first prepare outside the timing
+            start = time.perf_counter()
+            for _ in range(queries):
+                await conn.execute(stmt)
+            return (time.perf_counter() - start) / queries
+    finally:
+        await engine.dispose()
+
+
+async def main():
+    if not DATABASE_URL:
+        raise SystemExit("DATABASE_URL is required")
+    queries = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    for mode in ("pooled", "direct"):
+        latency = await measure(mode, queries)
+        print(f"{mode:>7}: {latency * 1e6:.0f} us per query ({queries} queries)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,11 +1,16 @@
 import os
+import threading
+import uuid
+from typing import TYPE_CHECKING, Optional
 from dotenv import load_dotenv
-from supabase import create_client, Client
-import psycopg2
-from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, AsyncEngine
+from utils.instrumentation import instrument_engine, instrument_http_clients
+from utils.lifecycle import track_pool_health
+
+if TYPE_CHECKING:
+    from supabase import Client
 
 load_dotenv()
 
@@ -19,59 +24,240 @@ SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_KEY")  # Service role key
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY")
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")  # Default to HS256 if not set
 
-# Regular client for normal operations
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
+APP_ENV = os.getenv("APP_ENV", "production")
+DEV_MODE = APP_ENV == "development"
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))  # Identical statements per request before warning
+
+ADMIN_API_CONCURRENCY = int(os.getenv("ADMIN_API_CONCURRENCY", "10"))  # Parallel Supabase admin calls for bulk operations
+IMPORT_AUTH_CONCURRENCY = int(os.getenv("IMPORT_AUTH_CONCURRENCY", "25"))  # Parallel Supabase user creations during a bulk import
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))  # CSV rows created and COPY'd per batch
+IMPORT_MAX_ROWS = int(os.getenv("IMPORT_MAX_ROWS", "100000"))  # Rows accepted per import request
+
+# "pooled": behind a transaction-mode pooler (pgbouncer/Supavisor) where server-side
+# prepared statements can't be reused across transactions. "direct": straight to
+# Postgres, so asyncpg can cache prepared statements per connection.
+DB_CONNECTION_MODE = os.getenv("DB_CONNECTION_MODE", "pooled")
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))  # Direct mode only
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # Seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # Seconds before a connection is replaced (-1 disables)
+DEFAULT_REQUEST_DEADLINE = float(os.getenv("DEFAULT_REQUEST_DEADLINE", "30"))  # Seconds per request unless the route sets its own
+# statement_timeout every connection starts with, in seconds; transactions whose deadline
+# it already matches skip the per-transaction SET LOCAL. Sent as a startup parameter in
+# direct mode. Poolers don't forward it, so in pooled mode set it on the database role
+# (ALTER ROLE ... SET statement_timeout) and mirror it here; 0 means unknown, always SET LOCAL.
+# Transactions outside a request deadline reset it to 0 (no timeout).
+DB_STATEMENT_TIMEOUT = float(os.getenv(
+    "DB_STATEMENT_TIMEOUT", str(DEFAULT_REQUEST_DEADLINE) if DB_CONNECTION_MODE == "direct" else "0"
+))
+# Per-route overrides, e.g. "GET /admin/users=10,GET /users/me=3"
+ROUTE_DEADLINES = {
+    route.strip(): float(seconds)
+    for route, seconds in (
+        entry.rsplit("=", 1) for entry in os.getenv("ROUTE_DEADLINES", "").split(",") if "=" in entry
+    )
+}
+POOL_WARMUP_CONNECTIONS = int(os.getenv("POOL_WARMUP_CONNECTIONS", "5"))  # Connections opened at startup
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"  # Detect stale connections after a failover
+SHUTDOWN_DRAIN_TIMEOUT = float(os.getenv("SHUTDOWN_DRAIN_TIMEOUT", "20"))  # Seconds to wait for in-flight requests
+REVOCATION_SYNC_INTERVAL = float(os.getenv("REVOCATION_SYNC_INTERVAL", "2"))  # Seconds between revocation list syncs
+REVOCATION_REBUILD_INTERVAL = float(os.getenv("REVOCATION_REBUILD_INTERVAL", "600"))  # Seconds between full filter rebuilds
+REVOCATION_BLOOM_CAPACITY = int(os.getenv("REVOCATION_BLOOM_CAPACITY", "100000"))  # Live revocations before the filter grows
+ROLE_OVERLAY_TTL = float(os.getenv("ROLE_OVERLAY_TTL", "3600"))  # Seconds a role change overrides JWT claims; >= JWT expiry
+AUTH_CACHE_WARMUP_TIMEOUT = float(os.getenv("AUTH_CACHE_WARMUP_TIMEOUT", "10"))  # Seconds startup waits for role/status caches
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))  # Verified tokens kept per worker
+CHANGE_FEED_SETTLE_SECONDS = float(os.getenv("CHANGE_FEED_SETTLE_SECONDS", "5"))  # Newest changes held back so in-flight transactions commit first
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))  # Events claimed and delivered per batch
+OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "1"))  # Seconds between polls once the outbox is empty
+OUTBOX_WEBHOOK_URL = os.getenv("OUTBOX_WEBHOOK_URL")  # Optional: POST each batch of events here
+OUTBOX_WEBHOOK_SECRET = os.getenv("OUTBOX_WEBHOOK_SECRET")  # Optional: HMAC-SHA256 key for the X-Outbox-Signature header
+OUTBOX_WEBHOOK_TIMEOUT = float(os.getenv("OUTBOX_WEBHOOK_TIMEOUT", "10"))  # Seconds per webhook delivery
+OUTBOX_LEASE_SECONDS = float(os.getenv("OUTBOX_LEASE_SECONDS", "60"))  # Claimed events are redelivered by another worker after this; keep above the sink timeouts
+OUTBOX_FILE_PATH = os.getenv("OUTBOX_FILE_PATH")  # Optional: append events as NDJSON to this file
+ANALYTICS_ROLLUP_INTERVAL = float(os.getenv("ANALYTICS_ROLLUP_INTERVAL", "300"))  # Seconds between role count roll-ups (one worker runs each)
+ANALYTICS_CACHE_TTL = float(os.getenv("ANALYTICS_CACHE_TTL", "30"))  # Seconds a worker reuses a computed analytics response
+REPORTS_DIR = os.getenv("REPORTS_DIR", "reports")  # Where report files are written; shared by every worker on the host
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "2"))  # Reports generated at once per worker process
+REPORT_QUEUE_SIZE = int(os.getenv("REPORT_QUEUE_SIZE", "20"))  # Queued reports per worker before submissions get 503
+REPORT_MAX_ACTIVE_PER_ADMIN = int(os.getenv("REPORT_MAX_ACTIVE_PER_ADMIN", "2"))  # Queued or running reports per admin
+REPORT_CHUNK_SIZE = int(os.getenv("REPORT_CHUNK_SIZE", "5000"))  # Rows held in memory while writing a report
+REPORT_RETENTION_HOURS = float(os.getenv("REPORT_RETENTION_HOURS", "24"))  # Finished reports are deleted after this
+REPORT_HEARTBEAT_INTERVAL = float(os.getenv("REPORT_HEARTBEAT_INTERVAL", "30"))  # Seconds between heartbeats of the jobs a worker holds
+REPORT_STALE_AFTER = float(os.getenv("REPORT_STALE_AFTER", "120"))  # Seconds without a heartbeat before an active job is failed
+AUDIT_BUFFER_SIZE = int(os.getenv("AUDIT_BUFFER_SIZE", "10000"))  # Audit events held per worker; the oldest are dropped beyond this
+AUDIT_FLUSH_SIZE = int(os.getenv("AUDIT_FLUSH_SIZE", "500"))  # Buffered events that trigger a flush, and rows per insert
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "2"))  # Max seconds an audit event waits in the buffer
+AUDIT_SHUTDOWN_TIMEOUT = float(os.getenv("AUDIT_SHUTDOWN_TIMEOUT", "5"))  # Seconds shutdown spends flushing buffered audit events
+IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", "86400"))  # Seconds a response is replayed for a repeated Idempotency-Key
+IDEMPOTENCY_STORE = os.getenv("IDEMPOTENCY_STORE", "memory")  # "memory" (per-worker LRU) or "kv" (serialized, redis-style key/value)
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))  # Keys held by the in-process stores
+IDEMPOTENCY_POLL_INTERVAL = float(os.getenv("IDEMPOTENCY_POLL_INTERVAL", "0.1"))  # Seconds between checks while a duplicate waits on the kv store
 
-# Admin client for password resets (uses service role key)
-supabase_admin: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
+# Count upstream Supabase HTTP calls per request (see utils/instrumentation.py)
+instrument_http_clients()
 
 # Direct database connection
 DATABASE_URL = os.getenv("DATABASE_URL")  # PostgreSQL connection string
-if DATABASE_URL:
-    # Sync engine for Alembic migrations
-    sync_engine = create_engine(DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://"))
-    
-    # Async engine for FastAPI app
-    asyncpg_url = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://")
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")  # Optional read replica for read-only endpoints
+DATABASE_LISTEN_URL = os.getenv("DATABASE_LISTEN_URL", DATABASE_URL)  # Session-level connection for LISTEN (not a transaction-mode pooler)
+REPLICA_READ_YOUR_WRITES_SECONDS = float(os.getenv("REPLICA_READ_YOUR_WRITES_SECONDS", "5"))  # Primary-only window after a user writes
+
+# Clients and engines are built on first use rather than at import time, so
+# importing config (tests, Alembic, worker boot) stays cheap and a missing env
+# var only fails the code path that needs it. main.py disposes them on shutdown.
+_lock = threading.Lock()
+_supabase: Optional["Client"] = None
+_supabase_admin: Optional["Client"] = None
+_async_engine: Optional[AsyncEngine] = None
+_replica_engine: Optional[AsyncEngine] = None
+_session_factory: Optional[sessionmaker] = None
+_sync_engine = None
+
+
+def _create_supabase_client(key: Optional[str]) -> "Client":
+    if not SUPABASE_URL or not key:
+        raise Exception("Supabase not configured")
+    # Imported here: the supabase package (auth, storage, realtime, ...) is slow to import
+    from supabase import create_client
+    return create_client(SUPABASE_URL, key)
+
+
+def asyncpg_database_url(database_url: str) -> str:
+    """Convert DATABASE_URL to an asyncpg URL (connection options come from asyncpg_connect_args)"""
+    asyncpg_url = database_url.replace("postgresql://", "postgresql+asyncpg://")
     
     if "?" in asyncpg_url:
-        base_url = asyncpg_url.split("?")[0]
-    else:
-        base_url = asyncpg_url
-    
-    asyncpg_url = f"{base_url}?prepared_statement_cache_size=0"
+        return asyncpg_url.split("?")[0]
+    return asyncpg_url
+
+
+def asyncpg_connect_args(mode: str, statement_cache_size: int = DB_STATEMENT_CACHE_SIZE) -> dict:
+    """
+    asyncpg connection arguments for the given connection mode
     
-    async_engine = create_async_engine(
-        asyncpg_url,
+    Args:
+        mode: "direct" or "pooled"
+        statement_cache_size: Prepared statements cached per connection in direct mode
+    """
+    if mode == "direct":
+        connect_args = {"prepared_statement_cache_size": statement_cache_size}
+        if DB_STATEMENT_TIMEOUT > 0:
+            connect_args["server_settings"] = {"statement_timeout": str(int(DB_STATEMENT_TIMEOUT * 1000))}
+        return connect_args
+    if mode != "pooled":
+        raise ValueError(f"Unknown DB_CONNECTION_MODE: {mode}")
+    # No statement reuse, and unique names so statements never collide on a shared server connection
+    return {
+        "prepared_statement_cache_size": 0,
+        "statement_cache_size": 0,
+        "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+    }
+
+
+def get_supabase() -> "Client":
+    """Regular client for normal operations"""
+    global _supabase
+    if _supabase is None:
+        with _lock:
+            if _supabase is None:
+                _supabase = _create_supabase_client(SUPABASE_ANON_KEY)
+    return _supabase
+
+
+def get_supabase_admin() -> "Client":
+    """Admin client for privileged operations (uses service role key)"""
+    global _supabase_admin
+    if _supabase_admin is None:
+        with _lock:
+            if _supabase_admin is None:
+                _supabase_admin = _create_supabase_client(SUPABASE_SERVICE_KEY)
+    return _supabase_admin
+
+
+def _create_async_engine(database_url: str) -> AsyncEngine:
+    engine = create_async_engine(
+        asyncpg_database_url(database_url),
         echo=False,
-        pool_pre_ping=False, 
-        pool_size=10,  # Increased for better performance
-        max_overflow=5  # Allow some overflow
+        pool_pre_ping=DB_POOL_PRE_PING,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        connect_args=asyncpg_connect_args(DB_CONNECTION_MODE)
     )
+    instrument_engine(engine)
+    return engine
+
+
+def get_async_engine() -> AsyncEngine:
+    """Async engine for FastAPI app (primary database)"""
+    global _async_engine
+    if _async_engine is None:
+        with _lock:
+            if _async_engine is None:
+                if not DATABASE_URL:
+                    raise Exception("Database not configured")
+                engine = _create_async_engine(DATABASE_URL)
+                track_pool_health(engine)
+                _async_engine = engine
+    return _async_engine
 
-    AsyncSessionLocal = sessionmaker(
-        bind=async_engine,
-        class_=AsyncSession,
-        expire_on_commit=False
-    )
-else:
-    sync_engine = None
-    async_engine = None
-    AsyncSessionLocal = None
 
-async def get_db():
-    if AsyncSessionLocal is None:
-        raise Exception("Database not configured")
-    async with AsyncSessionLocal() as session:
-        yield session
+def get_replica_engine() -> AsyncEngine:
+    """Async engine for the read replica, or the primary when no replica is configured"""
+    global _replica_engine
+    if not DATABASE_REPLICA_URL:
+        return get_async_engine()
+    if _replica_engine is None:
+        with _lock:
+            if _replica_engine is None:
+                _replica_engine = _create_async_engine(DATABASE_REPLICA_URL)
+    return _replica_engine
+
+
+def use_primary(session: AsyncSession) -> None:
+    """Send the rest of this session's statements to the primary (e.g. before read-then-create)"""
+    session.info["primary"] = True
+
+
+def get_session_factory() -> sessionmaker:
+    """Session factory whose sessions route between primary and replica"""
+    global _session_factory
+    if _session_factory is None:
+        with _lock:
+            if _session_factory is None:
+                from utils.sessions import RoutingSession
+                _session_factory = sessionmaker(
+                    class_=AsyncSession,
+                    sync_session_class=RoutingSession,
+                    expire_on_commit=False
+                )
+    return _session_factory
+
 
 async def init_db():
-    if async_engine is None:
-        raise Exception("Database not configured")
-    async with async_engine.begin() as conn:
+    async with get_async_engine().begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
 
 def get_sync_engine():
-    if sync_engine is None:
-        raise Exception("Database not configured")
-    return sync_engine
+    """Sync engine, only needed for migrations and scripts"""
+    global _sync_engine
+    if _sync_engine is None:
+        if not DATABASE_URL:
+            raise Exception("Database not configured")
+        from sqlalchemy import create_engine
+        _sync_engine = create_engine(DATABASE_URL.replace("postgresql+asyncpg://", "postgresql://"))
+    return _sync_engine
+
+
+async def dispose_engines() -> None:
+    """Close pooled connections; called from the application lifespan on shutdown"""
+    global _async_engine, _replica_engine, _session_factory, _sync_engine
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    if _replica_engine is not None:
+        await _replica_engine.dispose()
+    if _sync_engine is not None:
+        _sync_engine.dispose()
+    _async_engine = _replica_engine = _session_factory = _sync_engine = None
@@ -1,69 +1,137 @@
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from config import JWT_SECRET_KEY
+from config import JWT_SECRET_KEY, TOKEN_CACHE_SIZE
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
-from sqlalchemy import select
-from config import get_db
+from utils.sessions import get_db
+from dependencies.principal import Principal
+from utils.revocation import revocation_store
+from utils.role_overlay import role_overlay
+from utils.account_status import deactivated_users
 import jwt
-import os
+import time
 import logging
-from typing import Dict, Any, List, Callable
+from typing import Dict, Optional
 
 logger = logging.getLogger(__name__)
 security = HTTPBearer()
 
-async def get_current_user(
-    request: Request,
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: AsyncSession = Depends(get_db)
-):
-    """Get current user from JWT token"""
+# Verified tokens -> Principal, so repeat requests with the same token skip
+# signature verification and claim parsing. Entries are only reused until the
+# token's exp; revocation, deactivation and role overlay are checked every time.
+_token_cache: Dict[str, Principal] = {}
+
+
+def _decode_token(token: str) -> Principal:
+    """Verify a JWT and build its principal (raises jwt errors / HTTPException)"""
+    # Get JWT secret from Supabase anon key
+    jwt_secret = JWT_SECRET_KEY
+    
+    # Decode the JWT token
+    payload = jwt.decode(
+        token, 
+        jwt_secret, 
+        algorithms=["HS256"],
+        options={"verify_signature": True, "verify_exp": True, "verify_aud": False}
+    )
+    
+    principal = Principal.from_payload(payload)
+    logger.info(f"Decoded user: {principal.user_id}, email: {principal.email}, role: {principal.role}")
+    
+    if not principal.user_id:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token: missing user ID",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    if principal.exp is not None:
+        if len(_token_cache) >= TOKEN_CACHE_SIZE:
+            # Oldest insertion first; cheaper than LRU bookkeeping on every hit
+            del _token_cache[next(iter(_token_cache))]
+        _token_cache[token] = principal
+    return principal
+
+
+def peek_principal(token: str) -> Optional[Principal]:
+    """
+    Resolve a token without any I/O, for work done before dependencies run
+
+    Returns None for invalid or expired tokens and whenever the exact checks
+    in authenticate_token could still reject it (possible revocation,
+    deactivated account), so callers fall back to the normal path.
+
+    Args:
+        token: Raw JWT
+
+    Returns:
+        Optional[Principal]: Caller, or None if not certain without the database
+    """
     try:
-        token = credentials.credentials
-        logger.info(f"Received token: {token[:20]}...")  # Log first 20 chars for debugging
+        principal = _token_cache.get(token)
+        if principal is None or principal.exp <= time.time():
+            principal = _decode_token(token)
+    except Exception:
+        return None
+
+    if principal.token_id and revocation_store.might_be_revoked(principal.token_id):
+        return None
+    if principal.user_id in deactivated_users:
+        return None
+    return principal
+
+
+async def authenticate_token(token: str, db: AsyncSession) -> Principal:
+    """
+    Verify a bearer token and resolve its principal
+    
+    Shared by get_current_user and the profile events WebSocket, which can't
+    use the HTTPBearer dependency.
+    
+    Args:
+        token: Raw JWT
+        db: Session for the (rare) revoked_tokens lookup
         
-        # Get JWT secret from Supabase anon key
-        jwt_secret = JWT_SECRET_KEY
+    Returns:
+        Principal: Caller with any server-side role change applied
         
-        # Decode the JWT token
-        payload = jwt.decode(
-            token, 
-            jwt_secret, 
-            algorithms=["HS256"],
-            options={"verify_signature": True, "verify_exp": True, "verify_aud": False}
-        )
+    Raises:
+        HTTPException: 401 for invalid, expired or revoked tokens; 403 for deactivated accounts
+    """
+    try:
+        logger.info(f"Received token: {token[:20]}...")  # Log first 20 chars for debugging
         
-        # Extract user information from payload
-        user_id = payload.get("sub")
-        email = payload.get("email")
-        user_metadata = payload.get("user_metadata", {})
-        role = user_metadata.get("role", "user")  # default to user
+        principal = _token_cache.get(token)
+        if principal is None or principal.exp <= time.time():
+            principal = _decode_token(token)
 
-        logger.info(f"Decoded user: {user_id}, email: {email}, role: {role}")
-        
-        if not user_id:
+        user_id = principal.user_id
+
+        # Logged-out sessions: the in-memory filter rules out almost every token,
+        # the revoked_tokens table is only queried on a possible match
+        token_id = principal.token_id
+        if token_id and revocation_store.might_be_revoked(token_id) and await revocation_store.is_revoked(token_id, db):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token: missing user ID",
+                detail="Token has been revoked",
                 headers={"WWW-Authenticate": "Bearer"},
             )
 
-        # Create a user-like object with the decoded information
-        current_user = {
-            "user_id": user_id,
-            "email": email, 
-            "role": role,
-            "payload": payload
-        }
+        if user_id in deactivated_users:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Account is deactivated"
+            )
+
+        # A role changed since the token was issued wins over its claim
+        role = role_overlay.get(user_id)
+        if role is not None and role != principal.role:
+            principal = principal.with_role(role)
 
-        logger.info(f"User {user_id} authenticated via JWT role: {role}")
-        
-        # Set current user in request state for RBAC
-        request.state.current_user = current_user
-        
-        return current_user
+        logger.info(f"User {user_id} authenticated via JWT role: {principal.role}")
+        return principal
         
+    except HTTPException:
+        raise
     except jwt.ExpiredSignatureError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -85,4 +153,15 @@ async def get_current_user(
         )
 
 
-
+async def get_current_user(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_db)
+):
+    """Get current user (Principal) from JWT token"""
+    principal = await authenticate_token(credentials.credentials, db)
+    
+    # Set current user in request state for RBAC
+    request.state.current_user = principal
+    
+    return principal
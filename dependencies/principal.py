@@ -0,0 +1,73 @@
+"""
+Authenticated principal built by get_current_user
+Small immutable object instead of a dict holding the whole JWT payload
+"""
+import sys
+from types import MappingProxyType
+from typing import Any, Mapping, Optional
+
+from utils.revocation import token_id_from_payload
+
+
+class Principal:
+    """
+    The caller of a request: user ID, email, role and token metadata
+
+    Immutable and __slots__-based so the same instance can be cached per
+    token and shared across requests. Role strings are interned, so the few
+    distinct roles are stored once per process. The remaining JWT claims are
+    only wrapped into a mapping when something asks for them.
+    """
+
+    __slots__ = ("user_id", "email", "role", "token_id", "exp", "_payload")
+
+    def __init__(
+        self,
+        user_id: str,
+        email: Optional[str],
+        role: str,
+        token_id: Optional[str] = None,
+        exp: Optional[int] = None,
+        payload: Optional[dict] = None
+    ):
+        object.__setattr__(self, "user_id", user_id)
+        object.__setattr__(self, "email", email)
+        object.__setattr__(self, "role", sys.intern(role))
+        object.__setattr__(self, "token_id", token_id)
+        object.__setattr__(self, "exp", exp)
+        object.__setattr__(self, "_payload", payload)
+
+    @classmethod
+    def from_payload(cls, payload: dict) -> "Principal":
+        """Build from a verified JWT payload (Supabase claim layout)"""
+        user_metadata = payload.get("user_metadata") or {}
+        return cls(
+            user_id=payload.get("sub"),
+            email=payload.get("email"),
+            role=user_metadata.get("role") or "user",  # The claim may be present but null
+            token_id=token_id_from_payload(payload),
+            exp=payload.get("exp"),
+            payload=payload
+        )
+
+    @property
+    def claims(self) -> Mapping[str, Any]:
+        """Read-only view of every JWT claim (empty for principals not built from a token)"""
+        return MappingProxyType(self._payload or {})
+
+    def with_role(self, role: str) -> "Principal":
+        """Copy with a different role, e.g. one applied by the server-side role overlay"""
+        return Principal(self.user_id, self.email, role, self.token_id, self.exp, self._payload)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Principal is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Principal is immutable")
+
+    def __repr__(self):
+        return f"<Principal(user_id={self.user_id}, role={self.role})>"
+
+
+# Caller for internal operations that don't come from a user token
+SYSTEM_PRINCIPAL = Principal(user_id="system", email="system@admin.com", role="system")
@@ -110,11 +110,7 @@ def require_permission(resource: str = None, permission: str = None):
                     detail="Authentication required"
                 )
 
-            user_role = 'user'  # default fallback to match registration default
-            if isinstance(current_user, dict) and 'role' in current_user:
-                user_role = current_user['role']
-            else:
-                user_role = getattr(current_user, 'role', 'agent')
+            user_role = current_user.role
 
             resource_name = resource or normalize_path(str(request.url.path))
             required_permission = permission or translate_method_to_action(request.method)
@@ -151,6 +147,8 @@ require_user_management = require_permission("users", "read")
 require_user_management_write = require_permission("users", "write")
 require_user_management_delete = require_permission("users", "delete")
 
+require_user_search = require_permission("users/search", "read")
+
 require_profile_read = require_permission("users/profiles", "read")
 require_profile_write = require_permission("users/profiles", "write")
 
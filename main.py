@@ -1,13 +1,106 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from routers.auth.auth import auth_router
 from routers.users import users_router
 from routers.admin.admin import router as admin_router
+from routers.health.health import router as health_router
+from routers.batch.batch import router as batch_router
+from routers.analytics.analytics import router as analytics_router
+from routers.reports.reports import router as reports_router
+from routers.reports.helpers import report_runner
+from config import (
+    ANALYTICS_ROLLUP_INTERVAL,
+    AUDIT_FLUSH_INTERVAL,
+    AUDIT_SHUTDOWN_TIMEOUT,
+    AUTH_CACHE_WARMUP_TIMEOUT,
+    DATABASE_LISTEN_URL,
+    DATABASE_REPLICA_URL,
+    DATABASE_URL,
+    DEV_MODE,
+    N_PLUS_ONE_THRESHOLD,
+    OUTBOX_POLL_INTERVAL,
+    POOL_WARMUP_CONNECTIONS,
+    REVOCATION_SYNC_INTERVAL,
+    SHUTDOWN_DRAIN_TIMEOUT,
+    dispose_engines,
+    get_async_engine,
+    get_session_factory
+)
+from utils.instrumentation import make_query_counter_middleware
+from utils.lifecycle import InFlightMiddleware, lifecycle, warm_up_pool
+from utils.sessions import ReadYourWritesMiddleware
+from utils.revocation import run_revocation_sync
+from utils.notifications import notification_listener
+from utils.outbox import outbox_publisher
+from utils.analytics import run_analytics_rollup
+from utils.audit import audit_log
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Supabase clients are created lazily on first use; the database pool is
+    # pre-filled so the first requests after a deploy don't pay for connects
+    background_tasks = []
+    if DATABASE_URL:
+        await warm_up_pool(get_async_engine(), POOL_WARMUP_CONNECTIONS)
+        # Keep this worker's token revocation filter in step with the table
+        background_tasks.append(
+            asyncio.create_task(run_revocation_sync(get_session_factory(), REVOCATION_SYNC_INTERVAL))
+        )
+        # Role overlay and deactivated users: loaded now, then kept current by NOTIFY
+        listener_ready = asyncio.Event()
+        background_tasks.append(
+            asyncio.create_task(notification_listener.run(DATABASE_LISTEN_URL, get_session_factory(), listener_ready))
+        )
+        try:
+            await asyncio.wait_for(listener_ready.wait(), AUTH_CACHE_WARMUP_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning("Auth caches not loaded at startup; continuing while the listener retries")
+        # Deliver profile/role change events written to the outbox
+        background_tasks.append(
+            asyncio.create_task(outbox_publisher.run(get_session_factory(), OUTBOX_POLL_INTERVAL))
+        )
+        # Role distribution for /analytics (the other aggregates are trigger-maintained)
+        background_tasks.append(
+            asyncio.create_task(run_analytics_rollup(get_session_factory(), ANALYTICS_ROLLUP_INTERVAL))
+        )
+        # Report jobs submitted to this worker
+        background_tasks.extend(report_runner.start(get_session_factory()))
+        # Batched writes of buffered audit events
+        background_tasks.append(
+            asyncio.create_task(audit_log.run(get_session_factory(), AUDIT_FLUSH_INTERVAL))
+        )
+    lifecycle.started = True
+    
+    yield
+    
+    # Report not-ready, let in-flight requests finish, then close the pool
+    await lifecycle.drain(SHUTDOWN_DRAIN_TIMEOUT)
+    for task in background_tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    if DATABASE_URL:
+        await report_runner.abandon(get_session_factory())
+        # Best effort: whatever can't be written in time is lost
+        try:
+            await asyncio.wait_for(audit_log.flush(get_session_factory()), AUDIT_SHUTDOWN_TIMEOUT)
+        except Exception as e:
+            logger.error(f"Audit flush at shutdown failed, {len(audit_log)} events lost: {str(e)}")
+    await dispose_engines()
+
 
 app = FastAPI(
     title="Supabase FastAPI Boilerplate",
     description="A FastAPI application with Supabase authentication",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -19,6 +112,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Count in-flight requests so shutdown can drain them
+app.add_middleware(InFlightMiddleware)
+
+if DATABASE_REPLICA_URL:
+    # Keep a client's reads on the primary right after it writes, whichever worker serves them
+    app.add_middleware(ReadYourWritesMiddleware)
+
+# Compress larger responses, including chunk-by-chunk for streamed exports
+app.add_middleware(GZipMiddleware, minimum_size=1000)
+
+if DEV_MODE:
+    # Expose per-request query/upstream call counts and flag N+1 patterns
+    app.middleware("http")(make_query_counter_middleware(N_PLUS_ONE_THRESHOLD))
+
+app.include_router(health_router)
 app.include_router(auth_router)
 app.include_router(users_router)
 app.include_router(admin_router)
+app.include_router(batch_router)
+app.include_router(analytics_router)
+app.include_router(reports_router)
@@ -0,0 +1,38 @@
+"""Add trigram search index on profiles
+
+Revision ID: 2500ce7c53f0
+Revises: 06e358945e90
+Create Date: 2026-10-19 09:12:40.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2500ce7c53f0'
+down_revision: Union[str, Sequence[str], None] = '06e358945e90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    
+    # Must match models.PROFILE_SEARCH_DOCUMENT exactly for the planner to use it.
+    # Built concurrently so large profiles tables stay writable during the migration.
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_profiles_search_trgm ON profiles "
+            "USING gin ((lower(coalesce(email, '') || ' ' || coalesce(first_name, '') || ' ' || "
+            "coalesce(last_name, '') || ' ' || coalesce(phone, ''))) gin_trgm_ops)"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_profiles_search_trgm")
@@ -0,0 +1,45 @@
+"""Add audit_events table
+
+Revision ID: 2889a5d82ee2
+Revises: 446674ca70d5
+Create Date: 2026-10-19 21:14:37.920465
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2889a5d82ee2'
+down_revision: Union[str, Sequence[str], None] = '446674ca70d5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'audit_events',
+        sa.Column('id', sa.BigInteger(), sa.Identity(), nullable=False),
+        sa.Column('occurred_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('actor_id', sa.String(), nullable=False),
+        sa.Column('actor_role', sa.String(), nullable=False),
+        sa.Column('action', sa.String(), nullable=False),
+        sa.Column('target_id', sa.String(), nullable=True),
+        sa.Column('details', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_audit_events_occurred_at_id', 'audit_events', ['occurred_at', 'id'], unique=False)
+    op.create_index('ix_audit_events_actor_id', 'audit_events', ['actor_id', 'occurred_at', 'id'], unique=False)
+    op.create_index('ix_audit_events_target_id', 'audit_events', ['target_id', 'occurred_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_audit_events_target_id', table_name='audit_events')
+    op.drop_index('ix_audit_events_actor_id', table_name='audit_events')
+    op.drop_index('ix_audit_events_occurred_at_id', table_name='audit_events')
+    op.drop_table('audit_events')
@@ -0,0 +1,46 @@
+"""Add report_jobs table
+
+Revision ID: 446674ca70d5
+Revises: 4c1e9b7d2f60
+Create Date: 2026-10-19 19:52:16.558320
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '446674ca70d5'
+down_revision: Union[str, Sequence[str], None] = '4c1e9b7d2f60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'report_jobs',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('report_type', sa.String(), nullable=False),
+        sa.Column('status', sa.String(), server_default='queued', nullable=False),
+        sa.Column('requested_by', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('row_count', sa.Integer(), nullable=True),
+        sa.Column('file_path', sa.String(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_report_jobs_requested_by'), 'report_jobs', ['requested_by'], unique=False)
+    op.create_index(op.f('ix_report_jobs_finished_at'), 'report_jobs', ['finished_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_report_jobs_finished_at'), table_name='report_jobs')
+    op.drop_index(op.f('ix_report_jobs_requested_by'), table_name='report_jobs')
+    op.drop_table('report_jobs')
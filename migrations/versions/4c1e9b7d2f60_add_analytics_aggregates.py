@@ -0,0 +1,100 @@
+"""Add incrementally maintained analytics aggregates
+
+Revision ID: 4c1e9b7d2f60
+Revises: 53f4a7825049
+Create Date: 2026-10-19 18:27:44.091375
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4c1e9b7d2f60'
+down_revision: Union[str, Sequence[str], None] = '53f4a7825049'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'profile_daily_stats',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('signups', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('active', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('inactive', sa.Integer(), server_default='0', nullable=False),
+        sa.PrimaryKeyConstraint('day')
+    )
+    op.create_table(
+        'role_counts',
+        sa.Column('role', sa.String(), nullable=False),
+        sa.Column('users', sa.Integer(), nullable=False),
+        sa.Column('refreshed_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('role')
+    )
+    
+    # Each profile adds (1, is_active, NOT is_active) to its UTC signup day;
+    # updates and deletes take the old row's contribution back first
+    op.execute("""
+        CREATE OR REPLACE FUNCTION profile_daily_stats_apply() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.created_at IS NOT NULL THEN
+                INSERT INTO profile_daily_stats AS s (day, signups, active, inactive)
+                VALUES ((OLD.created_at AT TIME ZONE 'UTC')::date, -1,
+                        -(OLD.is_active::int), -((NOT OLD.is_active)::int))
+                ON CONFLICT (day) DO UPDATE SET
+                    signups = s.signups + EXCLUDED.signups,
+                    active = s.active + EXCLUDED.active,
+                    inactive = s.inactive + EXCLUDED.inactive;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.created_at IS NOT NULL THEN
+                INSERT INTO profile_daily_stats AS s (day, signups, active, inactive)
+                VALUES ((NEW.created_at AT TIME ZONE 'UTC')::date, 1,
+                        NEW.is_active::int, (NOT NEW.is_active)::int)
+                ON CONFLICT (day) DO UPDATE SET
+                    signups = s.signups + EXCLUDED.signups,
+                    active = s.active + EXCLUDED.active,
+                    inactive = s.inactive + EXCLUDED.inactive;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER profiles_daily_stats_insert_delete
+        AFTER INSERT OR DELETE ON profiles
+        FOR EACH ROW
+        EXECUTE FUNCTION profile_daily_stats_apply()
+    """)
+    op.execute("""
+        CREATE TRIGGER profiles_daily_stats_update
+        AFTER UPDATE OF is_active, created_at ON profiles
+        FOR EACH ROW
+        WHEN (OLD.is_active IS DISTINCT FROM NEW.is_active OR OLD.created_at IS DISTINCT FROM NEW.created_at)
+        EXECUTE FUNCTION profile_daily_stats_apply()
+    """)
+    
+    # Backfill in the same transaction: the triggers' lock on profiles keeps
+    # writers out until commit, so nothing is counted twice or missed
+    op.execute("""
+        INSERT INTO profile_daily_stats (day, signups, active, inactive)
+        SELECT (created_at AT TIME ZONE 'UTC')::date,
+               count(*),
+               count(*) FILTER (WHERE is_active),
+               count(*) FILTER (WHERE NOT is_active)
+        FROM profiles
+        WHERE created_at IS NOT NULL
+        GROUP BY 1
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS profiles_daily_stats_update ON profiles")
+    op.execute("DROP TRIGGER IF EXISTS profiles_daily_stats_insert_delete ON profiles")
+    op.execute("DROP FUNCTION IF EXISTS profile_daily_stats_apply()")
+    op.drop_table('role_counts')
+    op.drop_table('profile_daily_stats')
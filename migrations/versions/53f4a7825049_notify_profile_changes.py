@@ -0,0 +1,45 @@
+"""Notify on every profile update for realtime push
+
+Revision ID: 53f4a7825049
+Revises: 6d3ba30358b1
+Create Date: 2026-10-19 17:03:51.730962
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '53f4a7825049'
+down_revision: Union[str, Sequence[str], None] = '6d3ba30358b1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Channel and payload format must match utils/profile_push.py. Identical
+    # payloads within one transaction are folded into a single notification.
+    op.execute("""
+        CREATE OR REPLACE FUNCTION notify_profile_change() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('profile_changes', NEW.id::text);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER profiles_notify_change
+        AFTER UPDATE ON profiles
+        FOR EACH ROW
+        WHEN (OLD.* IS DISTINCT FROM NEW.*)
+        EXECUTE FUNCTION notify_profile_change()
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS profiles_notify_change ON profiles")
+    op.execute("DROP FUNCTION IF EXISTS notify_profile_change()")
@@ -0,0 +1,56 @@
+"""Reliable profiles.updated_at and change feed index
+
+Revision ID: 7a335b8687d1
+Revises: 95872b5e2485
+Create Date: 2026-10-19 13:02:51.377410
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a335b8687d1'
+down_revision: Union[str, Sequence[str], None] = '95872b5e2485'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Rows never updated have no updated_at; start them at their creation time
+    op.execute("UPDATE profiles SET updated_at = coalesce(created_at, now()) WHERE updated_at IS NULL")
+    op.alter_column('profiles', 'updated_at', server_default=sa.text('now()'), nullable=False)
+    
+    # Set by the database on every UPDATE so raw SQL and bulk statements are covered too.
+    # clock_timestamp() rather than now(): closer to commit time for long transactions.
+    op.execute("""
+        CREATE OR REPLACE FUNCTION set_updated_at() RETURNS trigger AS $$
+        BEGIN
+            NEW.updated_at = clock_timestamp();
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER profiles_set_updated_at
+        BEFORE UPDATE ON profiles
+        FOR EACH ROW
+        EXECUTE FUNCTION set_updated_at()
+    """)
+    
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_profiles_updated_at_id ON profiles (updated_at, id)"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_profiles_updated_at_id")
+    op.execute("DROP TRIGGER IF EXISTS profiles_set_updated_at ON profiles")
+    op.execute("DROP FUNCTION IF EXISTS set_updated_at()")
+    op.alter_column('profiles', 'updated_at', server_default=None, nullable=True)
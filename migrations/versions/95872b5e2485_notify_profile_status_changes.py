@@ -0,0 +1,54 @@
+"""Notify on profile is_active changes and index inactive profiles
+
+Revision ID: 95872b5e2485
+Revises: bae219520a24
+Create Date: 2026-10-19 11:20:37.604118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '95872b5e2485'
+down_revision: Union[str, Sequence[str], None] = 'bae219520a24'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Small partial index: workers load the deactivated set from it on connect
+    op.create_index(
+        'ix_profiles_inactive', 'profiles', ['id'], unique=False,
+        postgresql_where=sa.text('NOT is_active')
+    )
+    
+    # Channel and payload format must match utils/account_status.py
+    op.execute("""
+        CREATE OR REPLACE FUNCTION notify_profile_status() RETURNS trigger AS $$
+        BEGIN
+            IF (TG_OP = 'INSERT' AND NEW.is_active)
+                OR (TG_OP = 'UPDATE' AND NEW.is_active = OLD.is_active) THEN
+                RETURN NULL;
+            END IF;
+            PERFORM pg_notify('profile_status', NEW.id::text || ':' || NEW.is_active::text);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER profiles_notify_status
+        AFTER INSERT OR UPDATE OF is_active ON profiles
+        FOR EACH ROW
+        EXECUTE FUNCTION notify_profile_status()
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS profiles_notify_status ON profiles")
+    op.execute("DROP FUNCTION IF EXISTS notify_profile_status()")
+    op.drop_index('ix_profiles_inactive', table_name='profiles', postgresql_where=sa.text('NOT is_active'))
@@ -0,0 +1,31 @@
+"""Add heartbeat_at to report_jobs
+
+Revision ID: c81f4d2a9e53
+Revises: 2889a5d82ee2
+Create Date: 2026-10-19 23:02:11.418206
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c81f4d2a9e53'
+down_revision: Union[str, Sequence[str], None] = '2889a5d82ee2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'report_jobs',
+        sa.Column('heartbeat_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False)
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('report_jobs', 'heartbeat_at')
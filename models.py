@@ -1,5 +1,5 @@
-from sqlalchemy import Column, String, DateTime, Text, Boolean, ForeignKey, Table
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, DateTime, Text, Boolean, ForeignKey, Table, MetaData, Index, literal_column, BigInteger, Integer, Identity, Date, text
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from config import Base
@@ -27,15 +27,143 @@ class Profile(Base):
     bio = Column(Text, nullable=True)
     is_active = Column(Boolean, default=True, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Also bumped by the profiles_set_updated_at trigger on every UPDATE, whatever
+    # issues it; the admin change feed pages on (updated_at, id)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
     
    
     
+    __table_args__ = (
+        Index("ix_profiles_updated_at_id", "updated_at", "id"),
+        # Deactivated set loaded by utils/account_status.py
+        Index("ix_profiles_inactive", "id", postgresql_where=text("NOT is_active")),
+    )
+    
     def __repr__(self):
         return f"<Profile(id={self.id}, email={self.email})>"
 
 
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+    
+    token_id = Column(String, primary_key=True)  # Supabase session_id, or jti for other issuers
+    user_id = Column(UUID(as_uuid=True), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)  # Token exp; row is useless after this
+    revoked_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+    
+    def __repr__(self):
+        return f"<RevokedToken(token_id={self.token_id}, user_id={self.user_id})>"
+
+
+class OutboxEvent(Base):
+    __tablename__ = "outbox_events"
+    
+    # Written in the same transaction as the change it describes and deleted once
+    # utils/outbox.py has delivered it, so the table only holds pending events
+    id = Column(BigInteger, Identity(), primary_key=True)
+    event_type = Column(String, nullable=False)  # e.g. "profile.updated", "user.role_changed"
+    aggregate_id = Column(UUID(as_uuid=True), nullable=False)  # User the event is about
+    payload = Column(JSONB, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    available_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)  # Pushed back after a failed delivery
+    attempts = Column(Integer, server_default="0", nullable=False)
+    last_error = Column(Text, nullable=True)
+    
+    def __repr__(self):
+        return f"<OutboxEvent(id={self.id}, event_type={self.event_type})>"
+
+
+class ProfileDailyStats(Base):
+    __tablename__ = "profile_daily_stats"
+    
+    # One row per UTC signup day, kept current by the profiles triggers from
+    # migration 4c1e9b7d2f60. A profile counts towards the day it signed up on
+    # for all three columns, so totals are the sums over all days.
+    day = Column(Date, primary_key=True)
+    signups = Column(Integer, server_default="0", nullable=False)
+    active = Column(Integer, server_default="0", nullable=False)
+    inactive = Column(Integer, server_default="0", nullable=False)
+    
+    def __repr__(self):
+        return f"<ProfileDailyStats(day={self.day}, signups={self.signups})>"
+
+
+class RoleCount(Base):
+    __tablename__ = "role_counts"
+    
+    # Roles live in Supabase's auth.users, which we can't put triggers on, so
+    # these are rolled up periodically by utils/analytics.py
+    role = Column(String, primary_key=True)
+    users = Column(Integer, nullable=False)
+    refreshed_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    
+    def __repr__(self):
+        return f"<RoleCount(role={self.role}, users={self.users})>"
+
 
+class ReportJob(Base):
+    __tablename__ = "report_jobs"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    report_type = Column(String, nullable=False)  # Key of REPORT_QUERIES in routers/reports/helpers.py
+    status = Column(String, server_default="queued", nullable=False)  # queued, running, succeeded, failed, cancelled
+    requested_by = Column(UUID(as_uuid=True), nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True, index=True)  # Files are purged REPORT_RETENTION_HOURS after this
+    row_count = Column(Integer, nullable=True)
+    file_path = Column(String, nullable=True)  # Set once the report succeeded
+    error = Column(Text, nullable=True)
+    # Touched by the worker holding the job; a stale one means that worker died
+    heartbeat_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    
+    def __repr__(self):
+        return f"<ReportJob(id={self.id}, report_type={self.report_type}, status={self.status})>"
 
 
+class AuditEvent(Base):
+    __tablename__ = "audit_events"
+    
+    # Buffered in memory by utils/audit.py and written in batches, so rows of
+    # one worker arrive a few seconds late and out of order with other workers
+    id = Column(BigInteger, Identity(), primary_key=True)
+    occurred_at = Column(DateTime(timezone=True), nullable=False)  # When the action happened, not when it was flushed
+    actor_id = Column(String, nullable=False)  # User ID, or "system" for internal calls
+    actor_role = Column(String, nullable=False)
+    action = Column(String, nullable=False)  # e.g. "user.role_updated"
+    target_id = Column(String, nullable=True)  # User the action applied to, if any
+    details = Column(JSONB, nullable=True)
+    
+    __table_args__ = (
+        Index("ix_audit_events_occurred_at_id", "occurred_at", "id"),
+        Index("ix_audit_events_actor_id", "actor_id", "occurred_at", "id"),
+        Index("ix_audit_events_target_id", "target_id", "occurred_at", "id"),
+    )
+    
+    def __repr__(self):
+        return f"<AuditEvent(id={self.id}, action={self.action}, actor_id={self.actor_id})>"
+
+
+# Lower-cased document over the searchable profile columns. Must stay identical to
+# the expression indexed by migration 2500ce7c53f0 so the trigram index is used.
+PROFILE_SEARCH_DOCUMENT = (
+    "lower(coalesce(profiles.email, '') || ' ' || coalesce(profiles.first_name, '') || ' ' || "
+    "coalesce(profiles.last_name, '') || ' ' || coalesce(profiles.phone, ''))"
+)
+profile_search_document = literal_column(PROFILE_SEARCH_DOCUMENT)
+
+
+# Supabase-managed auth.users table (read-only, kept out of Base.metadata so
+# create_all/Alembic never touch it). Lets queries resolve roles in SQL instead
+# of one admin API call per user.
+auth_users = Table(
+    'users',
+    MetaData(schema='auth'),
+    Column('id', UUID(as_uuid=True), primary_key=True),
+    Column('email', String),
+    Column('raw_user_meta_data', JSONB),
+    Column('updated_at', DateTime(timezone=True)),
+)
 
+# Role stored in Supabase user_metadata, defaulting to "user" like the JWT path
+auth_user_role = func.coalesce(auth_users.c.raw_user_meta_data['role'].astext, 'user')
@@ -1,33 +1,134 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request, Form
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Form, Query, UploadFile, File
+from fastapi.responses import StreamingResponse
 from dependencies.rbac import require_admin, require_admin_write, require_user_management, require_user_management_write
 from dependencies.get_current_user import get_current_user
-from routers.admin.schemas import UserListItem, UserListResponse, RoleUpdateResponse, UserRoleUpdate
-from routers.admin.helpers import get_paginated_users, get_user_by_id_admin, update_user_role_admin
+from dependencies.principal import SYSTEM_PRINCIPAL
+from routers.admin.schemas import (
+    SparseUserListItem,
+    SparseUserListResponse,
+    RoleUpdateResponse,
+    UserRoleUpdate,
+    BulkRoleUpdate,
+    BulkRoleUpdateResponse,
+    BulkUserLookup,
+    BulkUserLookupResponse,
+    ProfileChangesResponse,
+    BulkImportResponse,
+    AuditEventListResponse
+)
+from routers.admin.helpers import (
+    get_paginated_users,
+    get_user_by_id_admin,
+    get_users_by_ids_admin,
+    get_profile_changes,
+    get_audit_events,
+    update_user_role_admin,
+    bulk_update_user_roles,
+    import_users_csv,
+    stream_users_export,
+    EXPORT_MEDIA_TYPES
+)
 from sqlalchemy.ext.asyncio import AsyncSession
-from config import get_db
+from utils.sessions import get_db, get_read_db
+from utils.deadlines import request_deadline
+from utils.idempotency import IdempotentRoute, idempotent
+from utils.serialization import FastJSONResponse, parse_fields
+from datetime import datetime
 from typing import Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/admin", tags=["Admin"])
+router = APIRouter(
+    prefix="/admin",
+    tags=["Admin"],
+    default_response_class=FastJSONResponse,
+    route_class=IdempotentRoute
+)
 
-@router.get("/users", response_model=UserListResponse)
+@router.get("/users", response_model=SparseUserListResponse)
+@request_deadline(10)
 async def list_all_users(
     page: int = 1,
     limit: int = 20,
     role: Optional[str] = None,
-    db: AsyncSession = Depends(get_db),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,email,role"),
+    db: AsyncSession = Depends(get_read_db),
     current_user = Depends(get_current_user),
     _rbac_check = Depends(require_user_management)
 ):
     """
     Admin only: List all users with pagination and optional role filter
+    
+    Pass `fields` to return (and query) only some columns, e.g. `fields=id,email,role`;
+    fields outside the fieldset are left out of each user.
+    """
+    return FastJSONResponse(await get_paginated_users(db, page, limit, role, parse_fields(fields)))
+
+
+@router.get("/users/export")
+async def export_users(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    current_user = Depends(get_current_user),
+    _rbac_check = Depends(require_user_management)
+):
+    """
+    Admin only: Stream every user profile with its role as NDJSON or CSV
+    
+    The body is sent with chunked transfer encoding (gzip when the client accepts it)
+    and rows are read through a server-side cursor, so exports of any size use constant memory.
     """
-    return await get_paginated_users(db, page, limit, role)
+    return StreamingResponse(
+        stream_users_export(format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="users.{format}"'}
+    )
+
+
+@router.get("/users/changes", response_model=ProfileChangesResponse)
+@request_deadline(10)
+async def list_user_changes(
+    cursor: Optional[str] = None,
+    limit: int = Query(500, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user),
+    _rbac_check = Depends(require_user_management)
+):
+    """
+    Admin only: Profiles changed since `cursor`, for incremental (delta) sync
+    
+    Start without a cursor, then always pass back the `next_cursor` of the previous
+    response; keep paging while `has_more` is true. Reads the primary so a change is
+    never skipped because a replica had not applied it yet.
+    """
+    return FastJSONResponse(await get_profile_changes(db, cursor, limit))
+
+
+@router.get("/audit-events", response_model=AuditEventListResponse)
+@request_deadline(10)
+async def list_audit_events(
+    actor_id: Optional[str] = None,
+    target_id: Optional[str] = None,
+    action: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_read_db),
+    current_user = Depends(get_current_user),
+    _rbac_check = Depends(require_admin)
+):
+    """
+    Admin only: Audit trail of admin actions, newest first
+    
+    Filter by actor, target user, action and time range; pass `next_cursor` back as
+    `cursor` for older events. Events appear a few seconds after they happen.
+    """
+    return FastJSONResponse(await get_audit_events(db, actor_id, target_id, action, since, until, cursor, limit))
 
 
 @router.put("/users/{user_id}/role", response_model=RoleUpdateResponse)
+@idempotent()
 async def update_user_role(
     new_role: UserRoleUpdate,
     db: AsyncSession = Depends(get_db),
@@ -40,6 +141,39 @@ async def update_user_role(
     return await update_user_role_admin(new_role.user_id, new_role.role, current_user, db)
 
 
+@router.put("/users/roles", response_model=BulkRoleUpdateResponse)
+@request_deadline(120)
+async def bulk_update_user_role(
+    bulk_update: BulkRoleUpdate,
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user),
+    _rbac_check = Depends(require_user_management_write)
+):
+    """
+    Admin only: Update roles for many users in one call
+    
+    Returns a result per user; individual failures do not abort the batch.
+    """
+    return await bulk_update_user_roles(bulk_update.updates, current_user, db)
+
+
+@router.post("/users/import", response_model=BulkImportResponse)
+@request_deadline(600)
+async def import_users(
+    file: UploadFile = File(..., description="CSV: email, and optionally first_name, last_name, phone, bio, role, password"),
+    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user),
+    _rbac_check = Depends(require_user_management_write)
+):
+    """
+    Admin only: Create users and profiles in bulk from a CSV file
+    
+    Existing users (matched by email) keep their role and get their profile merged.
+    Every data row gets a status: `created`, `updated` or `failed` with an error.
+    """
+    return FastJSONResponse(await import_users_csv(file, current_user, db))
+
+
 @router.post("/users/update-role-no-auth", response_model=RoleUpdateResponse)
 async def update_user_role_no_auth(
     role_update: UserRoleUpdate,
@@ -49,19 +183,37 @@ async def update_user_role_no_auth(
     Update user role without authentication - Use this ONLY for initial admin setup
     TODO: Remove this route after all admins have been created
     """
-    # Create a mock current_user for the helper function
-    mock_current_user = {"role": "system", "user_id": "system", "email": "system@admin.com"}
-    return await update_user_role_admin(role_update.user_id, role_update.role, mock_current_user, db)
+    return await update_user_role_admin(role_update.user_id, role_update.role, SYSTEM_PRINCIPAL, db)
 
 
-@router.get("/users/{user_id}", response_model=UserListItem)
+@router.post("/users/lookup", response_model=BulkUserLookupResponse)
+@request_deadline(10)
+async def lookup_users(
+    lookup: BulkUserLookup,
+    db: AsyncSession = Depends(get_read_db),
+    current_user = Depends(get_current_user),
+    _rbac_check = Depends(require_user_management)
+):
+    """
+    Admin only: Resolve up to 1000 user IDs in one call
+    
+    Returns the users keyed by ID and lists the requested IDs that were not found.
+    """
+    return FastJSONResponse(await get_users_by_ids_admin(lookup.user_ids, db))
+
+
+@router.get("/users/{user_id}", response_model=SparseUserListItem)
+@request_deadline(5)
 async def get_user_by_id(
     user_id: str,
-    db: AsyncSession = Depends(get_db),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,email,role"),
+    db: AsyncSession = Depends(get_read_db),
     current_user = Depends(get_current_user),
     _rbac_check = Depends(require_user_management)
 ):
     """
     Admin only: Get specific user by ID
+    
+    Pass `fields` to return only some columns; the others are left out.
     """
-    return await get_user_by_id_admin(user_id, db)
+    return FastJSONResponse(await get_user_by_id_admin(user_id, db, parse_fields(fields)))
@@ -2,27 +2,70 @@
 Helper functions for admin operations
 Contains business logic separated from route handlers for better maintainability
 """
+import asyncio
+import csv
+import io
 import logging
 import math
-from typing import Dict, Any, Optional, List
-from fastapi import HTTPException, status
+import uuid
+from typing import Dict, Any, Optional, List, AsyncIterator, Iterator, Set, Tuple, Union
+
+import orjson
+from fastapi import HTTPException, status, UploadFile
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from datetime import datetime
+from sqlalchemy import select, func, update, any_, literal, tuple_, text
+from sqlalchemy.dialects.postgresql import ARRAY, UUID as PG_UUID
+from starlette.concurrency import run_in_threadpool
+from datetime import datetime, timedelta
 
-from config import supabase_admin
-from models import Profile
-from routers.admin.schemas import UserListItem, UserListResponse, RoleUpdateResponse
+from config import (
+    get_supabase_admin,
+    get_session_factory,
+    ADMIN_API_CONCURRENCY,
+    CHANGE_FEED_SETTLE_SECONDS,
+    IMPORT_AUTH_CONCURRENCY,
+    IMPORT_BATCH_SIZE,
+    IMPORT_MAX_ROWS
+)
+from dependencies.principal import Principal
+from models import Profile, AuditEvent, auth_users, auth_user_role
+from routers.admin.schemas import (
+    UserListItem,
+    UserListResponse,
+    RoleUpdateResponse,
+    UserRoleUpdate,
+    BulkRoleUpdateResult,
+    BulkRoleUpdateResponse,
+    BulkUserLookupResponse,
+    ProfileChangesResponse,
+    ImportRow,
+    ImportRowResult,
+    BulkImportResponse,
+    AuditEventItem,
+    AuditEventListResponse
+)
 from routers.users.helpers import get_all_user_profiles
+from utils.audit import audit_log
+from utils.deadlines import deadline_suspended, remaining
+from utils.outbox import enqueue_event
+from utils.pagination import encode_cursor, decode_cursor
+from utils.role_overlay import role_overlay, role_version
+from utils.serialization import profile_row_to_dict, profile_columns, PROFILE_FIELDS
 
 logger = logging.getLogger(__name__)
 
+ROLE_UPDATE_MIN_BUDGET = 2  # Seconds of request deadline left for a bulk item's admin API call to start
+# Bulk role updates finishing in the background after their request was cancelled
+_role_update_tasks: Set[asyncio.Task] = set()
+
 
 async def get_paginated_users(
     db: AsyncSession,
     page: int = 1,
     limit: int = 20,
-    role: Optional[str] = None
+    role: Optional[str] = None,
+    fields: Optional[Tuple[str, ...]] = None
 ) -> UserListResponse:
     """
     Get paginated list of users with optional role filtering
@@ -32,6 +75,7 @@ async def get_paginated_users(
         page: Page number (1-based)
         limit: Number of users per page
         role: Optional role filter
+        fields: Sparse fieldset; None returns every field
         
     Returns:
         UserListResponse: Paginated user list
@@ -53,22 +97,30 @@ async def get_paginated_users(
         count_result = await db.execute(count_query)
         total = count_result.scalar()
         
-        # Use existing helper function to get user profiles
-        all_users = await get_all_user_profiles(db, offset, limit)
+        # The role filter needs the role column even if the fieldset leaves it out
+        query_fields = fields if fields is None or not role or "role" in fields else fields + ("role",)
+        all_users = await get_all_user_profiles(db, offset, limit, query_fields)
         
         # Apply role filter if specified
         if role:
-            filtered_users = [user for user in all_users if user.role == role]
+            filtered_users = [user for user in all_users if user["role"] == role]
         else:
             filtered_users = all_users
         
-        # Convert to UserListItem format
-        users = [UserListItem.model_validate(user.model_dump()) for user in filtered_users]
+        if fields is None:
+            # Convert to UserListItem format (trusted DB rows, skip re-validation)
+            users = [UserListItem.model_construct(**user) for user in filtered_users]
+        else:
+            # Plain dicts: a model would fill in defaults for the fields left out
+            if query_fields is not fields:
+                for user in filtered_users:
+                    del user["role"]
+            users = filtered_users
         
         # Calculate total pages
         total_pages = math.ceil(total / limit)
         
-        return UserListResponse(
+        return UserListResponse.model_construct(
             users=users,
             page=page,
             limit=limit,
@@ -86,58 +138,47 @@ async def get_paginated_users(
 
 async def get_user_by_id_admin(
     user_id: str,
-    db: AsyncSession
-) -> UserListItem:
+    db: AsyncSession,
+    fields: Optional[Tuple[str, ...]] = None
+) -> Union[UserListItem, Dict[str, Any]]:
     """
     Get specific user by ID for admin purposes
     
+    The role comes from auth.users in the same query, like the list and
+    bulk lookup paths, so there is no Supabase round trip.
+    
     Args:
         user_id: User ID to retrieve
         db: Database session
+        fields: Sparse fieldset; None returns every field (the auth.users
+            join is skipped when role isn't requested)
         
     Returns:
-        UserListItem: User information
+        UserListItem: User information (a plain dict when fields is given)
         
     Raises:
         HTTPException: If user not found or retrieval fails
     """
     try:
-        # Get user profile from database
-        result = await db.execute(
-            select(Profile).where(Profile.id == user_id)
-        )
-        profile = result.scalar_one_or_none()
+        columns = [Profile.__table__.c[column] for column in profile_columns(fields)]
+        query = select(*columns)
+        if fields is None or "role" in fields:
+            query = (
+                select(*columns, auth_user_role.label("role"))
+                .outerjoin(auth_users, auth_users.c.id == Profile.id)
+            )
+        result = await db.execute(query.where(Profile.id == user_id))
+        row = result.mappings().one_or_none()
         
-        if not profile:
+        if not row:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="User not found"
             )
         
-        # Get user role from Supabase
-        try:
-            supabase_user = supabase_admin.auth.admin.get_user_by_id(str(profile.id))
-            user_role = "user"  # Default fallback
-            
-            if supabase_user.user and supabase_user.user.user_metadata:
-                user_role = supabase_user.user.user_metadata.get("role", "user")
-            
-            user_data = {
-                **profile.__dict__,
-                "user_id": str(profile.id),
-                "role": user_role
-            }
-            
-            return UserListItem.model_validate(user_data)
-            
-        except Exception as role_error:
-            logger.warning(f"Failed to get role for user {profile.id}: {str(role_error)}")
-            user_data = {
-                **profile.__dict__,
-                "user_id": str(profile.id),
-                "role": "user"
-            }
-            return UserListItem.model_validate(user_data)
+        if fields is not None:
+            return profile_row_to_dict(row, fields)
+        return UserListItem.model_construct(**profile_row_to_dict(row))
         
     except HTTPException:
         raise
@@ -149,10 +190,208 @@ async def get_user_by_id_admin(
         )
 
 
+async def get_users_by_ids_admin(
+    user_ids: List[str],
+    db: AsyncSession
+) -> BulkUserLookupResponse:
+    """
+    Look up many users by ID in one query
+    
+    Profiles and their roles (from auth.users) come back from a single
+    statement with the IDs bound as one array parameter, so the query plan
+    and prepared statement are the same whatever the number of IDs.
+    
+    Args:
+        user_ids: User IDs to resolve
+        db: Database session
+        
+    Returns:
+        BulkUserLookupResponse: Users keyed by ID plus the IDs that were not found
+        
+    Raises:
+        HTTPException: If the lookup fails
+    """
+    # Requested ID as spelled -> canonical form (None if malformed)
+    requested: Dict[str, Optional[str]] = {}
+    for user_id in user_ids:
+        try:
+            requested[user_id] = str(uuid.UUID(user_id))
+        except ValueError:
+            requested[user_id] = None
+    ids = [uuid.UUID(user_id) for user_id in set(requested.values()) if user_id]
+    
+    users: Dict[str, UserListItem] = {}
+    if ids:
+        try:
+            result = await db.execute(
+                select(*(Profile.__table__.c[field] for field in PROFILE_FIELDS), auth_user_role.label("role"))
+                .outerjoin(auth_users, auth_users.c.id == Profile.id)
+                .where(Profile.id == any_(literal(ids, ARRAY(PG_UUID(as_uuid=True)))))
+            )
+            for row in result.mappings():
+                item = profile_row_to_dict(row)
+                users[item["id"]] = UserListItem.model_construct(**item)
+        except Exception as e:
+            logger.error(f"Bulk user lookup failed: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to retrieve users"
+            )
+    
+    missing = [user_id for user_id, canonical in requested.items() if canonical not in users]
+    return BulkUserLookupResponse.model_construct(users=users, missing=missing)
+
+
+def _decode_timestamp_cursor(cursor: str, parse_id) -> Tuple[datetime, Any]:
+    """Decode a (timestamp, id) keyset cursor; 400 if either value is malformed"""
+    timestamp, row_id = decode_cursor(cursor, 2)
+    try:
+        return datetime.fromisoformat(timestamp), parse_id(row_id)
+    except (TypeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+async def get_profile_changes(
+    db: AsyncSession,
+    cursor: Optional[str] = None,
+    limit: int = 500
+) -> ProfileChangesResponse:
+    """
+    Profiles changed after a cursor, oldest change first
+    
+    Keyset pagination over (updated_at, id), served by ix_profiles_updated_at_id.
+    Changes from the last CHANGE_FEED_SETTLE_SECONDS are held back: a
+    transaction that is still open may yet commit a row with an older
+    updated_at, and returning newer rows first would move the cursor past it.
+    
+    Args:
+        db: Database session (primary, so replica lag can't hide committed rows)
+        cursor: next_cursor from the previous call; None starts from the beginning
+        limit: Maximum number of profiles to return
+        
+    Returns:
+        ProfileChangesResponse: Changed profiles with their roles and the next cursor
+        
+    Raises:
+        HTTPException: If the cursor is invalid or the query fails
+    """
+    stmt = (
+        select(*(Profile.__table__.c[field] for field in PROFILE_FIELDS), auth_user_role.label("role"))
+        .outerjoin(auth_users, auth_users.c.id == Profile.id)
+        .where(Profile.updated_at <= func.now() - timedelta(seconds=CHANGE_FEED_SETTLE_SECONDS))
+        .order_by(Profile.updated_at, Profile.id)
+        .limit(limit + 1)
+    )
+    
+    if cursor:
+        last_updated_at, last_id = _decode_timestamp_cursor(cursor, uuid.UUID)
+        stmt = stmt.where(tuple_(Profile.updated_at, Profile.id) > tuple_(last_updated_at, last_id))
+    
+    try:
+        result = await db.execute(stmt)
+        rows = result.mappings().all()
+    except Exception as e:
+        logger.error(f"Profile change feed failed: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to retrieve changes"
+        )
+    
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if rows:
+        cursor = encode_cursor(rows[-1]["updated_at"], rows[-1]["id"])
+    
+    return ProfileChangesResponse.model_construct(
+        users=[UserListItem.model_construct(**profile_row_to_dict(row)) for row in rows],
+        next_cursor=cursor,
+        has_more=has_more
+    )
+
+
+async def get_audit_events(
+    db: AsyncSession,
+    actor_id: Optional[str] = None,
+    target_id: Optional[str] = None,
+    action: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = 100
+) -> AuditEventListResponse:
+    """
+    Audit events, newest first
+    
+    Keyset pagination over (occurred_at, id); actor and target filters use
+    their own (…, occurred_at, id) indexes. Events still buffered in a
+    worker (at most AUDIT_FLUSH_INTERVAL seconds old) are not visible yet.
+    
+    Args:
+        db: Database session
+        actor_id: Only events performed by this user ("system" for internal calls)
+        target_id: Only events applied to this user
+        action: Only this action, e.g. "user.role_updated"
+        since: Only events at or after this time
+        until: Only events before this time
+        cursor: next_cursor from the previous page
+        limit: Maximum number of events to return
+        
+    Returns:
+        AuditEventListResponse: Events and the cursor for the next page
+        
+    Raises:
+        HTTPException: If the cursor is invalid or the query fails
+    """
+    audit_events = AuditEvent.__table__
+    stmt = (
+        select(audit_events)
+        .order_by(audit_events.c.occurred_at.desc(), audit_events.c.id.desc())
+        .limit(limit + 1)
+    )
+    if actor_id:
+        stmt = stmt.where(audit_events.c.actor_id == actor_id)
+    if target_id:
+        stmt = stmt.where(audit_events.c.target_id == target_id)
+    if action:
+        stmt = stmt.where(audit_events.c.action == action)
+    if since:
+        stmt = stmt.where(audit_events.c.occurred_at >= since)
+    if until:
+        stmt = stmt.where(audit_events.c.occurred_at < until)
+    if cursor:
+        last_occurred_at, last_id = _decode_timestamp_cursor(cursor, int)
+        stmt = stmt.where(
+            tuple_(audit_events.c.occurred_at, audit_events.c.id) < tuple_(last_occurred_at, last_id)
+        )
+    
+    try:
+        result = await db.execute(stmt)
+        rows = result.mappings().all()
+    except Exception as e:
+        logger.error(f"Audit event query failed: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to retrieve audit events"
+        )
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["occurred_at"], rows[-1]["id"])
+    
+    return AuditEventListResponse.model_construct(
+        events=[AuditEventItem.model_construct(**row) for row in rows],
+        next_cursor=next_cursor
+    )
+
+
 async def update_user_role_admin(
     user_id: str,
     new_role: str,
-    current_user: Dict[str, Any],
+    current_user: Principal,
     db: AsyncSession
 ) -> RoleUpdateResponse:
     """
@@ -179,7 +418,7 @@ async def update_user_role_admin(
         
         # Get current user role from Supabase first to show in response
         try:
-            supabase_user = supabase_admin.auth.admin.get_user_by_id(user_id)
+            supabase_user = get_supabase_admin().auth.admin.get_user_by_id(user_id)
             if not supabase_user.user:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
@@ -199,7 +438,7 @@ async def update_user_role_admin(
         
         # Update user metadata using Supabase Admin API
         try:
-            response = supabase_admin.auth.admin.update_user_by_id(
+            response = get_supabase_admin().auth.admin.update_user_by_id(
                 uid=user_id,
                 attributes={
                     "user_metadata": {
@@ -215,6 +454,7 @@ async def update_user_role_admin(
                 )
             
             logger.info(f"Updated Supabase user metadata for {user_id} with role: {new_role}")
+            audit_log.record(current_user, "user.role_updated", user_id, old_role=old_role, new_role=new_role)
             
         except Exception as supabase_error:
             logger.error(f"Failed to update Supabase metadata: {str(supabase_error)}")
@@ -223,28 +463,25 @@ async def update_user_role_admin(
                 detail="Failed to update user role in authentication system"
             )
         
-        # Update profile timestamp for consistency (optional)
+        # Bump the profile timestamp for the change feed, record the change for
+        # other services and apply it to existing tokens in every worker, atomically
         try:
-            result = await db.execute(
-                select(Profile).where(Profile.id == user_id)
-            )
-            profile = result.scalar_one_or_none()
-            
-            if profile:
-                profile.updated_at = datetime.utcnow()
-                await db.commit()
-                
+            await _record_role_changes(db, [(user_id, old_role, new_role, role_version(response.user))], current_user)
         except Exception as db_error:
-            logger.warning(f"Failed to update profile timestamp: {str(db_error)}")
+            logger.error(f"Failed to record role change for {user_id}: {str(db_error)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Role was updated but recording the change failed; retry the request"
+            )
         
         return RoleUpdateResponse(
             message=f"User role updated from {old_role} to {new_role}",
             user_id=user_id,
             old_role=old_role,
             new_role=new_role,
-            updated_by=current_user["role"],
+            updated_by=current_user.role,
             metadata_updated=True,
-            note="Role will be available in JWT tokens after next login"
+            note="Role takes effect immediately; JWT claims update after next login"
         )
         
     except HTTPException:
@@ -255,3 +492,479 @@ async def update_user_role_admin(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to update user role"
         )
+
+
+async def bulk_update_user_roles(
+    updates: List[UserRoleUpdate],
+    current_user: Principal,
+    db: AsyncSession
+) -> BulkRoleUpdateResponse:
+    """
+    Update many user roles at once with bounded concurrency
+    
+    Current roles are read from auth.users in one query, the Supabase Admin API
+    calls are fanned out at most ADMIN_API_CONCURRENCY at a time, and profile
+    timestamps, outbox events and the role overlay for every successful update
+    are written in a single transaction. Failures are reported per item instead
+    of aborting the whole batch.
+    
+    Args:
+        updates: (user_id, role) pairs to apply
+        current_user: Current authenticated admin user
+        db: Database session
+        
+    Returns:
+        BulkRoleUpdateResponse: Per-item results with success/failure counts
+        
+    Raises:
+        HTTPException: 500 if roles were updated but recording the changes failed
+    """
+    results: Dict[str, BulkRoleUpdateResult] = {}
+    valid_ids: List[uuid.UUID] = []
+    # Canonical form of every ID, so spellings uuid.UUID accepts (uppercase,
+    # braces, no hyphens) match auth.users rows; malformed IDs stay as given
+    keys: List[str] = []
+    
+    for item in updates:
+        try:
+            user_uuid = uuid.UUID(item.user_id)
+        except ValueError:
+            keys.append(item.user_id)
+            results[item.user_id] = BulkRoleUpdateResult(
+                user_id=item.user_id, success=False, new_role=item.role, error="Invalid user ID"
+            )
+            continue
+        valid_ids.append(user_uuid)
+        keys.append(str(user_uuid))
+    
+    # Current roles for every user in one round trip
+    old_roles: Dict[str, str] = {}
+    if valid_ids:
+        try:
+            result = await db.execute(
+                select(auth_users.c.id, auth_user_role).where(auth_users.c.id.in_(valid_ids))
+            )
+            old_roles = {str(user_id): role for user_id, role in result.all()}
+        except Exception as e:
+            logger.warning(f"Failed to read current roles for bulk update: {str(e)}")
+        finally:
+            # Don't hold a connection while waiting on Supabase
+            await db.rollback()
+    
+    semaphore = asyncio.Semaphore(ADMIN_API_CONCURRENCY)
+    versions: Dict[str, float] = {}
+    
+    async def apply_update(user_id: str, role: str) -> None:
+        async with semaphore:
+            budget = remaining()
+            if budget is not None and budget < ROLE_UPDATE_MIN_BUDGET:
+                # Not started: better reported as failed than applied after the response is gone
+                results[user_id] = BulkRoleUpdateResult(
+                    user_id=user_id,
+                    success=False,
+                    old_role=old_roles.get(user_id),
+                    new_role=role,
+                    error="Request deadline reached before this update"
+                )
+                return
+            try:
+                # The Supabase client is synchronous, keep it off the event loop
+                response = await run_in_threadpool(
+                    get_supabase_admin().auth.admin.update_user_by_id,
+                    uid=user_id,
+                    attributes={"user_metadata": {"role": role}}
+                )
+                if not response.user:
+                    raise ValueError("User not found")
+                versions[user_id] = role_version(response.user)
+                results[user_id] = BulkRoleUpdateResult(
+                    user_id=user_id,
+                    success=True,
+                    old_role=old_roles.get(user_id),
+                    new_role=role
+                )
+            except Exception as e:
+                logger.warning(f"Bulk role update failed for {user_id}: {str(e)}")
+                results[user_id] = BulkRoleUpdateResult(
+                    user_id=user_id,
+                    success=False,
+                    old_role=old_roles.get(user_id),
+                    new_role=role,
+                    error=str(e)
+                )
+    
+    async def apply_and_record() -> BulkRoleUpdateResponse:
+        pending = {key: item.role for key, item in zip(keys, updates) if key not in results}
+        await asyncio.gather(*(apply_update(key, role) for key, role in pending.items()))
+        
+        # Own session and no deadline: if the request timed out, its session is
+        # closed by now, but changes already made in Supabase must be recorded
+        applied = [results[user_id] for user_id in versions]
+        if applied:
+            try:
+                with deadline_suspended():
+                    async with get_session_factory()() as session:
+                        await _record_role_changes(
+                            session,
+                            [(item.user_id, item.old_role, item.new_role, versions[item.user_id]) for item in applied],
+                            current_user
+                        )
+            except Exception as db_error:
+                logger.error(f"Failed to record bulk role changes: {str(db_error)}")
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail="Roles were updated but recording the changes failed; retry the request"
+                )
+        
+        ordered = [results[key] for key in keys]
+        succeeded = len(applied)
+        for item in applied:
+            audit_log.record(
+                current_user, "user.role_updated", item.user_id, old_role=item.old_role, new_role=item.new_role, bulk=True
+            )
+        logger.info(f"Bulk role update by {current_user.user_id}: {succeeded} succeeded, {len(ordered) - succeeded} failed")
+        
+        return BulkRoleUpdateResponse(
+            results=ordered,
+            succeeded=succeeded,
+            failed=len(ordered) - succeeded,
+            updated_by=current_user.role,
+            note="Roles take effect immediately; JWT claims update after next login"
+        )
+    
+    # Shielded so a request deadline can't cancel it between a Supabase update
+    # and its overlay publish: calls already sent finish and are recorded, and
+    # items not started by then are skipped by the budget check above
+    task = asyncio.create_task(apply_and_record())
+    _role_update_tasks.add(task)
+    task.add_done_callback(_role_update_tasks.discard)
+    return await asyncio.shield(task)
+
+
+async def _record_role_changes(
+    db: AsyncSession,
+    changes: List[Tuple[str, Optional[str], str, float]],
+    current_user: Principal
+) -> None:
+    """
+    Bump profile timestamps, enqueue outbox events and publish the role
+    overlay for role changes applied in Supabase, all in one transaction
+    
+    Args:
+        db: Database session
+        changes: (user_id, old_role, new_role, role version) per updated user
+        current_user: Admin who made the changes
+    
+    Raises:
+        Exception: If the transaction fails (it is rolled back)
+    """
+    try:
+        await db.execute(
+            update(Profile)
+            .where(Profile.id.in_([uuid.UUID(user_id) for user_id, _, _, _ in changes]))
+            .values(updated_at=func.now())
+        )
+        for user_id, old_role, new_role, _ in changes:
+            enqueue_event(db, "user.role_changed", user_id, {
+                "user_id": user_id,
+                "old_role": old_role,
+                "new_role": new_role,
+                "changed_by": current_user.user_id
+            })
+        await role_overlay.publish(db, [(user_id, new_role, version) for user_id, _, new_role, version in changes])
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+
+
+IMPORT_STAGING_COLUMNS = ("id", "email", "first_name", "last_name", "phone", "bio")
+# Staging rows become profiles; existing profiles keep values the CSV leaves
+# empty. Rows whose email (in any case) belongs to a different profile are skipped.
+# inserted is true for new profiles (xmax is only set on updated rows).
+IMPORT_MERGE_SQL = text("""
+    INSERT INTO profiles (id, email, first_name, last_name, phone, bio, is_active)
+    SELECT s.id, s.email, s.first_name, s.last_name, s.phone, s.bio, true
+    FROM profile_import s
+    WHERE NOT EXISTS (SELECT 1 FROM profiles p WHERE lower(p.email) = s.email AND p.id <> s.id)
+    ON CONFLICT (id) DO UPDATE SET
+        first_name = COALESCE(EXCLUDED.first_name, profiles.first_name),
+        last_name = COALESCE(EXCLUDED.last_name, profiles.last_name),
+        phone = COALESCE(EXCLUDED.phone, profiles.phone),
+        bio = COALESCE(EXCLUDED.bio, profiles.bio)
+    RETURNING id, (xmax = 0) AS inserted
+""")
+IMPORT_EVENT_FIELDS = ("first_name", "last_name", "phone", "bio")
+
+
+def _enqueue_import_event(db: AsyncSession, item: ImportRow, user_id: str, inserted: bool) -> None:
+    """Outbox event for a merged import row: the new profile, or the fields the CSV set"""
+    values = {field: getattr(item, field) for field in IMPORT_EVENT_FIELDS if getattr(item, field) is not None}
+    if inserted:
+        enqueue_event(db, "profile.created", user_id, {"user_id": user_id, "email": item.email.lower(), **values})
+    elif values:
+        enqueue_event(db, "profile.updated", user_id, {"user_id": user_id, "changes": values})
+
+
+async def _import_batch(
+    batch: List[Tuple[int, ImportRow]],
+    semaphore: asyncio.Semaphore,
+    db: AsyncSession
+) -> List[ImportRowResult]:
+    """Create missing auth users for a batch, then COPY and merge their profiles"""
+    emails = [item.email.lower() for _, item in batch]
+    try:
+        result = await db.execute(
+            select(auth_users.c.email, auth_users.c.id).where(auth_users.c.email.in_(emails))
+        )
+        existing = {email.lower(): str(user_id) for email, user_id in result.all()}
+    except Exception as e:
+        logger.error(f"Import lookup of existing users failed: {str(e)}")
+        return [
+            ImportRowResult(row=row, email=item.email, status="failed", error="Failed to look up existing users")
+            for row, item in batch
+        ]
+    finally:
+        # Don't hold a connection while waiting on Supabase
+        await db.rollback()
+    
+    async def create_user(item: ImportRow) -> Tuple[Optional[str], Optional[str]]:
+        attributes = {"email": item.email, "email_confirm": True, "user_metadata": {"role": item.role}}
+        if item.password:
+            attributes["password"] = item.password
+        async with semaphore:
+            try:
+                # The Supabase client is synchronous, keep it off the event loop
+                response = await run_in_threadpool(get_supabase_admin().auth.admin.create_user, attributes)
+                return str(response.user.id), None
+            except Exception as e:
+                return None, str(e)
+    
+    to_create = [(row, item) for row, item in batch if item.email.lower() not in existing]
+    created = await asyncio.gather(*(create_user(item) for _, item in to_create))
+    created_by_row = {row: outcome for (row, _), outcome in zip(to_create, created)}
+    
+    results: Dict[int, ImportRowResult] = {}
+    pending: List[Tuple[int, ImportRow, str, str]] = []  # row, item, user_id, status on success
+    for row, item in batch:
+        if row in created_by_row:
+            user_id, error = created_by_row[row]
+            if user_id is None:
+                results[row] = ImportRowResult(row=row, email=item.email, status="failed", error=error)
+                continue
+            pending.append((row, item, user_id, "created"))
+        else:
+            pending.append((row, item, existing[item.email.lower()], "updated"))
+    
+    if pending:
+        records = [
+            (uuid.UUID(user_id), item.email.lower(), item.first_name, item.last_name, item.phone, item.bio)
+            for _, item, user_id, _ in pending
+        ]
+        try:
+            await db.execute(text(
+                "CREATE TEMP TABLE profile_import "
+                "(id uuid, email text, first_name text, last_name text, phone text, bio text) ON COMMIT DROP"
+            ))
+            connection = await db.connection()
+            raw_connection = await connection.get_raw_connection()
+            await raw_connection.driver_connection.copy_records_to_table(
+                "profile_import", records=records, columns=IMPORT_STAGING_COLUMNS
+            )
+            result = await db.execute(IMPORT_MERGE_SQL)
+            merged = {str(user_id): inserted for user_id, inserted in result.all()}
+            items = {user_id: item for _, item, user_id, _ in pending}
+            for user_id, inserted in merged.items():
+                _enqueue_import_event(db, items[user_id], user_id, inserted)
+            await db.commit()
+        except Exception as e:
+            logger.error(f"Import profile merge failed: {str(e)}")
+            await db.rollback()
+            merged = None
+        
+        for row, item, user_id, row_status in pending:
+            if merged is None:
+                error = "Profile could not be written" + (" (auth user was created)" if row_status == "created" else "")
+            elif user_id not in merged:
+                error = "Email already belongs to another profile"
+            else:
+                results[row] = ImportRowResult(row=row, email=item.email, status=row_status, user_id=user_id)
+                continue
+            results[row] = ImportRowResult(row=row, email=item.email, status="failed", user_id=user_id, error=error)
+    
+    return [results[row] for row, _ in batch]
+
+
+def _import_fieldnames(reader: csv.DictReader) -> List[str]:
+    """Header of an import file (blocking read); empty if it can't be decoded"""
+    try:
+        return reader.fieldnames or []
+    except (UnicodeDecodeError, csv.Error):
+        return []
+
+
+def _parse_import_rows(reader: csv.DictReader) -> Iterator[Union[ImportRowResult, Tuple[int, ImportRow]]]:
+    """Validated (row, item) pairs, or a failed result for each row that can't be imported"""
+    seen_emails: Set[str] = set()
+    try:
+        for row, raw in enumerate(reader, start=1):
+            if row > IMPORT_MAX_ROWS:
+                yield ImportRowResult(
+                    row=row, status="failed", error=f"Import limit of {IMPORT_MAX_ROWS} rows reached; this and later rows were skipped"
+                )
+                return
+            try:
+                item = ImportRow.model_validate({
+                    key: value.strip() if isinstance(value, str) else value
+                    for key, value in raw.items() if key
+                })
+            except ValidationError as e:
+                yield ImportRowResult(row=row, email=raw.get("email"), status="failed", error=e.errors()[0]["msg"])
+                continue
+            if item.email.lower() in seen_emails:
+                yield ImportRowResult(row=row, email=item.email, status="failed", error="Duplicate email in file")
+                continue
+            seen_emails.add(item.email.lower())
+            yield row, item
+    except (UnicodeDecodeError, csv.Error) as e:
+        yield ImportRowResult(row=reader.line_num, status="failed", error=f"Unreadable CSV, import stopped: {str(e)}")
+
+
+def _next_import_batch(rows: Iterator) -> Tuple[List[Tuple[int, ImportRow]], List[ImportRowResult]]:
+    """Pull rows until a full batch (fewer at the end of the file); blocking, returns (batch, failed rows)"""
+    batch: List[Tuple[int, ImportRow]] = []
+    failures: List[ImportRowResult] = []
+    for entry in rows:
+        if isinstance(entry, ImportRowResult):
+            failures.append(entry)
+            continue
+        batch.append(entry)
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            break
+    return batch, failures
+
+
+async def import_users_csv(
+    file: UploadFile,
+    current_user: Principal,
+    db: AsyncSession
+) -> BulkImportResponse:
+    """
+    Create users and their profiles from a CSV upload
+    
+    Rows are read from the spooled upload (in the threadpool, off the event
+    loop) and processed IMPORT_BATCH_SIZE at a time. For each batch, emails that already have an auth user are
+    resolved in one query. The rest are created through the Supabase Admin
+    API, at most IMPORT_AUTH_CONCURRENCY at once. The batch's profiles are
+    then COPY'd into a temporary staging table and merged into profiles in
+    one statement. Roles are only set on newly created users.
+    
+    Args:
+        file: CSV with an email column and optional first_name, last_name,
+            phone, bio, role and password columns
+        current_user: Current authenticated admin user
+        db: Database session
+        
+    Returns:
+        BulkImportResponse: A status for every data row, in file order
+        
+    Raises:
+        HTTPException: If the file is not a CSV with an email column
+    """
+    # Reading and validating the spooled upload blocks, so it runs in the threadpool
+    reader = csv.DictReader(io.TextIOWrapper(file.file, encoding="utf-8-sig", newline=""))
+    if "email" not in await run_in_threadpool(_import_fieldnames, reader):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Expected a UTF-8 CSV file with a header row including an email column"
+        )
+    
+    semaphore = asyncio.Semaphore(IMPORT_AUTH_CONCURRENCY)
+    results: List[ImportRowResult] = []
+    rows = _parse_import_rows(reader)
+    
+    while True:
+        batch, failures = await run_in_threadpool(_next_import_batch, rows)
+        results.extend(failures)
+        if batch:
+            results.extend(await _import_batch(batch, semaphore, db))
+        if len(batch) < IMPORT_BATCH_SIZE:
+            break
+    
+    results.sort(key=lambda item: item.row)
+    
+    created = sum(1 for item in results if item.status == "created")
+    updated = sum(1 for item in results if item.status == "updated")
+    failed = len(results) - created - updated
+    logger.info(f"User import by {current_user.user_id}: {created} created, {updated} updated, {failed} failed")
+    audit_log.record(current_user, "users.imported", filename=file.filename, created=created, updated=updated, failed=failed)
+    
+    return BulkImportResponse.model_construct(results=results, created=created, updated=updated, failed=failed)
+
+
+EXPORT_COLUMNS = PROFILE_FIELDS + ("role",)
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _encode_ndjson(rows) -> bytes:
+    # default=str covers asyncpg's own UUID type, which orjson does not recognise
+    return b"".join(
+        orjson.dumps(
+            dict(zip(EXPORT_COLUMNS, row)),
+            default=str,
+            option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_UTC_Z
+        )
+        for row in rows
+    )
+
+
+def _encode_csv(rows) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode()
+
+
+async def stream_users_export(export_format: str, chunk_size: int = 1000) -> AsyncIterator[bytes]:
+    """
+    Stream every profile with its role as NDJSON or CSV
+    
+    Rows come from a server-side cursor and are encoded one chunk at a time,
+    so memory stays constant regardless of table size. Roles are read from
+    auth.users in the same query instead of one admin API call per user.
+    
+    Args:
+        export_format: "ndjson" or "csv"
+        chunk_size: Rows fetched from the cursor and written per chunk
+        
+    Yields:
+        bytes: Encoded chunk of rows
+    """
+    encode = _encode_csv if export_format == "csv" else _encode_ndjson
+    query = (
+        select(*Profile.__table__.columns, auth_user_role)
+        .outerjoin(auth_users, auth_users.c.id == Profile.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    
+    # The request-scoped session from get_db is closed before a streaming
+    # response body is sent, so the export owns its (replica-reading) session
+    async with get_session_factory()(info={"replica_reads": True}) as session:
+        try:
+            if export_format == "csv":
+                yield _encode_csv([EXPORT_COLUMNS])
+            
+            result = await session.stream(query)
+            exported = 0
+            async for rows in result.partitions():
+                exported += len(rows)
+                yield encode(rows)
+            
+            logger.info(f"Exported {exported} users as {export_format}")
+            
+        except Exception as e:
+            # Headers are already sent, so the client sees a truncated body
+            logger.error(f"User export failed: {str(e)}")
+            raise
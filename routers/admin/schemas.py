@@ -1,9 +1,16 @@
-from pydantic import BaseModel, field_validator
-from typing import Optional, List
+from pydantic import BaseModel, EmailStr, Field, field_validator
+from typing import Any, Dict, Optional, List
 from datetime import datetime
 import uuid
 
 
+def _canonical_user_id(user_id: str) -> str:
+    try:
+        return str(uuid.UUID(user_id))
+    except ValueError:
+        return user_id  # Reported per item as an invalid ID
+
+
 class UserRoleUpdate(BaseModel):
     user_id: str
     role: str
@@ -17,6 +24,23 @@ class UserRoleUpdate(BaseModel):
         return v
 
 
+class BulkRoleUpdate(BaseModel):
+    updates: List[UserRoleUpdate] = Field(..., min_length=1, max_length=5000)
+    
+    @field_validator('updates')
+    @classmethod
+    def validate_unique_users(cls, v):
+        # Compare canonical forms, so one user can't be listed twice in different spellings
+        user_ids = [_canonical_user_id(update.user_id) for update in v]
+        if len(set(user_ids)) != len(user_ids):
+            raise ValueError('Each user_id may appear only once per request')
+        return v
+
+
+class BulkUserLookup(BaseModel):
+    user_ids: List[str] = Field(..., min_length=1, max_length=1000)
+
+
 class UserListItem(BaseModel):
     id: str
     user_id: str
@@ -50,6 +74,19 @@ class UserListResponse(BaseModel):
     total_pages: int
 
 
+class SparseUserListItem(UserListItem):
+    """UserListItem as sent with a `fields=` fieldset: any field but id may be left out"""
+    user_id: Optional[str] = None
+    email: Optional[str] = None
+    is_active: Optional[bool] = None
+    created_at: Optional[datetime] = None
+    role: Optional[str] = None
+
+
+class SparseUserListResponse(UserListResponse):
+    users: List[SparseUserListItem]
+
+
 class RoleUpdateResponse(BaseModel):
     message: str
     user_id: str
@@ -58,3 +95,85 @@ class RoleUpdateResponse(BaseModel):
     updated_by: str
     metadata_updated: bool
     note: str
+
+
+class BulkRoleUpdateResult(BaseModel):
+    user_id: str
+    success: bool
+    old_role: Optional[str] = None
+    new_role: str
+    error: Optional[str] = None
+
+
+class BulkRoleUpdateResponse(BaseModel):
+    results: List[BulkRoleUpdateResult]
+    succeeded: int
+    failed: int
+    updated_by: str
+    note: str
+
+
+class BulkUserLookupResponse(BaseModel):
+    users: Dict[str, UserListItem]  # Keyed by canonical (lower-case) user ID
+    missing: List[str]  # Requested IDs with no profile (including malformed IDs)
+
+
+class ProfileChangesResponse(BaseModel):
+    users: List[UserListItem]  # In (updated_at, id) order
+    next_cursor: Optional[str] = None  # Store it and pass it back; unchanged when there is nothing new
+    has_more: bool
+
+
+class ImportRow(BaseModel):
+    """One CSV row of a bulk import (extra columns are ignored)"""
+    email: EmailStr
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    phone: Optional[str] = None
+    bio: Optional[str] = None
+    role: str = "user"  # Only applied to newly created users
+    password: Optional[str] = None  # Without one, the user signs in via password reset or magic link
+    
+    @field_validator('first_name', 'last_name', 'phone', 'bio', 'password', mode='before')
+    @classmethod
+    def empty_to_none(cls, v):
+        return v or None
+    
+    @field_validator('role', mode='before')
+    @classmethod
+    def validate_role(cls, v):
+        v = v or "user"
+        allowed_roles = ['user', 'admin']
+        if v not in allowed_roles:
+            raise ValueError(f'Role must be one of: {allowed_roles}')
+        return v
+
+
+class ImportRowResult(BaseModel):
+    row: int  # 1-based data row number (header excluded)
+    email: Optional[str] = None
+    status: str  # created (new user), updated (existing user, profile merged) or failed
+    user_id: Optional[str] = None
+    error: Optional[str] = None
+
+
+class BulkImportResponse(BaseModel):
+    results: List[ImportRowResult]
+    created: int
+    updated: int
+    failed: int
+
+
+class AuditEventItem(BaseModel):
+    id: int
+    occurred_at: datetime
+    actor_id: str
+    actor_role: str
+    action: str
+    target_id: Optional[str] = None
+    details: Optional[Dict[str, Any]] = None
+
+
+class AuditEventListResponse(BaseModel):
+    events: List[AuditEventItem]  # Newest first
+    next_cursor: Optional[str] = None  # Pass back as cursor for older events
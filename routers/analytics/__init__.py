@@ -0,0 +1 @@
+# Analytics package initialization
\ No newline at end of file
@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from dependencies.get_current_user import get_current_user
+from dependencies.rbac import require_analytics
+from utils.sessions import get_read_db
+from routers.analytics.schemas import AnalyticsOverview
+from routers.analytics.helpers import get_analytics_overview
+from utils.deadlines import DeadlineRoute, request_deadline
+from utils.serialization import FastJSONResponse
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/analytics",
+    tags=["Analytics"],
+    default_response_class=FastJSONResponse,
+    route_class=DeadlineRoute
+)
+
+
+@router.get("/overview", response_model=AnalyticsOverview)
+@request_deadline(5)
+async def analytics_overview(
+    days: int = Query(30, ge=1, le=366, description="Most recent UTC days of signups to return"),
+    current_user = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+    _rbac_check = Depends(require_analytics)
+):
+    """
+    Admin only: Signups per day, active/inactive totals and role distribution
+    
+    Served from aggregate tables and cached briefly, so it stays fast at any user count.
+    Role counts are rolled up every few minutes; see `roles_refreshed_at`.
+    """
+    return FastJSONResponse(await get_analytics_overview(db, days))
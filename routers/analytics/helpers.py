@@ -0,0 +1,85 @@
+"""
+Helper functions for analytics
+Reads the pre-aggregated tables only, so cost does not grow with the number of users
+"""
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import ANALYTICS_CACHE_TTL
+from models import ProfileDailyStats, RoleCount
+from routers.analytics.schemas import AnalyticsOverview, DailySignups, UserTotals
+
+logger = logging.getLogger(__name__)
+
+# days -> (monotonic expiry, response); at most one entry per allowed `days` value
+_overview_cache: Dict[int, Tuple[float, AnalyticsOverview]] = {}
+
+
+async def get_analytics_overview(db: AsyncSession, days: int = 30) -> AnalyticsOverview:
+    """
+    Signups per day, active/inactive totals and role distribution
+    
+    Totals are sums over profile_daily_stats (one row per signup day) and
+    roles come from the periodically rolled-up role_counts table. Results
+    are cached per worker for ANALYTICS_CACHE_TTL seconds.
+    
+    Args:
+        db: Database session
+        days: Number of most recent UTC days of signups to return, including today
+        
+    Returns:
+        AnalyticsOverview: Dashboard data
+        
+    Raises:
+        HTTPException: If the aggregates can't be read
+    """
+    cached = _overview_cache.get(days)
+    if cached is not None and cached[0] > time.monotonic():
+        return cached[1]
+    
+    now = datetime.now(timezone.utc)
+    first_day = now.date() - timedelta(days=days - 1)
+    
+    try:
+        result = await db.execute(
+            select(
+                func.coalesce(func.sum(ProfileDailyStats.signups), 0),
+                func.coalesce(func.sum(ProfileDailyStats.active), 0),
+                func.coalesce(func.sum(ProfileDailyStats.inactive), 0)
+            )
+        )
+        users, active, inactive = result.one()
+        
+        result = await db.execute(
+            select(ProfileDailyStats.day, ProfileDailyStats.signups)
+            .where(ProfileDailyStats.day >= first_day)
+        )
+        signups_by_day = dict(result.all())
+        
+        result = await db.execute(select(RoleCount.role, RoleCount.users, RoleCount.refreshed_at))
+        role_rows = result.all()
+    except Exception as e:
+        logger.error(f"Failed to read analytics aggregates: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to load analytics"
+        )
+    
+    overview = AnalyticsOverview.model_construct(
+        signups_per_day=[
+            DailySignups.model_construct(day=day, signups=signups_by_day.get(day, 0))
+            for day in (first_day + timedelta(days=offset) for offset in range(days))
+        ],
+        totals=UserTotals.model_construct(users=users, active=active, inactive=inactive),
+        roles={role: count for role, count, _ in role_rows},
+        roles_refreshed_at=min((refreshed_at for _, _, refreshed_at in role_rows), default=None),
+        generated_at=now
+    )
+    _overview_cache[days] = (time.monotonic() + ANALYTICS_CACHE_TTL, overview)
+    return overview
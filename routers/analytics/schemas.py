@@ -0,0 +1,22 @@
+from pydantic import BaseModel
+from typing import Dict, List, Optional
+from datetime import date, datetime
+
+
+class DailySignups(BaseModel):
+    day: date  # UTC
+    signups: int
+
+
+class UserTotals(BaseModel):
+    users: int
+    active: int
+    inactive: int
+
+
+class AnalyticsOverview(BaseModel):
+    signups_per_day: List[DailySignups]  # Oldest first, days without signups included
+    totals: UserTotals
+    roles: Dict[str, int]
+    roles_refreshed_at: Optional[datetime] = None  # Role counts are rolled up periodically
+    generated_at: datetime
@@ -1,8 +1,13 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.security import HTTPAuthorizationCredentials
 from pydantic import EmailStr, BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
 from routers.auth.schemas import UserSignup, UserLogin, RefreshTokenRequest, AuthResponse
-from routers.auth.helpers import create_auth_response, create_refresh_response, handle_auth_error, validate_token_refresh
-from config import supabase
+from routers.auth.helpers import create_auth_response, create_refresh_response, handle_auth_error, validate_token_refresh, revoke_session
+from dependencies.get_current_user import get_current_user, security
+from config import get_supabase
+from utils.sessions import get_db
+from utils.idempotency import IdempotentRoute, idempotent
 import logging
 
 logger = logging.getLogger(__name__)
@@ -10,21 +15,23 @@ logger = logging.getLogger(__name__)
 class PasswordReset(BaseModel):
     password: str
 
-auth_router = APIRouter(prefix="/auth", tags=["auth"])
+auth_router = APIRouter(prefix="/auth", tags=["auth"], route_class=IdempotentRoute)
 
 @auth_router.post("/signup")
+@idempotent()
 def signup(user: UserSignup):
-    result = supabase.auth.sign_up(
+    result = get_supabase().auth.sign_up(
         {"email": user.email, "password": user.password}
     )
 
     if result.user is None:
         raise HTTPException(status_code=400, detail="Signup failed")
 
-    supabase.table("profiles").insert({
+    get_supabase().table("profiles").insert({
         "id": result.user.id,
-        "username": user.username,
-        "email": user.email
+        "email": user.email,
+        "first_name": user.first_name,
+        "last_name": user.last_name
     }).execute()
 
     return {"message": "Check your email to confirm sign-up."}
@@ -32,7 +39,7 @@ def signup(user: UserSignup):
 @auth_router.post("/login", response_model=AuthResponse)
 def login(user: UserLogin):
     try:
-        result = supabase.auth.sign_in_with_password({
+        result = get_supabase().auth.sign_in_with_password({
             "email": user.email,
             "password": user.password
         })
@@ -59,7 +66,7 @@ def refresh_token(refresh_request: RefreshTokenRequest):
         if not validate_token_refresh(refresh_request.refresh_token):
             raise HTTPException(status_code=400, detail="Invalid refresh token format")
         
-        result = supabase.auth.refresh_session(refresh_request.refresh_token)
+        result = get_supabase().auth.refresh_session(refresh_request.refresh_token)
         
         if result.session is None:
             raise HTTPException(status_code=401, detail="Invalid refresh token")
@@ -74,16 +81,21 @@ def refresh_token(refresh_request: RefreshTokenRequest):
 
 
 @auth_router.post("/logout")
-def logout():
+async def logout(
+    current_user = Depends(get_current_user),
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_db)
+):
     """
-    Logout user (client should discard tokens)
+    Logout user: revoke the current access token and its Supabase session
     """
     try:
-        # Supabase doesn't require server-side logout for JWTs
-        # Client should discard both access and refresh tokens
-        logger.info("User logged out")
+        await revoke_session(db, current_user, credentials.credentials)
+        logger.info(f"User {current_user.user_id} logged out")
         return {"message": "Logged out successfully"}
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Logout failed: {str(e)}")
         raise HTTPException(status_code=400, detail=f"Logout failed: {str(e)}")
@@ -91,7 +103,7 @@ def logout():
 @auth_router.post("/forgot-password")
 def forgot_password(email: EmailStr):
     try:
-        supabase.auth.reset_password_email(email)
+        get_supabase().auth.reset_password_email(email)
         return {"message": "Check your email for reset instructions."}
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Failed to send reset email: {str(e)}")
@@ -101,7 +113,7 @@ def forgot_password(email: EmailStr):
 def reset_password(reset_data: PasswordReset, access_token: str = Query(...)):
     try:
         import jwt
-        from config import supabase_admin
+        from config import get_supabase_admin
         
         # Decode the JWT to get user ID
         decoded_token = jwt.decode(access_token, options={"verify_signature": False})
@@ -111,7 +123,7 @@ def reset_password(reset_data: PasswordReset, access_token: str = Query(...)):
             raise HTTPException(status_code=400, detail="Invalid token")
         
         # Update user password using admin client
-        update_result = supabase_admin.auth.admin.update_user_by_id(
+        update_result = get_supabase_admin().auth.admin.update_user_by_id(
             user_id, 
             {"password": reset_data.password}
         )
@@ -129,7 +141,7 @@ def reset_password(reset_data: PasswordReset, access_token: str = Query(...)):
 @auth_router.get("/confirm")
 def confirm_email(token_hash: str = Query(...), type: str = Query(...)):
     try:
-        result = supabase.auth.verify_otp({
+        result = get_supabase().auth.verify_otp({
             'token_hash': token_hash,
             'type': type
         })
@@ -145,7 +157,7 @@ def confirm_email(token_hash: str = Query(...), type: str = Query(...)):
 @auth_router.post("/resend-confirmation")
 def resend_confirmation(email: EmailStr):
     try:
-        result = supabase.auth.resend(type="signup", email=email)
+        result = get_supabase().auth.resend(type="signup", email=email)
         return {"message": "Confirmation email sent. Check your inbox."}
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Failed to resend confirmation: {str(e)}")
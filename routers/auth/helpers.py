@@ -5,8 +5,12 @@ Contains business logic for token management and user authentication
 import logging
 from typing import Dict, Any, Optional
 from fastapi import HTTPException, status
-from config import supabase
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from config import get_supabase, get_supabase_admin
 from routers.auth.schemas import AuthResponse
+from dependencies.principal import Principal
+from utils.revocation import revocation_store, token_expiry
 
 logger = logging.getLogger(__name__)
 
@@ -108,3 +112,33 @@ def validate_token_refresh(refresh_token: str) -> bool:
         return False
         
     return True
+
+
+async def revoke_session(db: AsyncSession, current_user: Principal, access_token: str) -> None:
+    """
+    Revoke the caller's session server-side
+    
+    The access token is rejected by every worker within one revocation sync
+    interval; Supabase is also asked to end the session so its refresh token
+    can't mint new access tokens.
+    
+    Args:
+        db: Database session
+        current_user: Current authenticated user from get_current_user
+        access_token: The bearer token being logged out
+        
+    Raises:
+        HTTPException: If the token carries no session ID or jti
+    """
+    token_id = current_user.token_id
+    if not token_id or current_user.exp is None:
+        raise HTTPException(status_code=400, detail="Token cannot be revoked: no session ID")
+    
+    await revocation_store.revoke(db, token_id, current_user.user_id, token_expiry(current_user.claims))
+    logger.info(f"Revoked session {token_id} for user {current_user.user_id}")
+    
+    try:
+        await run_in_threadpool(get_supabase_admin().auth.admin.sign_out, access_token, "local")
+    except Exception as e:
+        # The access token is already revoked locally; refresh tokens expire on their own
+        logger.warning(f"Supabase sign-out failed for user {current_user.user_id}: {str(e)}")
@@ -0,0 +1 @@
+# Batch package initialization
\ No newline at end of file
@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from dependencies.get_current_user import get_current_user
+from utils.sessions import get_read_db
+from routers.batch.schemas import BatchRequest, BatchResponse
+from routers.batch.helpers import execute_batch
+from utils.deadlines import DeadlineRoute, request_deadline
+from utils.serialization import FastJSONResponse
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    tags=["Batch"],
+    default_response_class=FastJSONResponse,
+    route_class=DeadlineRoute
+)
+
+
+@router.post("/batch", response_model=BatchResponse)
+@request_deadline(15)
+async def batch(
+    batch_request: BatchRequest,
+    request: Request,
+    current_user = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Run several read requests in one round trip
+
+    Supported: GET /users/me, /users/search, /admin/users and /admin/users/{user_id}.
+    The token is verified once; each sub-request still gets its route's permission
+    check and reports its own status, so one failure doesn't fail the batch.
+    """
+    return FastJSONResponse(await execute_batch(batch_request, current_user, request, db))
@@ -0,0 +1,192 @@
+"""
+Helper functions for batch requests
+Resolves sub-requests against a registry of batchable operations that reuse
+the same helpers and RBAC dependencies as the standalone routes
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Pattern
+from urllib.parse import parse_qsl, urlsplit
+
+from fastapi import HTTPException, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.routing import compile_path
+
+from config import get_session_factory
+from dependencies.principal import Principal
+from dependencies.rbac import require_user_management, require_user_search
+from routers.admin.helpers import get_paginated_users, get_user_by_id_admin
+from routers.batch.schemas import BatchRequest, BatchResponse, BatchSubRequest, BatchSubResponse
+from routers.users.helpers import create_user_response_data, get_or_create_user_profile, search_user_profiles
+from utils.serialization import parse_fields
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[Principal, AsyncSession, Dict[str, str], Dict[str, str]], Awaitable[Any]]
+
+
+class BatchOperation(NamedTuple):
+    method: str
+    path_regex: Pattern
+    handler: Handler
+    rbac: Optional[Callable[[Request], Any]]  # Same require_permission dependency as the route
+    shares_session: bool  # Read-only SQL: safe to run on the batch's shared session
+
+
+def _int_param(query: Dict[str, str], name: str, default: int) -> int:
+    try:
+        return int(query.get(name, default))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Query parameter {name} must be an integer"
+        )
+
+
+async def _get_me(principal: Principal, db: AsyncSession, path_params: Dict[str, str], query: Dict[str, str]):
+    fields = parse_fields(query.get("fields"))
+    profile = await get_or_create_user_profile(principal, db, fields)
+    return create_user_response_data(profile, principal, fields)
+
+
+async def _list_users(principal: Principal, db: AsyncSession, path_params: Dict[str, str], query: Dict[str, str]):
+    return await get_paginated_users(
+        db, _int_param(query, "page", 1), _int_param(query, "limit", 20), query.get("role"), parse_fields(query.get("fields"))
+    )
+
+
+async def _get_user(principal: Principal, db: AsyncSession, path_params: Dict[str, str], query: Dict[str, str]):
+    return await get_user_by_id_admin(path_params["user_id"], db, parse_fields(query.get("fields")))
+
+
+async def _search_users(principal: Principal, db: AsyncSession, path_params: Dict[str, str], query: Dict[str, str]):
+    q = query.get("q", "")
+    if not 2 <= len(q) <= 100:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Query parameter q must be 2-100 characters"
+        )
+    limit = _int_param(query, "limit", 20)
+    if not 1 <= limit <= 100:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Query parameter limit must be between 1 and 100"
+        )
+    include_inactive = query.get("include_inactive", "false").lower() in ("1", "true", "yes", "on")
+    return await search_user_profiles(db, q, limit, query.get("cursor"), include_inactive)
+
+
+def _operation(method: str, path: str, handler: Handler, rbac=None, shares_session: bool = True) -> BatchOperation:
+    path_regex, _, _ = compile_path(path)
+    return BatchOperation(method, path_regex, handler, rbac, shares_session)
+
+
+# Read endpoints that can be batched. /users/me may create the caller's
+# profile, so it gets its own session instead of committing the shared one.
+BATCH_OPERATIONS: List[BatchOperation] = [
+    _operation("GET", "/users/me", _get_me, shares_session=False),
+    _operation("GET", "/users/search", _search_users, require_user_search),
+    _operation("GET", "/admin/users", _list_users, require_user_management),
+    _operation("GET", "/admin/users/{user_id}", _get_user, require_user_management),
+]
+
+
+def _match(sub: BatchSubRequest):
+    """Find the operation for a sub-request; returns (operation, path, path params, query)"""
+    url = urlsplit(sub.path)
+    path = url.path.rstrip("/") or "/"
+    path_found = False
+    for operation in BATCH_OPERATIONS:
+        match = operation.path_regex.match(path)
+        if match is None:
+            continue
+        path_found = True
+        if operation.method == sub.method:
+            return operation, path, match.groupdict(), dict(parse_qsl(url.query))
+
+    if path_found:
+        raise HTTPException(status_code=status.HTTP_405_METHOD_NOT_ALLOWED, detail="Method not allowed in batch")
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Path not available in batch")
+
+
+def _authorize(operation: BatchOperation, method: str, path: str, principal: Principal) -> None:
+    """Run the route's RBAC dependency against a minimal request for the sub-request"""
+    if operation.rbac is None:
+        return
+    operation.rbac(Request({
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": b"",
+        "headers": [],
+        "state": {"current_user": principal},
+    }))
+
+
+async def _run(sub: BatchSubRequest, operation: BatchOperation, path_params, query, principal, db) -> BatchSubResponse:
+    try:
+        body = await operation.handler(principal, db, path_params, query)
+        return BatchSubResponse.model_construct(id=sub.id, status=status.HTTP_200_OK, body=body)
+    except HTTPException as e:
+        if e.status_code >= 500:
+            # Helpers wrap database errors in HTTPException(500); clear the aborted
+            # transaction so later sub-requests on a shared session still run
+            await db.rollback()
+        return BatchSubResponse.model_construct(id=sub.id, status=e.status_code, body={"detail": e.detail})
+    except Exception as e:
+        logger.error(f"Batch sub-request {sub.method} {sub.path} failed: {str(e)}")
+        await db.rollback()
+        return BatchSubResponse.model_construct(
+            id=sub.id, status=status.HTTP_500_INTERNAL_SERVER_ERROR, body={"detail": "Internal server error"}
+        )
+
+
+async def execute_batch(
+    batch: BatchRequest,
+    current_user: Principal,
+    request: Request,
+    db: AsyncSession
+) -> BatchResponse:
+    """
+    Execute sub-requests for an already authenticated caller
+
+    Each sub-request is authorized with its route's RBAC dependency. Those
+    whose operation only reads share `db` and run one after another on it
+    (a session can't run concurrent queries), alongside the rest, which run
+    concurrently on sessions of their own.
+
+    Args:
+        batch: Sub-requests to execute
+        current_user: Current authenticated user
+        request: The batch request (for replica read-your-writes routing)
+        db: Shared read session
+
+    Returns:
+        BatchResponse: One response per sub-request, in request order
+    """
+    responses: List[Optional[BatchSubResponse]] = [None] * len(batch.requests)
+    shared: List[tuple] = []
+    isolated: List[tuple] = []
+
+    for index, sub in enumerate(batch.requests):
+        try:
+            operation, path, path_params, query = _match(sub)
+            _authorize(operation, sub.method, path, current_user)
+        except HTTPException as e:
+            responses[index] = BatchSubResponse.model_construct(id=sub.id, status=e.status_code, body={"detail": e.detail})
+            continue
+        (shared if operation.shares_session else isolated).append((index, sub, operation, path_params, query))
+
+    async def run_shared():
+        for index, sub, operation, path_params, query in shared:
+            responses[index] = await _run(sub, operation, path_params, query, current_user, db)
+
+    async def run_isolated(index, sub, operation, path_params, query):
+        # Same session setup as get_read_db
+        async with get_session_factory()(info={"request": request, "replica_reads": True}) as own_db:
+            responses[index] = await _run(sub, operation, path_params, query, current_user, own_db)
+
+    await asyncio.gather(run_shared(), *(run_isolated(*item) for item in isolated))
+
+    logger.info(f"Batch by {current_user.user_id}: {len(batch.requests)} sub-requests, {len(shared)} on shared session")
+    return BatchResponse.model_construct(responses=responses)
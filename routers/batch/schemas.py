@@ -0,0 +1,27 @@
+from pydantic import BaseModel, Field, field_validator
+from typing import Any, List, Optional
+
+
+class BatchSubRequest(BaseModel):
+    id: Optional[str] = None  # Echoed back so the client can match responses
+    method: str = "GET"
+    path: str  # Same path (and query string) as the standalone request, e.g. "/admin/users/{id}"
+    
+    @field_validator('method')
+    @classmethod
+    def normalize_method(cls, v):
+        return v.upper()
+
+
+class BatchRequest(BaseModel):
+    requests: List[BatchSubRequest] = Field(..., min_length=1, max_length=20)
+
+
+class BatchSubResponse(BaseModel):
+    id: Optional[str] = None
+    status: int
+    body: Any = None
+
+
+class BatchResponse(BaseModel):
+    responses: List[BatchSubResponse]
@@ -0,0 +1 @@
+# Health package initialization
\ No newline at end of file
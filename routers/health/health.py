@@ -0,0 +1,46 @@
+from fastapi import APIRouter, status
+from fastapi.responses import JSONResponse
+from config import DATABASE_URL, get_async_engine
+from routers.health.schemas import HealthResponse, ReadinessResponse
+from utils.lifecycle import lifecycle, pool_status, probe_database
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["Health"])
+
+
+@router.get("/healthz", response_model=HealthResponse)
+async def healthz():
+    """Liveness probe: the process is up and serving requests"""
+    return {"status": "ok"}
+
+
+@router.get("/readyz", response_model=ReadinessResponse)
+async def readyz():
+    """
+    Readiness probe based on lifecycle and pool state (no database round trip)
+    
+    Returns 503 before startup completes, while draining for shutdown,
+    or while the database is unreachable. Only in that last case is a
+    SELECT 1 issued, so the probe can notice when the database is back.
+    """
+    if DATABASE_URL and lifecycle.started and not lifecycle.database_ready and not lifecycle.draining:
+        await probe_database(get_async_engine())
+    
+    if lifecycle.draining:
+        state = "draining"
+    elif lifecycle.ready or (lifecycle.started and not DATABASE_URL):
+        state = "ready"
+    else:
+        state = "not_ready"
+    
+    body = {
+        "status": state,
+        "in_flight": lifecycle.in_flight,
+        "pool": pool_status(get_async_engine()) if DATABASE_URL else None
+    }
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if state == "ready" else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content=body
+    )
@@ -0,0 +1 @@
+# Reports package initialization
\ No newline at end of file
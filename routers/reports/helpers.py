@@ -0,0 +1,480 @@
+"""
+Helper functions for report jobs
+Reports are generated in the background by a bounded per-worker queue and
+written to REPORTS_DIR as CSV; the API only submits, polls and downloads.
+Each worker heartbeats the jobs it holds, so jobs of a worker that crashed
+or was killed are failed by the others instead of staying active forever
+"""
+import asyncio
+import csv
+import io
+import logging
+import os
+import time
+import uuid
+from contextlib import suppress
+from datetime import timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import delete, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import (
+    REPORT_CHUNK_SIZE,
+    REPORT_HEARTBEAT_INTERVAL,
+    REPORT_MAX_ACTIVE_PER_ADMIN,
+    REPORT_QUEUE_SIZE,
+    REPORT_RETENTION_HOURS,
+    REPORT_STALE_AFTER,
+    REPORT_WORKERS,
+    REPORTS_DIR
+)
+from dependencies.principal import Principal
+from models import Profile, ReportJob, auth_user_role, auth_users
+from routers.reports.schemas import REPORT_TYPES, ReportJobListResponse, ReportJobResponse
+from utils.serialization import PROFILE_FIELDS
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ("queued", "running")
+PURGE_INTERVAL = 600  # Seconds between purges of expired reports
+REPORT_COLUMNS = PROFILE_FIELDS + ("role",)
+
+_report_base = (
+    select(*(Profile.__table__.c[field] for field in PROFILE_FIELDS), auth_user_role.label("role"))
+    .outerjoin(auth_users, auth_users.c.id == Profile.id)
+)
+REPORT_QUERIES = {
+    "users_by_role": _report_base.order_by(auth_user_role, Profile.email),
+    "inactive_users": _report_base.where(Profile.is_active.is_(False)).order_by(Profile.email),
+    "users_without_avatar": _report_base.where(
+        or_(Profile.avatar_url.is_(None), Profile.avatar_url == "")
+    ).order_by(Profile.email),
+}
+assert set(REPORT_QUERIES) == set(REPORT_TYPES)
+
+
+class ReportCancelled(Exception):
+    """Raised inside a running report once its job has been cancelled"""
+
+
+def _encode_csv(rows) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue().encode()
+
+
+async def _cancel_requested(job_id: uuid.UUID, session_factory) -> bool:
+    async with session_factory() as session:
+        job_status = await session.scalar(select(ReportJob.status).where(ReportJob.id == job_id))
+    return job_status != "running"
+
+
+async def generate_report(job_id: uuid.UUID, report_type: str, session_factory) -> Tuple[int, str]:
+    """
+    Stream a report query into a CSV file
+
+    Rows come from a server-side cursor REPORT_CHUNK_SIZE at a time and each
+    chunk is written before the next is fetched, so memory stays bounded.
+    The file only appears under its final name once complete; the job's
+    status is re-read after every chunk so a cancellation from any worker
+    stops it.
+
+    Args:
+        job_id: Job being run
+        report_type: Key of REPORT_QUERIES
+        session_factory: Used for the (replica-reading) report session
+
+    Returns:
+        Tuple[int, str]: Rows written and the file path
+
+    Raises:
+        ReportCancelled: If the job was cancelled while running
+    """
+    os.makedirs(REPORTS_DIR, exist_ok=True)
+    path = os.path.join(REPORTS_DIR, f"{job_id}.csv")
+    partial = path + ".part"
+    query = REPORT_QUERIES[report_type].execution_options(yield_per=REPORT_CHUNK_SIZE)
+
+    row_count = 0
+    completed = False
+    file = await asyncio.to_thread(open, partial, "wb")
+    try:
+        await asyncio.to_thread(file.write, _encode_csv([REPORT_COLUMNS]))
+        async with session_factory(info={"replica_reads": True}) as session:
+            result = await session.stream(query)
+            async for rows in result.partitions():
+                await asyncio.to_thread(file.write, _encode_csv(rows))
+                row_count += len(rows)
+                if await _cancel_requested(job_id, session_factory):
+                    raise ReportCancelled()
+        await asyncio.to_thread(file.close)
+        os.replace(partial, path)
+        completed = True
+    finally:
+        if not completed:
+            file.close()
+            with suppress(OSError):
+                os.remove(partial)
+    return row_count, path
+
+
+async def purge_expired_reports(session_factory) -> int:
+    """
+    Delete report files and jobs finished more than REPORT_RETENTION_HOURS ago
+
+    Returns:
+        int: Number of jobs deleted
+    """
+    async with session_factory() as session:
+        result = await session.execute(
+            delete(ReportJob)
+            .where(ReportJob.finished_at < func.now() - timedelta(hours=REPORT_RETENTION_HOURS))
+            .returning(ReportJob.file_path)
+        )
+        paths = [path for path in result.scalars() if path]
+        await session.commit()
+    for path in paths:
+        with suppress(OSError):
+            os.remove(path)
+    return len(paths)
+
+
+async def reap_stale_reports(session_factory) -> int:
+    """
+    Fail queued or running jobs whose heartbeat is older than REPORT_STALE_AFTER
+
+    Their worker stopped without running abandon() (crash, OOM kill), so
+    nothing would ever finish them.
+
+    Returns:
+        int: Number of jobs failed
+    """
+    async with session_factory() as session:
+        result = await session.execute(
+            update(ReportJob)
+            .where(
+                ReportJob.status.in_(ACTIVE_STATUSES),
+                ReportJob.heartbeat_at < func.now() - timedelta(seconds=REPORT_STALE_AFTER)
+            )
+            .values(status="failed", error="Report worker stopped before the report finished", finished_at=func.now())
+        )
+        await session.commit()
+    return result.rowcount
+
+
+class ReportRunner:
+    """Bounded queue of report jobs in this worker and the tasks that run them"""
+
+    def __init__(self, workers: int, queue_size: int):
+        self.workers = workers
+        self.queue_size = queue_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._running: Dict[uuid.UUID, asyncio.Task] = {}
+        self._owned: Set[uuid.UUID] = set()  # Queued or running here, failed on shutdown
+        self._last_purge: Optional[float] = None  # Monotonic time of the last purge
+
+    def start(self, session_factory) -> List[asyncio.Task]:
+        """Start the worker and heartbeat tasks; the lifespan cancels them on shutdown"""
+        self._queue = asyncio.Queue(self.queue_size)
+        tasks = [asyncio.create_task(self._work(session_factory)) for _ in range(self.workers)]
+        tasks.append(asyncio.create_task(self._heartbeat(session_factory)))
+        return tasks
+
+    def enqueue(self, job_id: uuid.UUID) -> bool:
+        """Queue a job; False when the queue is full (or not started)"""
+        if self._queue is None:
+            return False
+        try:
+            self._queue.put_nowait(job_id)
+        except asyncio.QueueFull:
+            return False
+        self._owned.add(job_id)
+        return True
+
+    def cancel(self, job_id: uuid.UUID) -> None:
+        """Stop a job right away if it runs in this worker (others notice between chunks)"""
+        task = self._running.get(job_id)
+        if task is not None:
+            task.cancel()
+
+    async def _heartbeat(self, session_factory) -> None:
+        """Keep the jobs held here fresh, fail stale ones left by dead workers and purge expired reports"""
+        while True:
+            try:
+                if self._owned:
+                    async with session_factory() as session:
+                        await session.execute(
+                            update(ReportJob)
+                            .where(ReportJob.id.in_(list(self._owned)), ReportJob.status.in_(ACTIVE_STATUSES))
+                            .values(heartbeat_at=func.now())
+                        )
+                        await session.commit()
+                reaped = await reap_stale_reports(session_factory)
+                if reaped:
+                    logger.warning(f"Failed {reaped} report jobs whose worker stopped heartbeating")
+                # On its own timer, so retention holds however busy the queue is
+                if self._last_purge is None or time.monotonic() - self._last_purge >= PURGE_INTERVAL:
+                    self._last_purge = time.monotonic()
+                    purged = await purge_expired_reports(session_factory)
+                    if purged:
+                        logger.info(f"Purged {purged} expired reports")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Report heartbeat failed: {str(e)}")
+            await asyncio.sleep(REPORT_HEARTBEAT_INTERVAL)
+
+    async def _work(self, session_factory) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id, session_factory)
+            except Exception as e:
+                logger.error(f"Report job {job_id} failed: {str(e)}")
+            self._owned.discard(job_id)
+
+    async def _run(self, job_id: uuid.UUID, session_factory) -> None:
+        async with session_factory() as session:
+            result = await session.execute(
+                update(ReportJob)
+                .where(ReportJob.id == job_id, ReportJob.status == "queued")
+                .values(status="running", started_at=func.now(), heartbeat_at=func.now())
+                .returning(ReportJob.report_type)
+            )
+            report_type = result.scalar_one_or_none()
+            await session.commit()
+        if report_type is None:
+            return  # Cancelled while queued
+
+        task = asyncio.create_task(generate_report(job_id, report_type, session_factory))
+        self._running[job_id] = task
+        path = None
+        try:
+            row_count, path = await task
+            values = {"status": "succeeded", "row_count": row_count, "file_path": path}
+        except asyncio.CancelledError:
+            if not task.cancelled() or asyncio.current_task().cancelling():
+                raise  # Shutting down, not a cancelled job
+            values = {"status": "cancelled"}
+        except ReportCancelled:
+            values = {"status": "cancelled"}
+        except Exception as e:
+            logger.error(f"Report {report_type} ({job_id}) failed: {str(e)}")
+            values = {"status": "failed", "error": "Report generation failed"}
+        finally:
+            self._running.pop(job_id, None)
+
+        async with session_factory() as session:
+            result = await session.execute(
+                update(ReportJob)
+                .where(ReportJob.id == job_id, ReportJob.status == "running")
+                .values(finished_at=func.now(), **values)
+            )
+            await session.commit()
+        if result.rowcount == 0 and path is not None:
+            # Cancelled just as it finished; nothing will ever serve the file
+            with suppress(OSError):
+                os.remove(path)
+        logger.info(f"Report {report_type} ({job_id}) {values['status']}")
+
+    async def abandon(self, session_factory) -> None:
+        """Mark jobs this worker still held as failed; called after its tasks are cancelled"""
+        if not self._owned:
+            return
+        async with session_factory() as session:
+            await session.execute(
+                update(ReportJob)
+                .where(ReportJob.id.in_(self._owned), ReportJob.status.in_(ACTIVE_STATUSES))
+                .values(status="failed", error="Server shut down before the report finished", finished_at=func.now())
+            )
+            await session.commit()
+        self._owned.clear()
+
+
+report_runner = ReportRunner(REPORT_WORKERS, REPORT_QUEUE_SIZE)
+
+
+def job_to_response(job: ReportJob) -> ReportJobResponse:
+    """Render a job for the API"""
+    return ReportJobResponse.model_construct(
+        id=str(job.id),
+        report_type=job.report_type,
+        status=job.status,
+        row_count=job.row_count,
+        error=job.error,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        download_url=f"/reports/{job.id}/download" if job.status == "succeeded" else None
+    )
+
+
+async def submit_report(report_type: str, current_user: Principal, db: AsyncSession) -> ReportJobResponse:
+    """
+    Create a report job and queue it in this worker
+
+    Args:
+        report_type: One of REPORT_TYPES
+        current_user: Current authenticated admin user
+        db: Database session
+
+    Returns:
+        ReportJobResponse: The queued job
+
+    Raises:
+        HTTPException: 429 if the admin already has REPORT_MAX_ACTIVE_PER_ADMIN
+            live reports queued or running, 503 if the queue is full
+    """
+    requested_by = uuid.UUID(current_user.user_id)
+    try:
+        # Serialize submissions per admin so the limit can't be raced
+        await db.execute(select(func.pg_advisory_xact_lock(func.hashtext(current_user.user_id))))
+        active = await db.scalar(
+            select(func.count())
+            .select_from(ReportJob)
+            .where(
+                ReportJob.requested_by == requested_by,
+                ReportJob.status.in_(ACTIVE_STATUSES),
+                # Stale jobs of a dead worker don't count until the reaper fails them
+                ReportJob.heartbeat_at >= func.now() - timedelta(seconds=REPORT_STALE_AFTER)
+            )
+        )
+        if active >= REPORT_MAX_ACTIVE_PER_ADMIN:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=f"At most {REPORT_MAX_ACTIVE_PER_ADMIN} reports can be queued or running at once"
+            )
+
+        job = ReportJob(report_type=report_type, requested_by=requested_by, status="queued")
+        db.add(job)
+        await db.commit()
+        await db.refresh(job)
+    except HTTPException:
+        await db.rollback()
+        raise
+    except Exception as e:
+        logger.error(f"Failed to create report job: {str(e)}")
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to create report job"
+        )
+
+    if not report_runner.enqueue(job.id):
+        job.status = "failed"
+        job.error = "Report queue is full"
+        job.finished_at = func.now()
+        await db.commit()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many reports are being generated, try again later"
+        )
+
+    logger.info(f"Report {report_type} ({job.id}) queued by {current_user.user_id}")
+    return job_to_response(job)
+
+
+async def list_report_jobs(current_user: Principal, db: AsyncSession, limit: int = 50) -> ReportJobListResponse:
+    """
+    The current admin's most recent report jobs
+
+    Args:
+        current_user: Current authenticated admin user
+        db: Database session
+        limit: Maximum number of jobs to return
+
+    Returns:
+        ReportJobListResponse: Jobs, newest first
+    """
+    result = await db.execute(
+        select(ReportJob)
+        .where(ReportJob.requested_by == uuid.UUID(current_user.user_id))
+        .order_by(ReportJob.created_at.desc())
+        .limit(limit)
+    )
+    return ReportJobListResponse.model_construct(jobs=[job_to_response(job) for job in result.scalars()])
+
+
+async def get_report_job(job_id: str, current_user: Principal, db: AsyncSession) -> ReportJob:
+    """
+    Load one of the current admin's report jobs
+
+    Args:
+        job_id: Job ID from the path
+        current_user: Current authenticated admin user
+        db: Database session
+
+    Returns:
+        ReportJob: The job
+
+    Raises:
+        HTTPException: 404 if the ID is invalid or the job belongs to someone else
+    """
+    try:
+        job_uuid = uuid.UUID(job_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Report not found")
+
+    job = await db.get(ReportJob, job_uuid)
+    if job is None or str(job.requested_by) != current_user.user_id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Report not found")
+    return job
+
+
+async def cancel_report_job(job_id: str, current_user: Principal, db: AsyncSession) -> ReportJobResponse:
+    """
+    Cancel a queued or running report
+
+    A queued job is skipped when dequeued. A running job stops at once if it
+    runs in this worker, otherwise after its current chunk.
+
+    Args:
+        job_id: Job ID from the path
+        current_user: Current authenticated admin user
+        db: Database session
+
+    Returns:
+        ReportJobResponse: The job after cancellation
+
+    Raises:
+        HTTPException: 404 if not found, 409 if the job already finished
+    """
+    job = await get_report_job(job_id, current_user, db)
+    result = await db.execute(
+        update(ReportJob)
+        .where(ReportJob.id == job.id, ReportJob.status.in_(ACTIVE_STATUSES))
+        .values(status="cancelled", finished_at=func.now())
+    )
+    await db.commit()
+    if result.rowcount == 0:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Report already {job.status}"
+        )
+
+    report_runner.cancel(job.id)
+    await db.refresh(job)
+    logger.info(f"Report {job.id} cancelled by {current_user.user_id}")
+    return job_to_response(job)
+
+
+def get_report_file(job: ReportJob) -> str:
+    """
+    Path of a finished report's CSV
+
+    Raises:
+        HTTPException: 409 if the report is not ready, 410 if its file is gone
+    """
+    if job.status != "succeeded":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Report is {job.status}"
+        )
+    if not job.file_path or not os.path.exists(job.file_path):
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Report file is no longer available"
+        )
+    return job.file_path
@@ -0,0 +1,98 @@
+from fastapi import APIRouter, Depends, status
+from fastapi.responses import FileResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from dependencies.get_current_user import get_current_user
+from dependencies.rbac import require_reports, require_reports_write
+from utils.sessions import get_db
+from routers.reports.schemas import ReportRequest, ReportJobResponse, ReportJobListResponse
+from routers.reports.helpers import (
+    submit_report,
+    list_report_jobs,
+    get_report_job,
+    cancel_report_job,
+    get_report_file,
+    job_to_response
+)
+from utils.deadlines import DeadlineRoute, request_deadline
+from utils.serialization import FastJSONResponse
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/reports",
+    tags=["Reports"],
+    default_response_class=FastJSONResponse,
+    route_class=DeadlineRoute
+)
+
+
+@router.post("", response_model=ReportJobResponse, status_code=status.HTTP_202_ACCEPTED)
+@request_deadline(5)
+async def create_report(
+    report_request: ReportRequest,
+    current_user = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    _rbac_check = Depends(require_reports_write)
+):
+    """
+    Admin only: Start generating a CSV report in the background
+    
+    Types: `users_by_role`, `inactive_users`, `users_without_avatar`. Poll
+    `GET /reports/{id}` until `status` is `succeeded`, then fetch `download_url`.
+    """
+    return FastJSONResponse(
+        await submit_report(report_request.report_type, current_user, db),
+        status_code=status.HTTP_202_ACCEPTED
+    )
+
+
+@router.get("", response_model=ReportJobListResponse)
+@request_deadline(5)
+async def list_reports(
+    current_user = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    _rbac_check = Depends(require_reports)
+):
+    """Admin only: Your most recent report jobs"""
+    return FastJSONResponse(await list_report_jobs(current_user, db))
+
+
+@router.get("/{job_id}", response_model=ReportJobResponse)
+@request_deadline(5)
+async def get_report(
+    job_id: str,
+    current_user = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    _rbac_check = Depends(require_reports)
+):
+    """Admin only: Status of one of your report jobs"""
+    return FastJSONResponse(job_to_response(await get_report_job(job_id, current_user, db)))
+
+
+@router.post("/{job_id}/cancel", response_model=ReportJobResponse)
+@request_deadline(5)
+async def cancel_report(
+    job_id: str,
+    current_user = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    _rbac_check = Depends(require_reports_write)
+):
+    """Admin only: Cancel a queued or running report"""
+    return FastJSONResponse(await cancel_report_job(job_id, current_user, db))
+
+
+@router.get("/{job_id}/download")
+async def download_report(
+    job_id: str,
+    current_user = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    _rbac_check = Depends(require_reports)
+):
+    """Admin only: Download a finished report as CSV"""
+    job = await get_report_job(job_id, current_user, db)
+    return FileResponse(
+        get_report_file(job),
+        media_type="text/csv",
+        filename=f"{job.report_type}-{job.finished_at:%Y%m%d-%H%M%S}.csv"
+    )
@@ -0,0 +1,32 @@
+from pydantic import BaseModel, field_validator
+from typing import List, Optional
+from datetime import datetime
+
+REPORT_TYPES = ("users_by_role", "inactive_users", "users_without_avatar")
+
+
+class ReportRequest(BaseModel):
+    report_type: str
+    
+    @field_validator('report_type')
+    @classmethod
+    def validate_report_type(cls, v):
+        if v not in REPORT_TYPES:
+            raise ValueError(f'Report type must be one of: {list(REPORT_TYPES)}')
+        return v
+
+
+class ReportJobResponse(BaseModel):
+    id: str
+    report_type: str
+    status: str  # queued, running, succeeded, failed or cancelled
+    row_count: Optional[int] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    download_url: Optional[str] = None  # Set once the report succeeded
+
+
+class ReportJobListResponse(BaseModel):
+    jobs: List[ReportJobResponse]  # Newest first
@@ -5,23 +5,30 @@ Contains business logic separated from route handlers for better maintainability
 import logging
 import uuid
 import os
-from datetime import datetime
-from typing import Dict, Any, Optional
-from fastapi import HTTPException, status, UploadFile
+from typing import Dict, Any, List, Optional, Tuple
+from fastapi import HTTPException, status, UploadFile, WebSocket
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, or_, and_, case, cast, Float
+from sqlalchemy.orm import load_only
 from sqlalchemy.sql import func
 
-from config import supabase, supabase_admin
-from models import Profile
-from routers.users.schemas import ProfileUpdate, UserProfileResponse
+from config import get_supabase, get_supabase_admin, get_session_factory, use_primary
+from dependencies.get_current_user import authenticate_token
+from dependencies.principal import Principal
+from models import Profile, auth_users, auth_user_role, profile_search_document
+from routers.users.schemas import ProfileUpdate, UserProfileResponse, UserSearchResponse
+from utils.outbox import enqueue_event
+from utils.pagination import encode_cursor, decode_cursor
+from utils.profile_push import profile_push_hub, encode_message, POLICY_VIOLATION
+from utils.serialization import profile_to_dict, profile_row_to_dict, profile_columns, PROFILE_FIELDS
 
 logger = logging.getLogger(__name__)
 
 
 async def get_or_create_user_profile(
-    current_user: Dict[str, Any], 
-    db: AsyncSession
+    current_user: Principal, 
+    db: AsyncSession,
+    fields: Optional[Tuple[str, ...]] = None
 ) -> Profile:
     """
     Get user profile from database or create if it doesn't exist
@@ -29,26 +36,36 @@ async def get_or_create_user_profile(
     Args:
         current_user: Current authenticated user info from JWT
         db: Database session
+        fields: Sparse fieldset; only the matching columns are loaded
         
     Returns:
         Profile: User profile object
     """
-    user_id = current_user["user_id"]
+    user_id = current_user.user_id
     
     # Get user profile
-    result = await db.execute(
-        select(Profile).where(Profile.id == user_id)
-    )
+    query = select(Profile).where(Profile.id == user_id)
+    if fields is not None:
+        query = query.options(load_only(*(getattr(Profile, column) for column in profile_columns(fields))))
+    result = await db.execute(query)
     profile = result.scalar_one_or_none()
     
+    if not profile and db.info.get("replica_reads"):
+        # The replica may not have a profile created moments ago yet;
+        # check the primary before creating one
+        use_primary(db)
+        result = await db.execute(query)
+        profile = result.scalar_one_or_none()
+    
     if not profile:
         # Create profile if it doesn't exist
         profile = Profile(
             id=user_id,
-            email=current_user["email"],
+            email=current_user.email,
             is_active=True
         )
         db.add(profile)
+        enqueue_event(db, "profile.created", user_id, {"user_id": str(user_id), "email": current_user.email})
         await db.commit()
         await db.refresh(profile)
         logger.info(f"Created new profile for user: {user_id}")
@@ -58,7 +75,8 @@ async def get_or_create_user_profile(
 
 def create_user_response_data(
     profile: Profile, 
-    current_user: Dict[str, Any]
+    current_user: Principal,
+    fields: Optional[Tuple[str, ...]] = None
 ) -> Dict[str, Any]:
     """
     Create user response data combining profile and JWT info
@@ -66,21 +84,17 @@ def create_user_response_data(
     Args:
         profile: User profile from database
         current_user: Current authenticated user info from JWT
+        fields: Sparse fieldset; None returns every field
         
     Returns:
         Dict: Combined user data for API response
     """
-    return {
-        **profile.__dict__,
-        "user_id": current_user["user_id"],
-        "email": current_user["email"],
-        "role": current_user["role"]
-    }
+    return profile_to_dict(profile, role=current_user.role, email=current_user.email, fields=fields)
 
 
 async def update_user_profile(
     profile_update: ProfileUpdate,
-    current_user: Dict[str, Any],
+    current_user: Principal,
     db: AsyncSession
 ) -> UserProfileResponse:
     """
@@ -107,14 +121,15 @@ async def update_user_profile(
         if update_data:
             for field, value in update_data.items():
                 setattr(profile, field, value)
+            enqueue_event(db, "profile.updated", profile.id, {"user_id": str(profile.id), "changes": update_data})
             
             await db.commit()
             await db.refresh(profile)
-            logger.info(f"Updated profile for user: {current_user['user_id']}")
+            logger.info(f"Updated profile for user: {current_user.user_id}")
         
-        # Create response data
+        # Create response data (trusted DB row, no re-validation needed)
         user_data = create_user_response_data(profile, current_user)
-        return UserProfileResponse.model_validate(user_data)
+        return UserProfileResponse.model_construct(**user_data)
         
     except Exception as e:
         logger.error(f"Error updating user profile: {str(e)}")
@@ -125,6 +140,53 @@ async def update_user_profile(
         )
 
 
+async def serve_profile_events(websocket: WebSocket) -> None:
+    """
+    Stream the caller's own profile over a WebSocket until they disconnect
+    
+    The token comes from the Authorization header or, for browsers (which
+    can't set headers on a WebSocket), the access_token query parameter. It
+    goes through the same checks as get_current_user. The current profile is
+    sent first, then every later change.
+    
+    Args:
+        websocket: Incoming, not yet accepted connection
+    """
+    authorization = websocket.headers.get("authorization", "")
+    token = authorization[7:] if authorization.lower().startswith("bearer ") else websocket.query_params.get("access_token")
+    if not token:
+        await websocket.close(code=POLICY_VIOLATION, reason="Not authenticated")
+        return
+    
+    try:
+        async with get_session_factory()() as db:
+            principal = await authenticate_token(token, db)
+    except HTTPException as e:
+        await websocket.close(code=POLICY_VIOLATION, reason=str(e.detail))
+        return
+    
+    await websocket.accept()
+    # Registered before the snapshot is read, so no change falls in between
+    profile_push_hub.register(websocket, principal)
+    try:
+        try:
+            async with get_session_factory()() as db:
+                profile = await get_or_create_user_profile(principal, db)
+                snapshot = create_user_response_data(profile, principal)
+        except HTTPException as e:
+            await websocket.close(code=status.WS_1011_INTERNAL_ERROR, reason=str(e.detail))
+            return
+        await websocket.send_text(encode_message("profile", snapshot))
+        
+        # Nothing is expected from the client; wait for it to go away
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+    except Exception:
+        pass  # Closed mid-send or by the sweep
+    finally:
+        profile_push_hub.unregister(websocket, principal)
+
+
 def validate_uploaded_file(file: UploadFile, file_content: bytes) -> None:
     """
     Validate uploaded file for size and type
@@ -195,7 +257,7 @@ async def delete_old_profile_image(avatar_url: str) -> None:
             old_filename = avatar_url.split('/')[-1]
         
         # Use admin client for deletion
-        supabase_admin.storage.from_("profile-images").remove([old_filename])
+        get_supabase_admin().storage.from_("profile-images").remove([old_filename])
         logger.info(f"Deleted old profile image: {old_filename}")
         
     except Exception as e:
@@ -225,7 +287,7 @@ async def upload_image_to_storage(
         logger.info(f"Attempting to upload file: {filename}")
         
         # Upload to Supabase storage
-        response = supabase.storage.from_("profile-images").upload(
+        response = get_supabase().storage.from_("profile-images").upload(
             path=filename,
             file=file_content,
             file_options={"content-type": content_type}
@@ -250,7 +312,7 @@ async def upload_image_to_storage(
             )
         
         # Get public URL
-        public_url = supabase.storage.from_("profile-images").get_public_url(filename)
+        public_url = get_supabase().storage.from_("profile-images").get_public_url(filename)
         logger.info(f"Generated public URL: {public_url}")
         
         return public_url
@@ -267,7 +329,7 @@ async def upload_image_to_storage(
 
 async def handle_profile_image_upload(
     file: UploadFile,
-    current_user: Dict[str, Any],
+    current_user: Principal,
     db: AsyncSession
 ) -> Dict[str, str]:
     """
@@ -293,7 +355,7 @@ async def handle_profile_image_upload(
         validate_uploaded_file(file, file_content)
         
         # Generate unique filename
-        unique_filename = generate_unique_filename(current_user["user_id"], file.filename)
+        unique_filename = generate_unique_filename(current_user.user_id, file.filename)
         
         # Delete old image if exists
         if profile.avatar_url:
@@ -308,7 +370,7 @@ async def handle_profile_image_upload(
         
         # Update profile with new avatar URL
         profile.avatar_url = public_url
-        profile.updated_at = datetime.utcnow()
+        enqueue_event(db, "profile.updated", profile.id, {"user_id": str(profile.id), "changes": {"avatar_url": public_url}})
         
         await db.commit()
         await db.refresh(profile)
@@ -358,7 +420,7 @@ async def delete_image_from_storage(filename: str) -> None:
     logger.info(f"Attempting to delete file: {filename}")
     
     # Use admin client for deletion to ensure permissions
-    response = supabase_admin.storage.from_("profile-images").remove([filename])
+    response = get_supabase_admin().storage.from_("profile-images").remove([filename])
     logger.info(f"Delete response: {response}")
     
     # Check if deletion was successful
@@ -368,7 +430,7 @@ async def delete_image_from_storage(filename: str) -> None:
 
 
 async def handle_profile_image_deletion(
-    current_user: Dict[str, Any],
+    current_user: Principal,
     db: AsyncSession
 ) -> Dict[str, str]:
     """
@@ -385,7 +447,7 @@ async def handle_profile_image_deletion(
         HTTPException: If user not found or deletion fails
     """
     try:
-        user_id = current_user["user_id"]
+        user_id = current_user.user_id
         
         # Get user profile
         result = await db.execute(
@@ -413,7 +475,7 @@ async def handle_profile_image_deletion(
             
             # Update profile
             profile.avatar_url = None
-            profile.updated_at = datetime.utcnow()
+            enqueue_event(db, "profile.updated", profile.id, {"user_id": str(profile.id), "changes": {"avatar_url": None}})
             
             await db.commit()
             
@@ -427,7 +489,7 @@ async def handle_profile_image_deletion(
             
             # Even if storage deletion fails, clear the URL from profile
             profile.avatar_url = None
-            profile.updated_at = datetime.utcnow()
+            enqueue_event(db, "profile.updated", profile.id, {"user_id": str(profile.id), "changes": {"avatar_url": None}})
             await db.commit()
             
             return {
@@ -448,58 +510,37 @@ async def handle_profile_image_deletion(
 async def get_all_user_profiles(
     db: AsyncSession,
     skip: int = 0,
-    limit: int = 100
-) -> list[UserProfileResponse]:
+    limit: int = 100,
+    fields: Optional[Tuple[str, ...]] = None
+) -> List[Dict[str, Any]]:
     """
     Get all user profiles for admin listing
     
+    Roles are read from auth.users in the same query (only when the fieldset
+    includes role), and only the requested profile columns are selected.
+    
     Args:
         db: Database session
         skip: Number of records to skip
         limit: Maximum number of records to return
+        fields: Sparse fieldset; None returns every field
         
     Returns:
-        List[UserProfileResponse]: List of user profiles
+        List[Dict]: Profile response data, ready for model_construct or orjson
         
     Raises:
         HTTPException: If listing fails
     """
     try:
-        # Get all profiles
-        result = await db.execute(
-            select(Profile).offset(skip).limit(limit)
-        )
-        profiles = result.scalars().all()
-        
-        # Get user roles from Supabase for each profile
-        users = []
-        for profile in profiles:
-            try:
-                # Get user from Supabase to fetch role
-                supabase_user = supabase_admin.auth.admin.get_user_by_id(str(profile.id))
-                user_role = "user"  # Default fallback
-                
-                if supabase_user.user and supabase_user.user.user_metadata:
-                    user_role = supabase_user.user.user_metadata.get("role", "user")
-                
-                user_data = {
-                    **profile.__dict__,
-                    "user_id": str(profile.id),
-                    "role": user_role
-                }
-                users.append(UserProfileResponse.model_validate(user_data))
-                
-            except Exception as role_error:
-                logger.warning(f"Failed to get role for user {profile.id}: {str(role_error)}")
-                # Fallback to default role if can't fetch from Supabase
-                user_data = {
-                    **profile.__dict__,
-                    "user_id": str(profile.id),
-                    "role": "user"
-                }
-                users.append(UserProfileResponse.model_validate(user_data))
-        
-        return users
+        columns = [Profile.__table__.c[column] for column in profile_columns(fields)]
+        query = select(*columns)
+        if fields is None or "role" in fields:
+            query = (
+                select(*columns, auth_user_role.label("role"))
+                .outerjoin(auth_users, auth_users.c.id == Profile.id)
+            )
+        result = await db.execute(query.offset(skip).limit(limit))
+        return [profile_row_to_dict(row, fields) for row in result.mappings()]
         
     except Exception as e:
         logger.error(f"Error listing users: {str(e)}")
@@ -530,7 +571,7 @@ async def update_user_role_via_admin_api(
     """
     try:
         # Update user metadata using Supabase Admin API
-        response = supabase_admin.auth.admin.update_user_by_id(
+        response = get_supabase_admin().auth.admin.update_user_by_id(
             uid=user_id,
             attributes={
                 "user_metadata": {
@@ -565,3 +606,108 @@ async def update_user_role_via_admin_api(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to update user role: {str(e)}"
         )
+
+
+def _escape_like(term: str) -> str:
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+async def search_user_profiles(
+    db: AsyncSession,
+    query: str,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    include_inactive: bool = False
+) -> UserSearchResponse:
+    """
+    Search profiles by email, first/last name and phone
+    
+    Matches substrings and near-misses (trigram word similarity) through the
+    ix_profiles_search_trgm index. Results are ranked with exact prefix matches
+    first and paginated by (score, id) keyset, so deep pages stay as cheap as the first.
+    
+    Args:
+        db: Database session
+        query: Search text
+        limit: Maximum number of results to return
+        cursor: Cursor from a previous page
+        include_inactive: Also return deactivated profiles
+        
+    Returns:
+        UserSearchResponse: Ranked matches and the cursor for the next page
+        
+    Raises:
+        HTTPException: If the cursor is invalid or the search fails
+    """
+    term = query.strip().lower()
+    prefix = _escape_like(term) + "%"
+    
+    score = cast(func.word_similarity(term, profile_search_document), Float) + case(
+        (
+            or_(
+                func.lower(Profile.email).like(prefix, escape="\\"),
+                func.lower(Profile.first_name).like(prefix, escape="\\"),
+                func.lower(Profile.last_name).like(prefix, escape="\\"),
+                Profile.phone.like(prefix, escape="\\")
+            ),
+            1.0
+        ),
+        else_=0.0
+    )
+    
+    matches = (
+        select(*(Profile.__table__.c[field] for field in PROFILE_FIELDS), score.label("score"))
+        .where(
+            or_(
+                profile_search_document.like(f"%{_escape_like(term)}%", escape="\\"),
+                profile_search_document.op("%>")(term)
+            )
+        )
+    )
+    if not include_inactive:
+        matches = matches.where(Profile.is_active.is_(True))
+    matches = matches.subquery()
+    
+    stmt = (
+        select(matches, auth_user_role.label("role"))
+        .outerjoin(auth_users, auth_users.c.id == matches.c.id)
+        .order_by(matches.c.score.desc(), matches.c.id)
+        .limit(limit + 1)
+    )
+    
+    if cursor:
+        last_score, last_id = decode_cursor(cursor, 2)
+        try:
+            last_id = uuid.UUID(last_id)
+            last_score = float(last_score)
+        except (TypeError, ValueError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+        stmt = stmt.where(
+            or_(
+                matches.c.score < last_score,
+                and_(matches.c.score == last_score, matches.c.id > last_id)
+            )
+        )
+    
+    try:
+        result = await db.execute(stmt)
+        rows = result.mappings().all()
+    except Exception as e:
+        logger.error(f"Error searching users: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to search users"
+        )
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["score"], rows[-1]["id"])
+    
+    return UserSearchResponse.model_construct(
+        users=[UserProfileResponse.model_construct(**profile_row_to_dict(row)) for row in rows],
+        next_cursor=next_cursor
+    )
@@ -37,6 +37,20 @@ class UserProfileResponse(BaseModel):
         from_attributes = True
 
 
+class SparseUserProfileResponse(UserProfileResponse):
+    """UserProfileResponse as sent with a `fields=` fieldset: any field but id may be left out"""
+    user_id: Optional[str] = None
+    email: Optional[str] = None
+    is_active: Optional[bool] = None
+    created_at: Optional[datetime] = None
+    role: Optional[str] = None
+
+
+
+class UserSearchResponse(BaseModel):
+    users: List[UserProfileResponse]
+    next_cursor: Optional[str] = None
+
 
 # Profile image upload response
 class ProfileImageUpload(BaseModel):
@@ -1,43 +1,70 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query, WebSocket
 from sqlalchemy.ext.asyncio import AsyncSession
 from dependencies.get_current_user import get_current_user
-from config import get_db
-from routers.users.schemas import ProfileUpdate, UserProfileResponse, ProfileImageUpload
+from dependencies.rbac import require_user_search
+from utils.sessions import get_db, get_read_db
+from routers.users.schemas import ProfileUpdate, UserProfileResponse, SparseUserProfileResponse, ProfileImageUpload, UserSearchResponse
 from routers.users.helpers import (
     get_or_create_user_profile,
     create_user_response_data,
     update_user_profile,
     handle_profile_image_upload,
-    handle_profile_image_deletion
+    handle_profile_image_deletion,
+    search_user_profiles,
+    serve_profile_events
 )
+from utils.deadlines import request_deadline
+from utils.idempotency import IdempotentRoute, idempotent
+from utils.serialization import FastJSONResponse, parse_fields
 from typing import Optional, Dict, Any
 import logging
 
 logger = logging.getLogger(__name__)
-users_router = APIRouter(prefix="/users", tags=["users"])
+users_router = APIRouter(
+    prefix="/users",
+    tags=["users"],
+    default_response_class=FastJSONResponse,
+    route_class=IdempotentRoute
+)
 
-@users_router.get("/me", response_model=UserProfileResponse)
+@users_router.get("/me", response_model=SparseUserProfileResponse)
+@request_deadline(5)
 async def get_current_user_profile(
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,email,role"),
     current_user = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """Get current user's profile using optimized JWT structure"""
-    profile = await get_or_create_user_profile(current_user, db)
-    user_data = create_user_response_data(profile, current_user)
-    return UserProfileResponse.model_validate(user_data)
+    """Get current user's profile using optimized JWT structure (only `fields` when given)"""
+    requested_fields = parse_fields(fields)
+    profile = await get_or_create_user_profile(current_user, db, requested_fields)
+    # Trusted DB row: render directly instead of validating against response_model again
+    return FastJSONResponse(create_user_response_data(profile, current_user, requested_fields))
 
 
 @users_router.put("/me", response_model=UserProfileResponse)
+@idempotent()
 async def update_current_user_profile(
     profile_update: ProfileUpdate,
     current_user = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """Update current user's profile information"""
-    return await update_user_profile(profile_update, current_user, db)
+    return FastJSONResponse(await update_user_profile(profile_update, current_user, db))
+
+
+@users_router.websocket("/me/events")
+async def profile_events(websocket: WebSocket):
+    """
+    Push the current user's profile whenever it changes (replaces polling GET /users/me)
+    
+    Authenticate with an `Authorization: Bearer` header or `?access_token=`. Each
+    message is `{"type": "profile", "data": {...}}`, starting with the current profile.
+    """
+    await serve_profile_events(websocket)
 
 
 @users_router.post("/me/profile-image", response_model=ProfileImageUpload)
+@idempotent()
 async def upload_profile_image(
     file: UploadFile = File(..., description="Profile image file (JPEG, PNG, GIF, or WebP, max 5MB)"),
     current_user = Depends(get_current_user),
@@ -65,3 +92,21 @@ async def delete_profile_image(
     """Delete current user's profile image"""
     return await handle_profile_image_deletion(current_user, db)
 
+
+@users_router.get("/search", response_model=UserSearchResponse)
+@request_deadline(5)
+async def search_users(
+    q: str = Query(..., min_length=2, max_length=100, description="Email, name or phone fragment"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    include_inactive: bool = False,
+    current_user = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+    _rbac_check = Depends(require_user_search)
+):
+    """
+    Admin only: Search users by email, name or phone
+    
+    Results are ranked by relevance; pass `next_cursor` back as `cursor` for the next page.
+    """
+    return FastJSONResponse(await search_user_profiles(db, q, limit, cursor, include_inactive))
@@ -0,0 +1,101 @@
+"""
+Shared fixtures for tests that run the app against a real PostgreSQL database
+
+Set TEST_DATABASE_URL to a disposable database to run them; locally they are
+skipped otherwise, but a CI run (CI set, as CI services do) refuses to start
+without it, so the query budgets can't silently go unchecked. Missing tables
+(and Supabase's auth.users) are created there, and every row a test inserts is
+deleted afterwards. Tests that don't need the database always run.
+"""
+import os
+import time
+import uuid
+
+import pytest
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+if TEST_DATABASE_URL:
+    # Read by config at import time, so set before the app is imported
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+    os.environ.setdefault("JWT_SECRET_KEY", "test-secret")
+
+requires_database = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+
+
+def pytest_configure(config):
+    if os.getenv("CI") and not TEST_DATABASE_URL:
+        raise pytest.UsageError("Set TEST_DATABASE_URL to a disposable PostgreSQL database; CI must run the database tests")
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+def make_token(user_id: str, role: str = "user") -> str:
+    """HS256 access token shaped like Supabase's"""
+    import jwt
+    from config import JWT_SECRET_KEY
+
+    payload = {
+        "sub": user_id,
+        "email": f"{user_id}@example.com",
+        "user_metadata": {"role": role},
+        "session_id": str(uuid.uuid4()),
+        "exp": int(time.time()) + 3600,
+    }
+    return jwt.encode(payload, JWT_SECRET_KEY, algorithm="HS256")
+
+
+def auth_headers(user_id: str, role: str = "user") -> dict:
+    return {"Authorization": f"Bearer {make_token(user_id, role)}"}
+
+
+@pytest.fixture
+async def client():
+    """httpx client calling the app in-process (the lifespan's background tasks are not started)"""
+    import httpx
+    from config import dispose_engines
+    from main import app
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http_client:
+        yield http_client
+    await dispose_engines()
+
+
+@pytest.fixture
+async def seed_users():
+    """Create profiles with matching auth.users rows; returns their IDs"""
+    from sqlalchemy import delete, insert
+    from config import Base, get_async_engine
+    from models import Profile, auth_users
+
+    engine = get_async_engine()
+    async with engine.begin() as conn:
+        await conn.exec_driver_sql("CREATE SCHEMA IF NOT EXISTS auth")
+        await conn.run_sync(lambda sync_conn: auth_users.metadata.create_all(sync_conn))
+        # user_roles references the RBAC tables, which only the migrations create
+        tables = [table for name, table in Base.metadata.tables.items() if name != "user_roles"]
+        await conn.run_sync(lambda sync_conn: Base.metadata.create_all(sync_conn, tables=tables))
+
+    created = []
+
+    async def seed(count: int, role: str = "user") -> list:
+        ids = [uuid.uuid4() for _ in range(count)]
+        async with engine.begin() as conn:
+            await conn.execute(insert(auth_users), [
+                {"id": user_id, "email": f"{user_id}@example.com", "raw_user_meta_data": {"role": role}}
+                for user_id in ids
+            ])
+            await conn.execute(insert(Profile), [
+                {"id": user_id, "email": f"{user_id}@example.com", "first_name": "Test", "is_active": True}
+                for user_id in ids
+            ])
+        created.extend(ids)
+        return [str(user_id) for user_id in ids]
+
+    yield seed
+
+    async with engine.begin() as conn:
+        await conn.execute(delete(Profile).where(Profile.id.in_(created)))
+        await conn.execute(delete(auth_users).where(auth_users.c.id.in_(created)))
@@ -0,0 +1,35 @@
+"""statement_timeout handling for sessions with and without a request deadline"""
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import config
+import utils.deadlines
+from tests.conftest import TEST_DATABASE_URL, requires_database
+
+pytestmark = [requires_database, pytest.mark.anyio]
+
+
+@pytest.fixture
+async def short_timeout_engine(monkeypatch):
+    """Primary engine whose connections start with a 200ms statement_timeout"""
+    engine = create_async_engine(
+        config.asyncpg_database_url(TEST_DATABASE_URL),
+        connect_args={"server_settings": {"statement_timeout": "200"}}
+    )
+    monkeypatch.setattr(config, "_async_engine", engine)
+    monkeypatch.setattr(utils.deadlines, "DB_STATEMENT_TIMEOUT", 0.2)
+    yield engine
+    await engine.dispose()
+
+
+async def test_connection_default_applies_outside_sessions(short_timeout_engine):
+    async with short_timeout_engine.connect() as conn:
+        with pytest.raises(DBAPIError):
+            await conn.execute(text("SELECT pg_sleep(0.5)"))
+
+
+async def test_session_without_deadline_runs_past_connection_default(short_timeout_engine):
+    async with config.get_session_factory()() as session:
+        assert (await session.execute(text("SELECT 1 FROM pg_sleep(0.5)"))).scalar() == 1
@@ -0,0 +1,145 @@
+"""Idempotency-Key handling, against the in-process stores (no database needed)"""
+import asyncio
+
+import httpx
+import pytest
+from fastapi import APIRouter, FastAPI, HTTPException
+
+import utils.idempotency
+from dependencies.principal import Principal
+from utils.idempotency import (
+    IDEMPOTENCY_HEADER,
+    MAX_KEY_LENGTH,
+    IdempotencyRecord,
+    IdempotentRoute,
+    KeyValueIdempotencyStore,
+    LocalKeyValue,
+    MemoryIdempotencyStore,
+    idempotent
+)
+
+pytestmark = pytest.mark.anyio
+
+
+class Endpoint:
+    """Counts calls; a call can be held at a gate and made to fail"""
+
+    def __init__(self):
+        self.calls = 0
+        self.gate = None
+        self.fail_next = False
+
+    async def __call__(self, payload: dict):
+        self.calls += 1
+        if self.gate is not None:
+            gate, self.gate = self.gate, None
+            await gate.wait()
+        if self.fail_next:
+            self.fail_next = False
+            raise HTTPException(status_code=503, detail="Upstream unavailable")
+        return {"call": self.calls, "payload": payload}
+
+
+@pytest.fixture
+def endpoint(monkeypatch):
+    monkeypatch.setattr(utils.idempotency, "idempotency_store", MemoryIdempotencyStore(100))
+    return Endpoint()
+
+
+@pytest.fixture
+async def client(endpoint):
+    router = APIRouter(route_class=IdempotentRoute)
+
+    @router.post("/items")
+    @idempotent()
+    async def create_item(payload: dict):
+        return await endpoint(payload)
+
+    app = FastAPI()
+    app.include_router(router)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http_client:
+        yield http_client
+
+
+def key(value: str = "key-1") -> dict:
+    return {IDEMPOTENCY_HEADER: value}
+
+
+async def test_retry_replays_stored_response(client, endpoint):
+    first = await client.post("/items", json={"name": "a"}, headers=key())
+    retry = await client.post("/items", json={"name": "a"}, headers=key())
+
+    assert endpoint.calls == 1
+    assert retry.status_code == first.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers["idempotent-replayed"] == "true"
+
+
+async def test_key_reused_with_different_body_is_rejected(client, endpoint, monkeypatch):
+    caller = Principal("user-1", "user-1@example.com", "user")
+    monkeypatch.setattr(utils.idempotency, "peek_principal", lambda token: caller)
+    headers = {**key(), "Authorization": "Bearer token"}
+    await client.post("/items", json={"name": "a"}, headers=headers)
+    response = await client.post("/items", json={"name": "b"}, headers=headers)
+
+    assert response.status_code == 422
+    assert endpoint.calls == 1
+
+
+async def test_anonymous_key_is_scoped_by_body(client, endpoint):
+    await client.post("/items", json={"name": "a"}, headers=key())
+    response = await client.post("/items", json={"name": "b"}, headers=key())
+
+    assert response.status_code == 200
+    assert response.json()["payload"] == {"name": "b"}
+    assert endpoint.calls == 2
+
+
+async def test_waiting_duplicate_runs_after_first_request_fails(client, endpoint):
+    gate = endpoint.gate = asyncio.Event()
+    endpoint.fail_next = True
+    first = asyncio.create_task(client.post("/items", json={"name": "a"}, headers=key()))
+    await asyncio.sleep(0.05)
+    duplicate = asyncio.create_task(client.post("/items", json={"name": "a"}, headers=key()))
+    await asyncio.sleep(0.05)
+    assert endpoint.calls == 1  # The duplicate waits instead of running
+
+    gate.set()
+    assert (await first).status_code == 503
+    response = await duplicate
+    assert response.status_code == 200
+    assert response.json()["call"] == 2
+    assert "idempotent-replayed" not in response.headers
+
+
+async def test_over_length_key_is_rejected(client, endpoint):
+    response = await client.post("/items", json={"name": "a"}, headers=key("k" * (MAX_KEY_LENGTH + 1)))
+
+    assert response.status_code == 400
+    assert endpoint.calls == 0
+
+
+@pytest.fixture(params=["memory", "kv"])
+def store(request):
+    if request.param == "memory":
+        return MemoryIdempotencyStore(100)
+    return KeyValueIdempotencyStore(LocalKeyValue(100), poll_interval=0.01)
+
+
+async def test_in_flight_lock_expires(store):
+    assert await store.reserve("k", "fp", lock_ttl=0.05) is None
+    assert (await store.reserve("k", "fp", lock_ttl=0.05)).response is None  # Still held
+    await asyncio.sleep(0.1)
+
+    # The owner never completed or released it; the lock ran out and the key is free again
+    assert await store.wait("k", timeout=0.01) is None
+    assert await store.reserve("k", "fp", lock_ttl=0.05) is None
+
+
+async def test_completed_record_outlives_lock(store):
+    record = IdempotencyRecord("fp", utils.idempotency.StoredResponse(201, [("x-a", "1")], b"{}"))
+    assert await store.reserve("k", "fp", lock_ttl=0.05) is None
+    await store.complete("k", record, ttl=60)
+    await asyncio.sleep(0.1)
+
+    assert await store.reserve("k", "fp", lock_ttl=0.05) == record
@@ -0,0 +1,11 @@
+"""Principal construction from Supabase JWT payloads"""
+from dependencies.principal import Principal
+
+
+def test_null_role_claim_falls_back_to_user():
+    principal = Principal.from_payload({"sub": "u1", "user_metadata": {"role": None}, "exp": 1})
+    assert principal.role == "user"
+
+
+def test_missing_user_metadata_falls_back_to_user():
+    assert Principal.from_payload({"sub": "u1", "exp": 1}).role == "user"
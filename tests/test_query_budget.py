@@ -0,0 +1,56 @@
+"""
+Query budgets for the hot read endpoints
+
+Each endpoint must issue a fixed number of statements whatever the number of
+rows it returns, so a per-row lookup (N+1) creeping back in fails here.
+Budgets include the SET LOCAL statement_timeout a request's transaction starts
+with when its deadline differs from DB_STATEMENT_TIMEOUT (see utils/deadlines.py).
+"""
+import pytest
+
+import utils.deadlines
+from tests.conftest import auth_headers, requires_database
+from utils.instrumentation import assert_query_budget
+
+pytestmark = [requires_database, pytest.mark.anyio]
+
+
+async def test_admin_user_list_is_constant_in_page_size(client, seed_users):
+    admin_id, = await seed_users(1, role="admin")
+    await seed_users(40)
+    headers = auth_headers(admin_id, "admin")
+
+    # Timeout, count and one profiles/auth.users join, with no upstream role lookups
+    for limit in (5, 40):
+        with assert_query_budget(3, max_http_calls=0):
+            response = await client.get(f"/admin/users?limit={limit}", headers=headers)
+        assert response.status_code == 200
+        assert len(response.json()["users"]) == limit
+
+
+async def test_admin_user_by_id_resolves_role_in_query(client, seed_users):
+    admin_id, user_id = await seed_users(2, role="admin")
+
+    with assert_query_budget(2, max_http_calls=0):
+        response = await client.get(f"/admin/users/{user_id}", headers=auth_headers(admin_id, "admin"))
+    assert response.status_code == 200
+    assert response.json()["role"] == "admin"
+
+
+async def test_current_user_profile_is_one_query(client, seed_users):
+    user_id, = await seed_users(1)
+
+    with assert_query_budget(2, max_http_calls=0):
+        response = await client.get("/users/me", headers=auth_headers(user_id))
+    assert response.status_code == 200
+    assert response.json()["id"] == user_id
+
+
+async def test_statement_timeout_skipped_when_connection_default_fits(client, seed_users, monkeypatch):
+    user_id, = await seed_users(1)
+    # GET /users/me has a 5s deadline
+    monkeypatch.setattr(utils.deadlines, "DB_STATEMENT_TIMEOUT", 5)
+
+    with assert_query_budget(1, max_http_calls=0):
+        response = await client.get("/users/me", headers=auth_headers(user_id))
+    assert response.status_code == 200
@@ -0,0 +1,139 @@
+"""Token revocation: bloom filter, confirmed-lookup cache and table sync"""
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import utils.revocation
+from tests.conftest import requires_database
+from utils.revocation import BloomFilter, RevocationStore
+
+
+class CountingSession:
+    """Stand-in session answering the revoked_tokens lookup and counting queries"""
+
+    def __init__(self, revoked: bool):
+        self.revoked = revoked
+        self.queries = 0
+
+    async def scalar(self, statement):
+        self.queries += 1
+        return "token" if self.revoked else None
+
+    async def execute(self, statement):
+        pass
+
+    async def commit(self):
+        pass
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(1000)
+    keys = [str(uuid.uuid4()) for _ in range(1000)]
+    for key in keys:
+        bloom.add(key)
+
+    assert all(key in bloom for key in keys)
+    false_positives = sum(str(uuid.uuid4()) in bloom for _ in range(10_000))
+    assert false_positives < 500  # Sized for 1%; well under 5% at capacity
+
+
+def test_bloom_filter_grows_past_capacity_without_false_negatives():
+    bloom = BloomFilter(10)
+    keys = [str(uuid.uuid4()) for _ in range(200)]
+    for key in keys:
+        bloom.add(key)
+
+    assert all(key in bloom for key in keys)
+
+
+@pytest.mark.anyio
+async def test_confirmed_lookups_are_cached():
+    store = RevocationStore(100)
+    db = CountingSession(revoked=False)
+
+    assert await store.is_revoked("token", db) is False
+    assert await store.is_revoked("token", db) is False
+    assert db.queries == 1
+
+
+@pytest.mark.anyio
+async def test_revoke_overrides_cached_false_positive():
+    store = RevocationStore(100)
+    db = CountingSession(revoked=False)
+    await store.is_revoked("token", db)
+
+    await store.revoke(db, "token", str(uuid.uuid4()), datetime.now(timezone.utc) + timedelta(hours=1))
+    db.revoked = True
+
+    assert store.might_be_revoked("token")
+    assert await store.is_revoked("token", db) is True
+    assert db.queries == 2
+
+
+@pytest.fixture
+async def revoked_tokens():
+    """revoked_tokens table on the test database; returns a function inserting rows"""
+    from sqlalchemy import delete, insert
+    from config import dispose_engines, get_async_engine
+    from models import RevokedToken
+
+    engine = get_async_engine()
+    async with engine.begin() as conn:
+        await conn.run_sync(lambda sync_conn: RevokedToken.__table__.create(sync_conn, checkfirst=True))
+
+    created = []
+
+    async def revoke(expires_in: timedelta = timedelta(hours=1)) -> str:
+        token_id = str(uuid.uuid4())
+        async with engine.begin() as conn:
+            await conn.execute(insert(RevokedToken).values(
+                token_id=token_id, user_id=uuid.uuid4(), expires_at=datetime.now(timezone.utc) + expires_in
+            ))
+        created.append(token_id)
+        return token_id
+
+    yield revoke
+
+    async with engine.begin() as conn:
+        await conn.execute(delete(RevokedToken).where(RevokedToken.token_id.in_(created)))
+    await dispose_engines()
+
+
+@requires_database
+@pytest.mark.anyio
+async def test_sync_picks_up_new_revocations(revoked_tokens, monkeypatch):
+    from config import get_session_factory
+
+    store = RevocationStore(100)
+    before = await revoked_tokens()
+    monkeypatch.setattr(utils.revocation, "REVOCATION_REBUILD_INTERVAL", 0)
+    await store.sync(get_session_factory())  # Rebuild
+    assert store.might_be_revoked(before)
+
+    after = await revoked_tokens()
+    assert not store.might_be_revoked(after)
+    monkeypatch.setattr(utils.revocation, "REVOCATION_REBUILD_INTERVAL", 3600)
+    await store.sync(get_session_factory())  # Incremental, from the watermark
+    assert store.might_be_revoked(after)
+
+
+@requires_database
+@pytest.mark.anyio
+async def test_rebuild_purges_expired_revocations(revoked_tokens, monkeypatch):
+    from sqlalchemy import func, select
+    from config import get_session_factory
+    from models import RevokedToken
+
+    store = RevocationStore(100)
+    expired = await revoked_tokens(expires_in=timedelta(seconds=-1))
+    live = await revoked_tokens()
+    monkeypatch.setattr(utils.revocation, "REVOCATION_REBUILD_INTERVAL", 0)
+    await store.sync(get_session_factory())
+
+    assert store.might_be_revoked(live)
+    async with get_session_factory()() as session:
+        remaining = await session.scalar(
+            select(func.count()).select_from(RevokedToken).where(RevokedToken.token_id == expired)
+        )
+    assert remaining == 0
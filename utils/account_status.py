@@ -0,0 +1,68 @@
+"""
+Deactivated-account enforcement without a query per request
+
+Each worker holds the IDs of every profile with is_active = false. The set
+is loaded when the notification listener connects and kept current by the
+profiles trigger from migration 95872b5e2485, which NOTIFYs on every
+is_active change whatever path made it (API, SQL, Supabase dashboard).
+"""
+from typing import List, Optional, Set
+
+from sqlalchemy import select
+
+from models import Profile
+from utils.notifications import notification_listener
+
+PROFILE_STATUS_CHANNEL = "profile_status"
+
+
+class DeactivatedUsers:
+    """Per-worker set of deactivated user IDs, checked by get_current_user"""
+
+    def __init__(self):
+        # Plain str IDs so the per-request check is one hash lookup with no
+        # conversion; see benchmarks/bench_account_status.py for memory use
+        self._ids: Set[str] = set()
+        self._replay: Optional[List[str]] = None  # Notifications received during a load
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._ids
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def handle_notification(self, payload: str) -> None:
+        """Apply an is_active change from the trigger ("user_id:true" or "user_id:false")"""
+        user_id, is_active = payload.split(":")
+        if self._replay is not None:
+            self._replay.append(payload)
+        if is_active == "true":
+            self._ids.discard(user_id)
+        else:
+            self._ids.add(user_id)
+
+    async def load(self, session_factory) -> int:
+        """
+        Replace the set with every inactive profile (served by ix_profiles_inactive)
+
+        Returns:
+            int: Number of deactivated users
+        """
+        self._replay = []
+        try:
+            async with session_factory() as session:
+                result = await session.stream_scalars(
+                    select(Profile.id).where(Profile.is_active.is_(False)).execution_options(yield_per=10_000)
+                )
+                ids = {str(user_id) async for user_id in result}
+            # The snapshot may predate changes that arrived while it streamed
+            self._ids, replay = ids, self._replay
+        finally:
+            self._replay = None
+        for payload in replay:
+            self.handle_notification(payload)
+        return len(self._ids)
+
+
+deactivated_users = DeactivatedUsers()
+notification_listener.subscribe(PROFILE_STATUS_CHANNEL, deactivated_users.handle_notification, deactivated_users.load)
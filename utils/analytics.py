@@ -0,0 +1,61 @@
+"""
+Background roll-up for analytics aggregates that triggers can't maintain
+
+Signup and active/inactive counts are kept by triggers on profiles (see
+ProfileDailyStats). Roles live in Supabase's auth.users, so role_counts is
+recomputed every ANALYTICS_ROLLUP_INTERVAL instead. Every worker runs the
+loop, but an advisory lock plus the refreshed_at check mean one worker does
+the scan per interval.
+"""
+import asyncio
+import logging
+from datetime import timedelta
+
+from sqlalchemy import delete, func, insert, select
+
+from models import RoleCount, auth_user_role, auth_users
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_LOCK_KEY = 0x616E616C  # pg_advisory lock key shared by every worker
+
+
+async def refresh_role_counts(session_factory, interval: float) -> bool:
+    """
+    Recount users per role unless another worker did so within `interval`
+
+    Returns:
+        bool: Whether this call refreshed the table
+    """
+    async with session_factory() as session:
+        locked = await session.scalar(select(func.pg_try_advisory_xact_lock(ROLLUP_LOCK_KEY)))
+        if not locked:
+            return False
+        fresh = await session.scalar(
+            select(func.max(RoleCount.refreshed_at) > func.now() - timedelta(seconds=interval))
+        )
+        if fresh:
+            return False
+
+        role = auth_user_role.label("role")
+        result = await session.execute(select(role, func.count()).select_from(auth_users).group_by(role))
+        counts = [{"role": role, "users": users} for role, users in result.all()]
+
+        await session.execute(delete(RoleCount))
+        if counts:
+            await session.execute(insert(RoleCount), counts)
+        await session.commit()
+        return True
+
+
+async def run_analytics_rollup(session_factory, interval: float) -> None:
+    """Background loop started from the lifespan; errors are logged and retried"""
+    while True:
+        try:
+            if await refresh_role_counts(session_factory, interval):
+                logger.info("Role counts rolled up")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Analytics roll-up failed: {str(e)}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,108 @@
+"""
+Audit log for admin actions, written off the request path
+
+record() only appends to an in-memory ring buffer, so auditing adds no
+database round trip to the action itself. A background task per worker
+writes the buffer to audit_events in multi-row inserts once
+AUDIT_FLUSH_SIZE events are waiting or AUDIT_FLUSH_INTERVAL has passed, and
+the lifespan flushes what is left on shutdown (best effort: a crash loses
+the last few seconds, and a full buffer drops its oldest events).
+"""
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional
+
+from sqlalchemy import insert
+
+from config import AUDIT_BUFFER_SIZE, AUDIT_FLUSH_INTERVAL, AUDIT_FLUSH_SIZE
+from dependencies.principal import Principal
+from models import AuditEvent
+
+logger = logging.getLogger(__name__)
+
+
+class AuditLog:
+    """Per-worker buffer of audit events and its flusher"""
+
+    def __init__(self, buffer_size: int, flush_size: int):
+        self.flush_size = flush_size
+        self._buffer: Deque[Dict[str, Any]] = deque(maxlen=buffer_size)
+        self._wake = asyncio.Event()
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def record(self, actor: Principal, action: str, target_id: Optional[str] = None, **details: Any) -> None:
+        """
+        Buffer an audit event
+
+        Args:
+            actor: Principal that performed the action
+            action: Dotted action name, e.g. "user.role_updated"
+            target_id: User the action applied to, if any
+            **details: JSON-serializable context (old/new values, counts, ...)
+        """
+        if len(self._buffer) == self._buffer.maxlen:
+            self.dropped += 1
+            if self.dropped % 1000 == 1:
+                logger.warning(f"Audit buffer full, {self.dropped} events dropped so far")
+        self._buffer.append({
+            "occurred_at": datetime.now(timezone.utc),
+            "actor_id": actor.user_id,
+            "actor_role": actor.role,
+            "action": action,
+            "target_id": str(target_id) if target_id is not None else None,
+            "details": details or None,
+        })
+        if len(self._buffer) >= self.flush_size:
+            self._wake.set()
+
+    async def flush(self, session_factory) -> int:
+        """
+        Write every buffered event, AUDIT_FLUSH_SIZE rows per insert
+
+        A batch that fails to write goes back to the front of the buffer (as
+        much of it as fits) and the error is raised.
+
+        Returns:
+            int: Number of events written
+        """
+        written = 0
+        while self._buffer:
+            batch: List[Dict[str, Any]] = [
+                self._buffer.popleft() for _ in range(min(self.flush_size, len(self._buffer)))
+            ]
+            try:
+                async with session_factory() as session:
+                    await session.execute(insert(AuditEvent), batch)
+                    await session.commit()
+            except BaseException:
+                # Also on cancellation, so a flush interrupted by shutdown loses nothing
+                space = self._buffer.maxlen - len(self._buffer)
+                requeue = batch[-space:] if space else []
+                self._buffer.extendleft(reversed(requeue))
+                self.dropped += len(batch) - len(requeue)
+                raise
+            written += len(batch)
+        return written
+
+    async def run(self, session_factory, interval: float) -> None:
+        """Background loop started from the lifespan; errors are logged and retried"""
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush(session_factory)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Audit flush failed, {len(self._buffer)} events buffered: {str(e)}")
+
+
+audit_log = AuditLog(AUDIT_BUFFER_SIZE, AUDIT_FLUSH_SIZE)
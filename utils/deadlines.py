@@ -0,0 +1,163 @@
+"""
+Per-request deadlines
+A route's time budget is applied as a Postgres statement_timeout when a session
+begins a transaction (unless the connection's DB_STATEMENT_TIMEOUT already fits
+it), caps the timeouts of outgoing Supabase HTTP calls, and cancels the handler
+with 504 once exhausted so it stops holding connections
+"""
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, Optional
+
+import anyio
+import httpx
+from asyncpg.exceptions import QueryCanceledError
+from fastapi import status
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from config import DB_STATEMENT_TIMEOUT, DEFAULT_REQUEST_DEADLINE, ROUTE_DEADLINES
+from utils.instrumentation import register_http_request_hook
+from utils.sessions import RoutingSession
+
+logger = logging.getLogger(__name__)
+
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+# How far the connection's statement_timeout may exceed the remaining budget before a
+# transaction sets its own; the handler is cancelled at the deadline either way
+STATEMENT_TIMEOUT_SLACK = 1  # Seconds
+
+
+class DeadlineExceeded(Exception):
+    """Raised when work is attempted after the request deadline has passed"""
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current request's budget, or None outside a deadline"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+@contextmanager
+def deadline_suspended() -> Iterator[None]:
+    """
+    Lift the request deadline for a block that must finish regardless, e.g.
+    recording changes already applied upstream after the request timed out
+    """
+    token = _deadline.set(None)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def request_deadline(seconds: float) -> Callable:
+    """
+    Set the time budget for a route (overridable via ROUTE_DEADLINES)
+    
+    Usage:
+        @router.get("/users")
+        @request_deadline(10)
+        async def list_users(...): ...
+    """
+    def decorator(endpoint: Callable) -> Callable:
+        endpoint.deadline_seconds = seconds
+        return endpoint
+    return decorator
+
+
+def route_deadline(route: APIRoute) -> float:
+    """Time budget of a route: ROUTE_DEADLINES, else @request_deadline, else the default"""
+    seconds = getattr(route.endpoint, "deadline_seconds", DEFAULT_REQUEST_DEADLINE)
+    for method in route.methods:
+        seconds = ROUTE_DEADLINES.get(f"{method} {route.path_format}", seconds)
+    return seconds
+
+
+def _apply_http_deadline(request: httpx.Request) -> None:
+    budget = remaining()
+    if budget is None:
+        return
+    if budget <= 0:
+        raise DeadlineExceeded("Request deadline exceeded before upstream call")
+    
+    timeout = dict(request.extensions.get("timeout") or {})
+    for key in ("connect", "read", "write", "pool"):
+        current = timeout.get(key)
+        timeout[key] = budget if current is None else min(current, budget)
+    request.extensions["timeout"] = timeout
+
+
+register_http_request_hook(_apply_http_deadline)
+
+
+@event.listens_for(RoutingSession, "after_begin")
+def _apply_statement_timeout(session, transaction, connection) -> None:
+    budget = remaining()
+    if budget is None:
+        if DB_STATEMENT_TIMEOUT > 0:
+            # Background work (reports, roll-ups, exports) has no deadline; lift the
+            # request-sized connection default instead of cancelling it
+            connection.exec_driver_sql("SET LOCAL statement_timeout = 0")
+        return
+    if budget <= 0:
+        raise DeadlineExceeded("Request deadline exceeded before database access")
+    if budget <= DB_STATEMENT_TIMEOUT <= budget + STATEMENT_TIMEOUT_SLACK:
+        return  # The connection default already fits this budget; save the round trip
+    # SET LOCAL lasts only for this transaction, so it is safe behind transaction-mode pgbouncer
+    connection.exec_driver_sql(f"SET LOCAL statement_timeout = {max(int(budget * 1000), 1)}")
+
+
+def _caused_by(exc: BaseException, types: tuple) -> bool:
+    # Helpers wrap failures in HTTPException(500); the original error is kept as __context__
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        if isinstance(exc, types):
+            return True
+        seen.add(id(exc))
+        exc = exc.__cause__ or exc.__context__
+    return False
+
+
+class DeadlineRoute(APIRoute):
+    """
+    APIRoute that runs each request under the route's deadline
+    
+    Returns 504 when the budget runs out (handler cancelled, statement_timeout
+    hit, or upstream call timed out) and 503 when no pooled connection frees up.
+    """
+    
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        seconds = route_deadline(self)
+        
+        async def deadline_handler(request):
+            token = _deadline.set(time.monotonic() + seconds)
+            try:
+                with anyio.fail_after(seconds):
+                    return await handler(request)
+            except Exception as e:
+                if isinstance(e, TimeoutError) or _caused_by(e, (DeadlineExceeded, QueryCanceledError, httpx.TimeoutException)):
+                    logger.warning(f"Deadline of {seconds}s exceeded: {request.method} {request.url.path}")
+                    return JSONResponse(
+                        status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+                        content={"detail": "Request deadline exceeded"}
+                    )
+                if _caused_by(e, (PoolTimeoutError,)):
+                    logger.warning(f"No database connection available: {request.method} {request.url.path}")
+                    return JSONResponse(
+                        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                        content={"detail": "Service temporarily overloaded"},
+                        headers={"Retry-After": "1"}
+                    )
+                raise
+            finally:
+                _deadline.reset(token)
+        
+        return deadline_handler
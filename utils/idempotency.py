@@ -0,0 +1,343 @@
+"""
+Idempotency-Key support for mutating endpoints
+
+Clients on flaky networks retry writes they never saw a response for. A route
+marked @idempotent() stores its first successful response under the caller,
+method, path and Idempotency-Key, and a retry with the same key gets that
+response back. The check runs before the route's dependencies, so a replay
+opens no database session and calls no upstream API. A duplicate that
+arrives while the first request is still running waits for it instead of
+running again.
+
+Keys are scoped to the caller's user, so one user can never be served
+another's response, and reusing a key with a different body is rejected with
+422. Unauthenticated routes like signup have no caller to scope by, so there
+a fingerprint of the request body is part of the key: clients that happen to
+pick the same key only share a response if they also sent the very same body
+(for signup, the same credentials). Fingerprints are HMACs keyed with the
+server's JWT secret, so stored keys reveal nothing about the body. Only 2xx responses are stored; an error releases the key
+so the retry runs normally.
+
+Two stores are available via IDEMPOTENCY_STORE:
+    memory: per-worker LRU, duplicates wait on an in-process event. A retry
+        that lands on another worker runs again.
+    kv: records serialized into a redis-style key/value client (set with
+        nx/px, get, delete), duplicates poll. LocalKeyValue is the in-process
+        stand-in; passing a shared client makes keys hold across workers.
+"""
+import asyncio
+import base64
+import hashlib
+import hmac
+import logging
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import orjson
+from fastapi import HTTPException, Request, Response, status
+
+from config import IDEMPOTENCY_CACHE_SIZE, IDEMPOTENCY_POLL_INTERVAL, IDEMPOTENCY_STORE, IDEMPOTENCY_TTL, JWT_SECRET_KEY
+from dependencies.get_current_user import peek_principal
+from utils.deadlines import DeadlineRoute, route_deadline
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+ANONYMOUS_SCOPE = "anonymous"
+MAX_KEY_LENGTH = 255
+# The in-flight marker outlives the route's deadline by this much, so it is
+# never dropped while the original request can still finish
+LOCK_MARGIN = 5  # Seconds
+
+
+class StoredResponse(NamedTuple):
+    status_code: int
+    headers: List[Tuple[str, str]]
+    body: bytes
+
+
+class IdempotencyRecord(NamedTuple):
+    fingerprint: str  # HMAC of the query string and body the key was first used with
+    response: Optional[StoredResponse]  # None while the first request is in flight
+
+
+def idempotent(ttl: int = IDEMPOTENCY_TTL) -> Callable:
+    """
+    Honor Idempotency-Key on a route of a router using IdempotentRoute
+
+    Usage:
+        @router.put("/me")
+        @idempotent()
+        async def update_me(...): ...
+    """
+    def decorator(endpoint: Callable) -> Callable:
+        endpoint.idempotency_ttl = ttl
+        return endpoint
+    return decorator
+
+
+class MemoryIdempotencyStore:
+    """Per-worker LRU of records; waiters are woken by an asyncio.Event"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, IdempotencyRecord]]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Event] = {}
+
+    def _get(self, key: str) -> Optional[IdempotencyRecord]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, record = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return record
+
+    def _put(self, key: str, record: IdempotencyRecord, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, record)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _finish(self, key: str) -> None:
+        event = self._in_flight.pop(key, None)
+        if event is not None:
+            event.set()
+
+    async def reserve(self, key: str, fingerprint: str, lock_ttl: float) -> Optional[IdempotencyRecord]:
+        """Mark the key in flight and return None, or return the record already there"""
+        record = self._get(key)
+        if record is not None:
+            return record
+        self._put(key, IdempotencyRecord(fingerprint, None), lock_ttl)
+        self._in_flight[key] = asyncio.Event()
+        return None
+
+    async def complete(self, key: str, record: IdempotencyRecord, ttl: float) -> None:
+        self._put(key, record, ttl)
+        self._finish(key)
+
+    async def release(self, key: str) -> None:
+        self._entries.pop(key, None)
+        self._finish(key)
+
+    async def wait(self, key: str, timeout: float) -> Optional[IdempotencyRecord]:
+        """Wait for an in-flight key to complete or be released; returns its record then"""
+        event = self._in_flight.get(key)
+        if event is not None:
+            try:
+                await asyncio.wait_for(event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self._get(key)
+
+
+class LocalKeyValue:
+    """
+    In-process stand-in for a shared key/value server
+
+    Implements only the redis.asyncio calls KeyValueIdempotencyStore makes,
+    with the same signatures and return values, over bytes with expiry.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Tuple[Optional[float], bytes]]" = OrderedDict()
+
+    async def get(self, name: str) -> Optional[bytes]:
+        entry = self._data.get(name)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[name]
+            return None
+        return value
+
+    async def set(self, name: str, value: bytes, px: Optional[int] = None, nx: bool = False) -> Optional[bool]:
+        if nx and await self.get(name) is not None:
+            return None
+        self._data[name] = (time.monotonic() + px / 1000 if px is not None else None, value)
+        self._data.move_to_end(name)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+        return True
+
+    async def delete(self, name: str) -> int:
+        return 1 if self._data.pop(name, None) is not None else 0
+
+
+class KeyValueIdempotencyStore:
+    """Records serialized into a redis-style client; waiters poll every poll_interval"""
+
+    def __init__(self, client, poll_interval: float):
+        self.client = client
+        self.poll_interval = poll_interval
+
+    @staticmethod
+    def _encode(record: IdempotencyRecord) -> bytes:
+        response = record.response
+        return orjson.dumps({
+            "fingerprint": record.fingerprint,
+            "response": None if response is None else {
+                "status_code": response.status_code,
+                "headers": response.headers,
+                "body": base64.b64encode(response.body).decode(),
+            },
+        })
+
+    @staticmethod
+    def _decode(raw: bytes) -> IdempotencyRecord:
+        data = orjson.loads(raw)
+        response = data["response"]
+        return IdempotencyRecord(data["fingerprint"], None if response is None else StoredResponse(
+            response["status_code"],
+            [tuple(header) for header in response["headers"]],
+            base64.b64decode(response["body"]),
+        ))
+
+    async def reserve(self, key: str, fingerprint: str, lock_ttl: float) -> Optional[IdempotencyRecord]:
+        """Mark the key in flight and return None, or return the record already there"""
+        pending = self._encode(IdempotencyRecord(fingerprint, None))
+        while True:
+            if await self.client.set(key, pending, px=int(lock_ttl * 1000), nx=True):
+                return None
+            raw = await self.client.get(key)
+            if raw is not None:
+                return self._decode(raw)
+            # Expired or released between the two calls; try to take it again
+
+    async def complete(self, key: str, record: IdempotencyRecord, ttl: float) -> None:
+        await self.client.set(key, self._encode(record), px=int(ttl * 1000))
+
+    async def release(self, key: str) -> None:
+        await self.client.delete(key)
+
+    async def wait(self, key: str, timeout: float) -> Optional[IdempotencyRecord]:
+        """Wait for an in-flight key to complete or be released; returns its record then"""
+        deadline = time.monotonic() + timeout
+        while True:
+            raw = await self.client.get(key)
+            record = None if raw is None else self._decode(raw)
+            if record is None or record.response is not None or time.monotonic() >= deadline:
+                return record
+            await asyncio.sleep(self.poll_interval)
+
+
+def build_store():
+    """Store selected by IDEMPOTENCY_STORE"""
+    if IDEMPOTENCY_STORE == "kv":
+        return KeyValueIdempotencyStore(LocalKeyValue(IDEMPOTENCY_CACHE_SIZE), IDEMPOTENCY_POLL_INTERVAL)
+    if IDEMPOTENCY_STORE != "memory":
+        logger.warning(f"Unknown IDEMPOTENCY_STORE {IDEMPOTENCY_STORE!r}, using memory")
+    return MemoryIdempotencyStore(IDEMPOTENCY_CACHE_SIZE)
+
+
+idempotency_store = build_store()
+
+
+def _caller_scope(request: Request) -> Optional[str]:
+    """Whose keys this request uses, or None if that can't be known without I/O"""
+    authorization = request.headers.get("Authorization")
+    if authorization is None:
+        return ANONYMOUS_SCOPE
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    principal = peek_principal(token)
+    return principal.user_id if principal is not None else None
+
+
+def _fingerprint(query: str, body: bytes) -> str:
+    # Keyed, so bodies with credentials (signup) can't be brute-forced from a shared store
+    return hmac.new((JWT_SECRET_KEY or "").encode(), query.encode() + b"\0" + body, hashlib.sha256).hexdigest()
+
+
+def _stored_response(response: Response) -> StoredResponse:
+    headers = [
+        (name.decode("latin-1"), value.decode("latin-1"))
+        for name, value in response.raw_headers
+        if name.lower() != b"content-length"
+    ]
+    return StoredResponse(response.status_code, headers, bytes(response.body))
+
+
+def _replay(stored: StoredResponse) -> Response:
+    response = Response(content=stored.body, status_code=stored.status_code)
+    response.raw_headers.extend((name.encode("latin-1"), value.encode("latin-1")) for name, value in stored.headers)
+    response.raw_headers.append((b"idempotent-replayed", b"true"))
+    return response
+
+
+class IdempotentRoute(DeadlineRoute):
+    """
+    DeadlineRoute that also honors Idempotency-Key on routes marked @idempotent()
+
+    Requests without the header, and requests whose caller can't be resolved
+    without I/O (so authentication will decide), run unchanged.
+    """
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        ttl = getattr(self.endpoint, "idempotency_ttl", None)
+        if ttl is None:
+            return handler
+        lock_ttl = route_deadline(self) + LOCK_MARGIN
+
+        async def idempotent_handler(request: Request) -> Response:
+            key = request.headers.get(IDEMPOTENCY_HEADER)
+            if key is None:
+                return await handler(request)
+            if not 0 < len(key) <= MAX_KEY_LENGTH:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"{IDEMPOTENCY_HEADER} must be 1-{MAX_KEY_LENGTH} characters"
+                )
+            scope = _caller_scope(request)
+            if scope is None:
+                return await handler(request)
+
+            # The body is cached on the request, so the route still parses it as usual
+            fingerprint = _fingerprint(request.url.query, await request.body())
+            if scope == ANONYMOUS_SCOPE:
+                scope = f"{ANONYMOUS_SCOPE}:{fingerprint}"
+            store_key = f"idempotency:{scope}:{request.method} {request.url.path}:{key}"
+
+            while True:
+                record = await idempotency_store.reserve(store_key, fingerprint, lock_ttl)
+                if record is None:
+                    break
+                if record.fingerprint != fingerprint:
+                    raise HTTPException(
+                        status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                        detail=f"{IDEMPOTENCY_HEADER} was already used with a different request"
+                    )
+                if record.response is None:
+                    record = await idempotency_store.wait(store_key, lock_ttl)
+                    if record is None:
+                        continue  # The first request failed; this one runs instead
+                    if record.response is None:
+                        raise HTTPException(
+                            status_code=status.HTTP_409_CONFLICT,
+                            detail=f"A request with this {IDEMPOTENCY_HEADER} is still in progress"
+                        )
+                logger.info(f"Replaying response for {request.method} {request.url.path} ({IDEMPOTENCY_HEADER} {key})")
+                return _replay(record.response)
+
+            try:
+                response = await handler(request)
+            except BaseException:
+                # Also on cancellation; the in-process stores release without suspending
+                await idempotency_store.release(store_key)
+                raise
+
+            if 200 <= response.status_code < 300 and hasattr(response, "body"):
+                await idempotency_store.complete(store_key, IdempotencyRecord(fingerprint, _stored_response(response)), ttl)
+            else:
+                await idempotency_store.release(store_key)
+            return response
+
+        return idempotent_handler
@@ -0,0 +1,189 @@
+"""
+Request-scoped instrumentation for database statements and upstream HTTP calls
+Counts the work done per request so per-row loops (N+1 patterns) surface in dev mode and tests
+"""
+import logging
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional
+
+import httpx
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+_current_stats: ContextVar[Optional["RequestStats"]] = ContextVar("request_stats", default=None)
+# Scopes that see every statement regardless of context, e.g. a query budget wrapped around
+# TestClient calls, where the app runs in a separate thread with its own context
+_global_scopes: List["RequestStats"] = []
+_http_instrumented = False
+# Called with every outgoing httpx.Request before it hits the network (e.g. deadline propagation)
+_http_request_hooks: List[Callable[[httpx.Request], None]] = []
+
+
+class RequestStats:
+    """Counters collected while a tracking context is active"""
+
+    __slots__ = ("query_count", "http_call_count", "statements")
+
+    def __init__(self):
+        self.query_count = 0
+        self.http_call_count = 0
+        self.statements: Counter = Counter()
+
+    def record_query(self, statement: str) -> None:
+        self.query_count += 1
+        self.statements[statement] += 1
+
+    def record_http_call(self) -> None:
+        self.http_call_count += 1
+
+    def repeated_statements(self, threshold: int) -> Dict[str, int]:
+        """Return statements executed at least `threshold` times"""
+        return {sql: count for sql, count in self.statements.items() if count >= threshold}
+
+
+def get_current_stats() -> Optional[RequestStats]:
+    """Return the stats for the active tracking context, if any"""
+    return _current_stats.get()
+
+
+def _active_stats() -> List[RequestStats]:
+    stats = _current_stats.get()
+    if not _global_scopes:
+        return [stats] if stats is not None else []
+    active = [scope for scope in _global_scopes if scope is not stats]
+    if stats is not None:
+        active.append(stats)
+    return active
+
+
+@contextmanager
+def track_requests(global_scope: bool = False) -> Iterator[RequestStats]:
+    """
+    Count SQL statements and upstream HTTP calls made inside the block
+
+    Args:
+        global_scope: Also count work done in other threads/contexts (test use only)
+
+    Yields:
+        RequestStats: Counters updated as statements and calls happen
+    """
+    stats = RequestStats()
+    token = _current_stats.set(stats)
+    if global_scope:
+        _global_scopes.append(stats)
+    try:
+        yield stats
+    finally:
+        if global_scope:
+            _global_scopes.remove(stats)
+        _current_stats.reset(token)
+
+
+@contextmanager
+def assert_query_budget(max_queries: int, max_http_calls: Optional[int] = None) -> Iterator[RequestStats]:
+    """
+    Assert that the block stays within a query (and optionally HTTP call) budget
+
+    Usage:
+        with assert_query_budget(2, max_http_calls=0):
+            client.get("/users/me", headers=auth_headers)
+
+    Raises:
+        AssertionError: If the block exceeds either budget
+    """
+    with track_requests(global_scope=True) as stats:
+        yield stats
+
+    if stats.query_count > max_queries:
+        details = "\n".join(f"  {count}x {sql}" for sql, count in stats.statements.most_common())
+        raise AssertionError(
+            f"Query budget exceeded: {stats.query_count} statements executed, budget is {max_queries}\n{details}"
+        )
+    if max_http_calls is not None and stats.http_call_count > max_http_calls:
+        raise AssertionError(
+            f"HTTP call budget exceeded: {stats.http_call_count} upstream calls made, budget is {max_http_calls}"
+        )
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    for stats in _active_stats():
+        stats.record_query(statement)
+
+
+def _on_http_request(request: httpx.Request) -> None:
+    for stats in _active_stats():
+        stats.record_http_call()
+    for hook in _http_request_hooks:
+        hook(request)
+
+
+def register_http_request_hook(hook: Callable[[httpx.Request], None]) -> None:
+    """Run `hook` on every request sent over the network through httpx"""
+    if hook not in _http_request_hooks:
+        _http_request_hooks.append(hook)
+
+
+def instrument_engine(engine) -> None:
+    """Attach the statement counter to a sync or async SQLAlchemy engine"""
+    target = engine.sync_engine if isinstance(engine, AsyncEngine) else engine
+    if not event.contains(target, "before_cursor_execute", _before_cursor_execute):
+        event.listen(target, "before_cursor_execute", _before_cursor_execute)
+
+
+def instrument_http_clients() -> None:
+    """
+    Count every request that goes over the network through httpx
+
+    The Supabase clients (auth, PostgREST, storage) each build their own httpx client,
+    so counting happens on the network transports rather than per client instance.
+    In-process transports (TestClient, ASGITransport) are deliberately not counted.
+    """
+    global _http_instrumented
+    if _http_instrumented:
+        return
+
+    sync_handle = httpx.HTTPTransport.handle_request
+    async_handle = httpx.AsyncHTTPTransport.handle_async_request
+
+    def handle_request(self, request):
+        _on_http_request(request)
+        return sync_handle(self, request)
+
+    async def handle_async_request(self, request):
+        _on_http_request(request)
+        return await async_handle(self, request)
+
+    httpx.HTTPTransport.handle_request = handle_request
+    httpx.AsyncHTTPTransport.handle_async_request = handle_async_request
+    _http_instrumented = True
+
+
+def make_query_counter_middleware(repeat_threshold: int):
+    """
+    Create a dev-only HTTP middleware exposing per-request counts as response headers
+
+    Args:
+        repeat_threshold: Number of identical statements in one request that is flagged as N+1
+    """
+    async def query_counter_middleware(request, call_next):
+        with track_requests() as stats:
+            response = await call_next(request)
+
+        response.headers["X-DB-Query-Count"] = str(stats.query_count)
+        response.headers["X-Upstream-Call-Count"] = str(stats.http_call_count)
+
+        repeated = stats.repeated_statements(repeat_threshold)
+        if repeated:
+            response.headers["X-N-Plus-One-Warning"] = str(len(repeated))
+            for sql, count in repeated.items():
+                logger.warning(
+                    f"Possible N+1 on {request.method} {request.url.path}: "
+                    f"statement executed {count} times: {sql}"
+                )
+        return response
+
+    return query_counter_middleware
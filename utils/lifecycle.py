@@ -0,0 +1,140 @@
+"""
+Application lifecycle state: pool warmup, readiness and graceful drain
+Shared by the lifespan in main.py and the /healthz and /readyz endpoints
+"""
+import asyncio
+import logging
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+
+class LifecycleState:
+    """Process-wide readiness flags and in-flight request counter"""
+
+    def __init__(self):
+        self.started = False
+        self.draining = False
+        self.database_ready = False
+        self.in_flight = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    @property
+    def ready(self) -> bool:
+        return self.started and self.database_ready and not self.draining
+
+    def request_started(self) -> None:
+        self.in_flight += 1
+        self._idle.clear()
+
+    def request_finished(self) -> None:
+        self.in_flight -= 1
+        if self.in_flight == 0:
+            self._idle.set()
+
+    async def drain(self, timeout: float) -> bool:
+        """
+        Stop reporting ready and wait for in-flight requests to finish
+
+        Returns:
+            bool: True if every request finished before the timeout
+        """
+        self.draining = True
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            logger.warning(f"Shutdown drain timed out with {self.in_flight} requests in flight")
+            return False
+
+
+lifecycle = LifecycleState()
+
+
+class InFlightMiddleware:
+    """ASGI middleware counting in-flight HTTP requests for graceful drain"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        lifecycle.request_started()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            lifecycle.request_finished()
+
+
+def track_pool_health(engine: AsyncEngine) -> None:
+    """Flip database readiness on successful connects and disconnect errors, without extra queries"""
+    def on_connect(dbapi_connection, connection_record):
+        lifecycle.database_ready = True
+
+    def on_error(context):
+        if context.is_disconnect:
+            lifecycle.database_ready = False
+
+    event.listen(engine.sync_engine, "connect", on_connect)
+    event.listen(engine.sync_engine, "handle_error", on_error)
+
+
+async def warm_up_pool(engine: AsyncEngine, connections: int) -> None:
+    """
+    Open `connections` pooled connections up front so the first requests after
+    a deploy don't pay connection setup
+
+    Args:
+        engine: Async engine whose pool should be filled
+        connections: Number of connections to open concurrently
+    """
+    if connections <= 0:
+        return
+
+    async def open_connection():
+        conn = await engine.connect()
+        await conn.execute(text("SELECT 1"))
+        return conn
+
+    results = await asyncio.gather(*(open_connection() for _ in range(connections)), return_exceptions=True)
+    errors = [result for result in results if isinstance(result, BaseException)]
+    for conn in results:
+        if not isinstance(conn, BaseException):
+            # Closing returns the connection to the pool, where it stays open
+            await conn.close()
+
+    if errors:
+        logger.error(f"Pool warmup: {len(errors)} of {connections} connections failed: {str(errors[0])}")
+    else:
+        logger.info(f"Pool warmup: opened {connections} connections")
+
+
+async def probe_database(engine: AsyncEngine, timeout: float = 2.0) -> bool:
+    """
+    Run a single SELECT 1 to recover readiness after a disconnect
+
+    Only used while the database is marked not ready; the healthy path never queries.
+    """
+    try:
+        async with engine.connect() as conn:
+            await asyncio.wait_for(conn.execute(text("SELECT 1")), timeout)
+        lifecycle.database_ready = True
+    except Exception as e:
+        logger.warning(f"Database readiness probe failed: {str(e)}")
+    return lifecycle.database_ready
+
+
+def pool_status(engine: AsyncEngine) -> dict:
+    """Cheap snapshot of pool counters (no database round trip)"""
+    pool = engine.pool
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+    }
@@ -0,0 +1,106 @@
+"""
+Postgres LISTEN/NOTIFY fan-out: one listening connection per worker shared by
+every in-memory cache that other workers (or triggers) need to invalidate
+
+Modules subscribe at import time with a handler for the channel's payloads
+and a reload coroutine that rebuilds their state from the database. Reloads
+run after every (re)connect, once LISTEN is active, so nothing sent while
+the connection was down is missed.
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, NamedTuple, Optional
+
+import asyncpg
+
+logger = logging.getLogger(__name__)
+
+MAINTENANCE_INTERVAL = 60  # Seconds between periodic callbacks (e.g. pruning expired entries)
+RECONNECT_DELAY = 5  # Seconds before retrying a lost LISTEN connection
+
+
+class Subscription(NamedTuple):
+    channel: str
+    handler: Callable[[str], None]
+    reload: Optional[Callable[..., Awaitable[int]]]
+    periodic: Optional[Callable[[], None]]
+
+
+class NotificationListener:
+    """Owns the LISTEN connection and dispatches payloads to subscribers"""
+
+    def __init__(self):
+        self._subscriptions: List[Subscription] = []
+
+    def subscribe(
+        self,
+        channel: str,
+        handler: Callable[[str], None],
+        reload: Optional[Callable[..., Awaitable[int]]] = None,
+        periodic: Optional[Callable[[], None]] = None
+    ) -> None:
+        """
+        Register a channel
+
+        Args:
+            channel: NOTIFY channel name
+            handler: Called with each payload string
+            reload: async (session_factory) -> rows loaded; rebuilds state after (re)connect
+            periodic: Called every MAINTENANCE_INTERVAL seconds
+        """
+        self._subscriptions.append(Subscription(channel, handler, reload, periodic))
+
+    async def run(self, database_url: str, session_factory, ready: Optional[asyncio.Event] = None) -> None:
+        """
+        Background loop started from the lifespan
+
+        Args:
+            database_url: Session-level connection string (LISTEN does not
+                survive a transaction-mode pooler)
+            session_factory: Used by subscriber reloads
+            ready: Set once the first connect and reloads have completed
+        """
+        listen_url = database_url.replace("postgresql+asyncpg://", "postgresql://").split("?")[0]
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(listen_url)
+                lost = asyncio.Event()
+                connection.add_termination_listener(lambda _: lost.set())
+                for subscription in self._subscriptions:
+                    await connection.add_listener(subscription.channel, self._dispatcher(subscription))
+                for subscription in self._subscriptions:
+                    if subscription.reload is not None:
+                        loaded = await subscription.reload(session_factory)
+                        logger.info(f"Listening on {subscription.channel}, {loaded} rows loaded")
+                if ready is not None:
+                    ready.set()
+
+                while not lost.is_set():
+                    try:
+                        await asyncio.wait_for(lost.wait(), MAINTENANCE_INTERVAL)
+                    except asyncio.TimeoutError:
+                        for subscription in self._subscriptions:
+                            if subscription.periodic is not None:
+                                subscription.periodic()
+                logger.warning("Notification listener connection lost, reconnecting")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Notification listener failed: {str(e)}")
+            finally:
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+            await asyncio.sleep(RECONNECT_DELAY)
+
+    @staticmethod
+    def _dispatcher(subscription: Subscription):
+        def dispatch(connection, pid, channel, payload):
+            try:
+                subscription.handler(payload)
+            except Exception as e:
+                logger.warning(f"Ignoring bad {channel} notification {payload!r}: {str(e)}")
+        return dispatch
+
+
+notification_listener = NotificationListener()
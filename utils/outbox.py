@@ -0,0 +1,238 @@
+"""
+Transactional outbox for profile and role change events
+
+Code that changes a profile or a role calls enqueue_event() on the same
+session before committing, so the event exists if and only if the change
+does. A background publisher in each worker then claims pending events with
+FOR UPDATE SKIP LOCKED and leases them by pushing available_at forward,
+commits, hands them to the configured sinks with no transaction open, and
+deletes them in a second short transaction. Workers never claim the same row
+at once, so an event is delivered by one worker; it is delivered again only
+if that worker fails before deleting it (its lease then runs out) or takes
+longer than OUTBOX_LEASE_SECONDS. Consumers should dedupe on the event id.
+"""
+import asyncio
+import hashlib
+import hmac
+import logging
+import uuid
+from datetime import timedelta
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+import httpx
+import orjson
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import (
+    OUTBOX_BATCH_SIZE,
+    OUTBOX_FILE_PATH,
+    OUTBOX_LEASE_SECONDS,
+    OUTBOX_WEBHOOK_SECRET,
+    OUTBOX_WEBHOOK_TIMEOUT,
+    OUTBOX_WEBHOOK_URL
+)
+from models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+MAX_RETRY_DELAY = 300  # Seconds; failed events back off exponentially up to this
+
+
+def enqueue_event(
+    db: AsyncSession,
+    event_type: str,
+    aggregate_id: Union[str, uuid.UUID],
+    payload: Dict[str, Any]
+) -> None:
+    """
+    Add an event to the session; it is written by the caller's commit
+
+    Args:
+        db: Session holding the change the event describes
+        event_type: e.g. "profile.updated"
+        aggregate_id: User the event is about
+        payload: JSON-serializable event body
+    """
+    if not isinstance(aggregate_id, uuid.UUID):
+        aggregate_id = uuid.UUID(aggregate_id)
+    db.add(OutboxEvent(event_type=event_type, aggregate_id=aggregate_id, payload=payload))
+
+
+def event_to_dict(event: OutboxEvent) -> Dict[str, Any]:
+    """Wire format shared by every sink"""
+    return {
+        "id": event.id,
+        "type": event.event_type,
+        "aggregate_id": str(event.aggregate_id),
+        "payload": event.payload,
+        "created_at": event.created_at,
+    }
+
+
+class WebhookSink:
+    """POSTs each batch as {"events": [...]}; any non-2xx response fails the batch"""
+
+    def __init__(self, url: str, secret: Optional[str] = None, timeout: float = 10):
+        self.url = url
+        self.secret = secret.encode() if secret else None
+        self.timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def deliver(self, events: List[Dict[str, Any]]) -> None:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+        body = orjson.dumps({"events": events}, option=orjson.OPT_UTC_Z)
+        headers = {"Content-Type": "application/json"}
+        if self.secret is not None:
+            headers["X-Outbox-Signature"] = "sha256=" + hmac.new(self.secret, body, hashlib.sha256).hexdigest()
+        response = await self._client.post(self.url, content=body, headers=headers)
+        response.raise_for_status()
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class FileSink:
+    """Appends one JSON line per event, e.g. for a log shipper to pick up"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _append(self, data: bytes) -> None:
+        with open(self.path, "ab") as f:
+            f.write(data)
+
+    async def deliver(self, events: List[Dict[str, Any]]) -> None:
+        data = b"".join(
+            orjson.dumps(event, option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_UTC_Z) for event in events
+        )
+        await asyncio.to_thread(self._append, data)
+
+
+class InProcessSink:
+    """
+    Calls subscribers registered in this process, e.g. to invalidate a cache
+
+    Subscribers run in whichever worker drains the event; state that every
+    worker holds should be invalidated through utils/notifications.py instead.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[str, List[Callable[[Dict[str, Any]], Any]]] = {}
+
+    def subscribe(self, event_type: str, callback: Callable[[Dict[str, Any]], Any]) -> None:
+        """Register a callback (plain or async) for one event type, or "*" for all"""
+        self._subscribers.setdefault(event_type, []).append(callback)
+
+    async def deliver(self, events: List[Dict[str, Any]]) -> None:
+        for event in events:
+            for callback in self._subscribers.get(event["type"], []) + self._subscribers.get("*", []):
+                result = callback(event)
+                if asyncio.iscoroutine(result):
+                    await result
+
+
+class OutboxPublisher:
+    """Drains outbox_events into the sinks"""
+
+    def __init__(self, sinks: Sequence[Any], batch_size: int = 100):
+        self.sinks = list(sinks)
+        self.batch_size = batch_size
+
+    async def drain(self, session_factory) -> int:
+        """
+        Claim, deliver and delete one batch of due events
+
+        Claiming and deleting are separate transactions, so a slow sink holds
+        neither a pooled connection nor row locks while it delivers. A batch
+        goes to every sink in turn. If one fails, the whole batch is pushed
+        back with exponential backoff, so sinks that already took it will see
+        it again.
+
+        Returns:
+            int: Number of events delivered
+        """
+        async with session_factory() as session:
+            due = (
+                select(OutboxEvent.id)
+                .where(OutboxEvent.available_at <= func.now())
+                .order_by(OutboxEvent.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            result = await session.execute(
+                update(OutboxEvent)
+                .where(OutboxEvent.id.in_(due.scalar_subquery()))
+                .values(available_at=func.now() + timedelta(seconds=OUTBOX_LEASE_SECONDS))
+                .returning(OutboxEvent)
+                .execution_options(synchronize_session=False)
+            )
+            claimed = sorted(result.scalars().all(), key=lambda event: event.id)
+            await session.commit()
+        if not claimed:
+            return 0
+
+        ids = [event.id for event in claimed]
+        events = [event_to_dict(event) for event in claimed]
+        try:
+            for sink in self.sinks:
+                await sink.deliver(events)
+        except Exception as e:
+            attempts = max(event.attempts for event in claimed) + 1
+            delay = timedelta(seconds=min(2 ** attempts, MAX_RETRY_DELAY))
+            logger.warning(f"Outbox delivery of {len(ids)} events failed (attempt {attempts}): {str(e)}")
+            async with session_factory() as session:
+                await session.execute(
+                    update(OutboxEvent)
+                    .where(OutboxEvent.id.in_(ids))
+                    .values(
+                        attempts=OutboxEvent.attempts + 1,
+                        available_at=func.now() + delay,
+                        last_error=str(e)[:1000]
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                await session.commit()
+            return 0
+
+        async with session_factory() as session:
+            await session.execute(
+                delete(OutboxEvent).where(OutboxEvent.id.in_(ids)).execution_options(synchronize_session=False)
+            )
+            await session.commit()
+        return len(ids)
+
+    async def run(self, session_factory, interval: float) -> None:
+        """Background loop started from the lifespan; drains back to back while batches are full"""
+        try:
+            while True:
+                try:
+                    delivered = await self.drain(session_factory)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Outbox publisher failed: {str(e)}")
+                    delivered = 0
+                if delivered < self.batch_size:
+                    await asyncio.sleep(interval)
+        finally:
+            for sink in self.sinks:
+                if hasattr(sink, "close"):
+                    await sink.close()
+
+
+def build_sinks() -> List[Any]:
+    """Sinks enabled by configuration; the in-process sink is always on"""
+    sinks: List[Any] = [outbox_subscribers]
+    if OUTBOX_FILE_PATH:
+        sinks.append(FileSink(OUTBOX_FILE_PATH))
+    if OUTBOX_WEBHOOK_URL:
+        sinks.append(WebhookSink(OUTBOX_WEBHOOK_URL, OUTBOX_WEBHOOK_SECRET, OUTBOX_WEBHOOK_TIMEOUT))
+    return sinks
+
+
+outbox_subscribers = InProcessSink()
+outbox_publisher = OutboxPublisher(build_sinks(), OUTBOX_BATCH_SIZE)
@@ -0,0 +1,137 @@
+"""
+Push profile changes to the user's own open WebSockets instead of having
+clients poll GET /users/me
+
+The profiles trigger from migration 53f4a7825049 NOTIFYs the user ID on every
+profile update, whatever path made it; role changes bump updated_at, so they
+arrive the same way. Each worker receives them on the shared notification
+listener connection and only does work for users connected to it: one
+profile query per change, encoded once and sent to each of that user's
+sockets.
+
+A connection costs one list entry here plus the handler coroutine waiting
+for the client to disconnect; there are no per-connection queues, tasks or
+timers. Expired, revoked or deactivated sessions are closed by the periodic
+sweep instead.
+"""
+import asyncio
+import logging
+import time
+import uuid
+from typing import Dict, List, Set, Tuple
+
+import orjson
+from sqlalchemy import select
+from starlette.websockets import WebSocket
+
+from config import get_session_factory
+from dependencies.principal import Principal
+from models import Profile, auth_user_role, auth_users
+from utils.account_status import deactivated_users
+from utils.notifications import notification_listener
+from utils.revocation import revocation_store
+from utils.serialization import PROFILE_FIELDS, profile_row_to_dict
+
+logger = logging.getLogger(__name__)
+
+PROFILE_CHANGES_CHANNEL = "profile_changes"
+POLICY_VIOLATION = 1008  # WebSocket close code for auth failures
+
+
+def encode_message(message_type: str, data) -> str:
+    """Wire format: {"type": ..., "data": ...} as JSON text"""
+    return orjson.dumps({"type": message_type, "data": data}, option=orjson.OPT_UTC_Z).decode()
+
+
+class ProfilePushHub:
+    """Per-worker registry of profile event sockets, keyed by user ID"""
+
+    def __init__(self):
+        # A list rather than a set: almost every user has one or two sockets
+        self._connections: Dict[str, List[Tuple[WebSocket, Principal]]] = {}
+        self._pending: Set[str] = set()  # Users with a push scheduled but not yet querying
+        self._tasks: Set[asyncio.Task] = set()  # Strong references until pushes/closes finish
+
+    def __len__(self) -> int:
+        return sum(len(connections) for connections in self._connections.values())
+
+    def register(self, websocket: WebSocket, principal: Principal) -> None:
+        self._connections.setdefault(principal.user_id, []).append((websocket, principal))
+
+    def unregister(self, websocket: WebSocket, principal: Principal) -> None:
+        connections = self._connections.get(principal.user_id)
+        if connections is None:
+            return
+        connections[:] = [entry for entry in connections if entry[0] is not websocket]
+        if not connections:
+            del self._connections[principal.user_id]
+
+    def handle_notification(self, payload: str) -> None:
+        """A profile was updated (payload is its ID); push it if the user is connected here"""
+        if payload not in self._connections or payload in self._pending:
+            return
+        # Bursts before the query starts are folded into one push
+        self._pending.add(payload)
+        self._spawn(self._push(payload))
+
+    def _spawn(self, coroutine) -> None:
+        task = asyncio.get_running_loop().create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _push(self, user_id: str) -> None:
+        # Later notifications schedule another push; this query may not see their change
+        self._pending.discard(user_id)
+        try:
+            async with get_session_factory()() as session:
+                result = await session.execute(
+                    select(*(Profile.__table__.c[field] for field in PROFILE_FIELDS), auth_user_role.label("role"))
+                    .outerjoin(auth_users, auth_users.c.id == Profile.id)
+                    .where(Profile.id == uuid.UUID(user_id))
+                )
+                row = result.mappings().one_or_none()
+        except Exception as e:
+            logger.error(f"Failed to load profile {user_id} for push: {str(e)}")
+            return
+
+        if row is not None:
+            await self.send(user_id, encode_message("profile", profile_row_to_dict(row)))
+
+    async def send(self, user_id: str, message: str) -> None:
+        """Send an encoded message to every socket of one user in this worker"""
+        connections = self._connections.get(user_id, ())
+        await asyncio.gather(*(self._send(websocket, message) for websocket, _ in connections))
+
+    @staticmethod
+    async def _send(websocket: WebSocket, message: str) -> None:
+        try:
+            await websocket.send_text(message)
+        except Exception:
+            pass  # Disconnected; the handler unregisters it
+
+    def sweep(self) -> None:
+        """Close sockets whose token expired or was revoked, or whose account was deactivated"""
+        now = time.time()
+        for connections in list(self._connections.values()):
+            for websocket, principal in list(connections):
+                if principal.exp is not None and principal.exp <= now:
+                    reason = "Token has expired"
+                elif principal.token_id and revocation_store.might_be_revoked(principal.token_id):
+                    reason = "Token may have been revoked"  # Reconnecting runs the exact check
+                elif principal.user_id in deactivated_users:
+                    reason = "Account is deactivated"
+                else:
+                    continue
+                self.unregister(websocket, principal)
+                self._spawn(self._close(websocket, reason))
+
+    @staticmethod
+    async def _close(websocket: WebSocket, reason: str) -> None:
+        try:
+            await websocket.close(code=POLICY_VIOLATION, reason=reason)
+        except Exception:
+            pass
+
+
+profile_push_hub = ProfilePushHub()
+notification_listener.subscribe(PROFILE_CHANGES_CHANNEL, profile_push_hub.handle_notification, periodic=profile_push_hub.sweep)
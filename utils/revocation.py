@@ -0,0 +1,205 @@
+"""
+Access token revocation: an in-memory bloom filter in front of the
+revoked_tokens table, kept in sync by a background task in each worker
+
+get_current_user only queries the table when the filter reports a possible
+match, so the common case (token never revoked) is a few bit tests.
+"""
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import REVOCATION_BLOOM_CAPACITY, REVOCATION_REBUILD_INTERVAL
+from models import RevokedToken
+
+logger = logging.getLogger(__name__)
+
+# Re-read rows revoked slightly before the watermark, so a revocation whose
+# transaction started before the last sync but committed after it isn't missed
+SYNC_OVERLAP = timedelta(seconds=30)
+# Confirmed lookups kept per worker, so a false positive costs one query, not one per request
+CONFIRMED_CACHE_SIZE = 10_000
+
+
+def token_id_from_payload(payload: Dict[str, Any]) -> Optional[str]:
+    """Revocation key for a decoded JWT: Supabase's session_id, else the standard jti"""
+    return payload.get("session_id") or payload.get("jti")
+
+
+def token_expiry(payload: Dict[str, Any]) -> datetime:
+    """Expiry of a decoded JWT as an aware datetime"""
+    return datetime.fromtimestamp(payload["exp"], tz=timezone.utc)
+
+
+class BloomFilter:
+    """
+    Fixed-size bloom filter over strings (no false negatives)
+
+    Positions come from Python's built-in str hash, which is randomized per
+    process; the filter is never shared between workers so that is fine.
+    """
+
+    __slots__ = ("mask", "hashes", "bits", "count")
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        capacity = max(capacity, 1)
+        wanted = -capacity * math.log(error_rate) / math.log(2) ** 2
+        size = 1 << max(6, math.ceil(math.log2(wanted)))  # Power of two so probes are a mask, not a modulo
+        self.mask = size - 1
+        self.hashes = max(1, round(size / capacity * math.log(2)))
+        self.bits = bytearray(size >> 3)
+        self.count = 0
+
+    def add(self, key: str) -> None:
+        # Double hashing: the high half of one 64-bit hash is the stride between probes
+        h = hash(key)
+        position = h & self.mask
+        step = (h >> 32) | 1
+        for _ in range(self.hashes):
+            self.bits[position >> 3] |= 1 << (position & 7)
+            position = (position + step) & self.mask
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        # First probe unrolled: for a token that was never revoked it settles most lookups
+        h = hash(key)
+        mask = self.mask
+        bits = self.bits
+        position = h & mask
+        if not bits[position >> 3] >> (position & 7) & 1:
+            return False
+        step = (h >> 32) | 1
+        for _ in range(self.hashes - 1):
+            position = (position + step) & mask
+            if not bits[position >> 3] >> (position & 7) & 1:
+                return False
+        return True
+
+
+class RevocationStore:
+    """Per-worker view of revoked_tokens: bloom pre-filter plus confirmed lookups"""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._filter = BloomFilter(capacity)
+        self._confirmed: "OrderedDict[str, bool]" = OrderedDict()
+        self._watermark: Optional[datetime] = None
+        self._last_rebuild = 0.0
+
+    def might_be_revoked(self, token_id: str) -> bool:
+        """Cheap pre-check; False means the token is definitely not revoked"""
+        return token_id in self._filter
+
+    async def is_revoked(self, token_id: str, db: AsyncSession) -> bool:
+        """
+        Confirm a filter hit against the revoked_tokens table
+
+        Args:
+            token_id: Session ID or jti that might_be_revoked() matched
+            db: Database session (primary, so a fresh logout is always seen)
+
+        Returns:
+            bool: True if the token has been revoked
+        """
+        cached = self._confirmed.get(token_id)
+        if cached is not None:
+            return cached
+
+        revoked = await db.scalar(
+            select(RevokedToken.token_id).where(
+                RevokedToken.token_id == token_id,
+                RevokedToken.expires_at > func.now()
+            )
+        ) is not None
+        self._remember(token_id, revoked)
+        return revoked
+
+    async def revoke(self, db: AsyncSession, token_id: str, user_id: str, expires_at: datetime) -> None:
+        """
+        Record a revocation and apply it to this worker immediately
+
+        Other workers pick it up on their next sync.
+        """
+        await db.execute(
+            insert(RevokedToken)
+            .values(token_id=token_id, user_id=user_id, expires_at=expires_at)
+            .on_conflict_do_nothing(index_elements=[RevokedToken.token_id])
+        )
+        await db.commit()
+        self._add(token_id)
+
+    async def sync(self, session_factory) -> int:
+        """
+        Pull revocations from the table into the filter
+
+        Incremental (rows revoked since the last sync) on most calls; every
+        REVOCATION_REBUILD_INTERVAL the filter is rebuilt from the unexpired
+        rows so expired entries stop producing hits, and expired rows are purged.
+
+        Returns:
+            int: Number of rows read
+        """
+        rebuild = time.monotonic() - self._last_rebuild >= REVOCATION_REBUILD_INTERVAL
+        stmt = select(RevokedToken.token_id, RevokedToken.revoked_at).where(RevokedToken.expires_at > func.now())
+        if not rebuild and self._watermark is not None:
+            stmt = stmt.where(RevokedToken.revoked_at > self._watermark - SYNC_OVERLAP)
+
+        async with session_factory() as session:
+            if rebuild:
+                await session.execute(
+                    delete(RevokedToken)
+                    .where(RevokedToken.expires_at < func.now())
+                    .execution_options(synchronize_session=False)
+                )
+                await session.commit()
+            rows = (await session.execute(stmt)).all()
+
+        if rebuild:
+            # Built off to the side and swapped in, so lookups never see a half-filled filter
+            fresh = BloomFilter(max(self.capacity, 2 * len(rows)))
+            for token_id, _ in rows:
+                fresh.add(token_id)
+            self._filter = fresh
+            self._confirmed.clear()
+            self._last_rebuild = time.monotonic()
+        else:
+            for token_id, _ in rows:
+                self._add(token_id)
+
+        for _, revoked_at in rows:
+            if self._watermark is None or revoked_at > self._watermark:
+                self._watermark = revoked_at
+        return len(rows)
+
+    def _add(self, token_id: str) -> None:
+        self._filter.add(token_id)
+        # A cached "not revoked" from an earlier false positive is now wrong
+        self._confirmed.pop(token_id, None)
+
+    def _remember(self, token_id: str, revoked: bool) -> None:
+        self._confirmed[token_id] = revoked
+        if len(self._confirmed) > CONFIRMED_CACHE_SIZE:
+            self._confirmed.popitem(last=False)
+
+
+revocation_store = RevocationStore(REVOCATION_BLOOM_CAPACITY)
+
+
+async def run_revocation_sync(session_factory, interval: float) -> None:
+    """Background loop started from the lifespan; errors are logged and retried"""
+    while True:
+        try:
+            await revocation_store.sync(session_factory)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Revocation sync failed: {str(e)}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,106 @@
+"""
+Server-side role overlay: recent role changes that override the role claim
+in already-issued JWTs, so promotions and demotions apply without re-login
+
+Each worker keeps user_id -> (role, version) in memory. Admin updates apply
+locally and NOTIFY the other workers (see utils/notifications.py); on
+(re)connect a worker reloads every change younger than ROLE_OVERLAY_TTL
+from auth.users. Versions are the auth.users updated_at timestamps, so late
+or duplicate messages are ignored.
+"""
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import ROLE_OVERLAY_TTL
+from models import auth_user_role, auth_users
+from utils.notifications import notification_listener
+
+ROLE_CHANGES_CHANNEL = "role_changes"
+
+
+def role_version(supabase_user) -> float:
+    """Version for a role change: the user's updated_at from Supabase, else now"""
+    updated_at = getattr(supabase_user, "updated_at", None)
+    if isinstance(updated_at, datetime):
+        return updated_at.timestamp()
+    return time.time()
+
+
+class RoleOverlay:
+    """Per-worker map of recent role changes, consulted by get_current_user"""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._roles: Dict[str, Tuple[str, float]] = {}
+
+    def get(self, user_id: str) -> Optional[str]:
+        """Current role if it changed within the TTL, else None (trust the JWT)"""
+        entry = self._roles.get(user_id)
+        return entry[0] if entry is not None else None
+
+    def apply(self, user_id: str, role: str, version: float) -> bool:
+        """Record a role change unless a newer one is already known"""
+        current = self._roles.get(user_id)
+        if current is not None and current[1] >= version:
+            return False
+        self._roles[user_id] = (role, version)
+        return True
+
+    def prune(self) -> None:
+        """Drop changes older than the TTL; every token issued before them has expired"""
+        cutoff = time.time() - self.ttl
+        for user_id in [user_id for user_id, (_, version) in self._roles.items() if version < cutoff]:
+            del self._roles[user_id]
+
+    async def publish(self, db: AsyncSession, changes: Iterable[Tuple[str, str, float]]) -> None:
+        """
+        Apply role changes in this worker and notify the others
+
+        Notifications are sent when the caller commits the session.
+
+        Args:
+            db: Database session
+            changes: (user_id, role, version) for each updated user
+        """
+        payloads = []
+        for user_id, role, version in changes:
+            self.apply(user_id, role, version)
+            payloads.append(f"{user_id}:{role}:{version}")
+        if payloads:
+            await db.execute(
+                text("SELECT pg_notify(:channel, payload) FROM unnest(CAST(:payloads AS text[])) AS payload"),
+                {"channel": ROLE_CHANGES_CHANNEL, "payloads": payloads}
+            )
+
+    async def load(self, session_factory) -> int:
+        """
+        Load every role change within the TTL from auth.users
+
+        Returns:
+            int: Number of users loaded
+        """
+        async with session_factory() as session:
+            result = await session.execute(
+                select(auth_users.c.id, auth_user_role, auth_users.c.updated_at).where(
+                    auth_users.c.updated_at > func.now() - timedelta(seconds=self.ttl)
+                )
+            )
+            rows = result.all()
+        for user_id, role, updated_at in rows:
+            self.apply(str(user_id), role, updated_at.timestamp())
+        return len(rows)
+
+    def handle_notification(self, payload: str) -> None:
+        """Apply a change published by another worker ("user_id:role:version")"""
+        user_id, role, version = payload.split(":")
+        self.apply(user_id, role, float(version))
+
+
+role_overlay = RoleOverlay(ROLE_OVERLAY_TTL)
+notification_listener.subscribe(
+    ROLE_CHANGES_CHANNEL, role_overlay.handle_notification, role_overlay.load, role_overlay.prune
+)
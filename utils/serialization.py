@@ -0,0 +1,126 @@
+"""
+Fast serialization path for profile responses
+Builds response data straight from trusted database rows and renders it with orjson,
+skipping the pydantic validation that FastAPI would otherwise run on every row
+"""
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+import orjson
+from fastapi import HTTPException, status
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+from models import Profile
+
+PROFILE_FIELDS = tuple(column.key for column in Profile.__table__.columns)
+# Every field a profile response can carry (see parse_fields)
+RESPONSE_FIELDS = PROFILE_FIELDS + ("user_id", "role")
+
+
+def _orjson_default(obj: Any) -> Any:
+    # Models built with model_construct hold only their field values in __dict__
+    if isinstance(obj, BaseModel):
+        return obj.__dict__
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+class FastJSONResponse(ORJSONResponse):
+    """orjson response that also renders pydantic models without re-validating them"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content,
+            default=_orjson_default,
+            option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS,
+        )
+
+
+def parse_fields(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """
+    Parse a sparse fieldset parameter such as "id,email,role"
+
+    Args:
+        fields: Comma-separated field names, or None/empty for every field
+
+    Returns:
+        Optional[Tuple]: Requested fields in request order ("id" always included), or None for all
+
+    Raises:
+        HTTPException: If a field name is unknown
+    """
+    if not fields:
+        return None
+    requested = tuple(dict.fromkeys(["id"] + [field.strip() for field in fields.split(",") if field.strip()]))
+    unknown = [field for field in requested if field not in RESPONSE_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(RESPONSE_FIELDS)}"
+        )
+    return requested
+
+
+def profile_columns(fields: Optional[Tuple[str, ...]]) -> Tuple[str, ...]:
+    """Profile columns to load for a fieldset (all of them when fields is None)"""
+    if fields is None:
+        return PROFILE_FIELDS
+    return tuple(field for field in fields if field in PROFILE_FIELDS)
+
+
+def profile_to_dict(
+    profile: Profile,
+    role: str = "user",
+    email: Optional[str] = None,
+    fields: Optional[Tuple[str, ...]] = None
+) -> Dict[str, Any]:
+    """
+    Convert a Profile row to response data without touching SQLAlchemy internals
+
+    Args:
+        profile: Profile loaded from the database
+        role: Role to report for the user
+        email: Email override (e.g. the one from the JWT)
+        fields: Sparse fieldset from parse_fields; only these attributes are read,
+            so a profile loaded with load_only(profile_columns(fields)) is enough
+
+    Returns:
+        Dict: Column values plus user_id and role, ready for model_construct or orjson
+    """
+    if fields is not None:
+        return _trim(fields, {field: getattr(profile, field) for field in profile_columns(fields)}, role, email)
+    data = {field: getattr(profile, field) for field in PROFILE_FIELDS}
+    data["id"] = data["user_id"] = str(profile.id)
+    if email is not None:
+        data["email"] = email
+    data["role"] = role
+    return data
+
+
+def profile_row_to_dict(row: Mapping[str, Any], fields: Optional[Tuple[str, ...]] = None) -> Dict[str, Any]:
+    """
+    Convert a Core result row (profile columns plus a "role" column) to response data
+
+    Args:
+        row: Row mapping selected from profiles joined with the role expression
+        fields: Sparse fieldset from parse_fields; the row only needs those columns
+
+    Returns:
+        Dict: Column values plus user_id and role, ready for model_construct or orjson
+    """
+    if fields is not None:
+        return _trim(fields, {field: row[field] for field in profile_columns(fields)}, row.get("role"), None)
+    data = {field: row[field] for field in PROFILE_FIELDS}
+    data["id"] = data["user_id"] = str(row["id"])
+    data["role"] = row["role"]
+    return data
+
+
+def _trim(fields: Tuple[str, ...], data: Dict[str, Any], role: Optional[str], email: Optional[str]) -> Dict[str, Any]:
+    data["id"] = str(data["id"])
+    if "user_id" in fields:
+        data["user_id"] = data["id"]
+    if "role" in fields:
+        data["role"] = role
+    if email is not None and "email" in fields:
+        data["email"] = email
+    return data
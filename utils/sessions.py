@@ -0,0 +1,134 @@
+"""
+Request-scoped database sessions
+RoutingSession sends reads to the replica and writes to the primary, with
+read-your-writes carried across workers by ReadYourWritesMiddleware; get_db
+and get_read_db are the FastAPI dependencies that open these sessions
+"""
+import math
+import time
+from typing import Dict, Optional
+
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.selectable import GenerativeSelect
+
+from config import REPLICA_READ_YOUR_WRITES_SECONDS, get_async_engine, get_replica_engine, get_session_factory
+
+# user_id -> monotonic time until which that user's reads stay on the primary.
+# Per process: a client's next request may land on another worker, so the
+# window also travels with the client in READ_YOUR_WRITES_COOKIE.
+_recent_writers: Dict[str, float] = {}
+READ_YOUR_WRITES_COOKIE = "primary_reads_until"  # Wall-clock (epoch) time, set by ReadYourWritesMiddleware
+
+
+def _session_user_id(session: Session) -> Optional[str]:
+    request = session.info.get("request")
+    current_user = getattr(request.state, "current_user", None) if request is not None else None
+    if current_user is None:
+        return None
+    return current_user.user_id
+
+
+def _cookie_reads_until(request: Optional[Request]) -> float:
+    if request is None:
+        return 0
+    try:
+        until = float(request.cookies.get(READ_YOUR_WRITES_COOKIE, 0))
+    except ValueError:
+        return 0
+    # Capped at one window ahead. Forging it only moves the client's own reads to the primary
+    return min(until, time.time() + REPLICA_READ_YOUR_WRITES_SECONDS)
+
+
+def _is_write(clause) -> bool:
+    # Only a SELECT without FOR UPDATE is known to be read-only; text() and any
+    # other statement may write, so it goes to the primary
+    if isinstance(clause, GenerativeSelect):
+        return clause._for_update_arg is not None
+    return True
+
+
+class RoutingSession(Session):
+    """
+    Routes statements between the primary and the read replica
+    
+    Reads go to the replica only when the session opted in (see get_read_db).
+    Flushes, DML, text() statements and SELECT ... FOR UPDATE go to the primary
+    and pin the rest of the session there, as do reads from a user who wrote
+    within the last REPLICA_READ_YOUR_WRITES_SECONDS (read-your-writes): known
+    to this worker, or carried by the client's READ_YOUR_WRITES_COOKIE from a
+    write served by any worker. Clients that drop cookies only get
+    read-your-writes when they hit the same worker.
+    """
+    
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or (clause is not None and _is_write(clause)):
+            self.info["wrote"] = True
+        
+        if self.info.get("wrote") or self.info.get("primary") or not self.info.get("replica_reads"):
+            return get_async_engine().sync_engine
+        
+        user_id = _session_user_id(self)
+        if user_id is not None and _recent_writers.get(user_id, 0) > time.monotonic():
+            return get_async_engine().sync_engine
+        
+        if _cookie_reads_until(self.info.get("request")) > time.time():
+            return get_async_engine().sync_engine
+        
+        return get_replica_engine().sync_engine
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _remember_writer(session: Session) -> None:
+    if not session.info.get("wrote"):
+        return
+    request = session.info.get("request")
+    if request is not None:
+        # Picked up by ReadYourWritesMiddleware when the response starts
+        request.state.primary_reads_until = time.time() + REPLICA_READ_YOUR_WRITES_SECONDS
+    user_id = _session_user_id(session)
+    if user_id is None:
+        return
+    now = time.monotonic()
+    if len(_recent_writers) > 10000:
+        for stale in [uid for uid, until in _recent_writers.items() if until <= now]:
+            del _recent_writers[stale]
+    _recent_writers[user_id] = now + REPLICA_READ_YOUR_WRITES_SECONDS
+
+
+class ReadYourWritesMiddleware:
+    """ASGI middleware setting READ_YOUR_WRITES_COOKIE on responses to requests that wrote"""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        
+        state = scope.setdefault("state", {})  # Same dict as request.state
+        
+        async def send_with_cookie(message):
+            until = state.get("primary_reads_until")
+            if message["type"] == "http.response.start" and until is not None:
+                cookie = (
+                    f"{READ_YOUR_WRITES_COOKIE}={until:.3f}; Max-Age={math.ceil(REPLICA_READ_YOUR_WRITES_SECONDS)}; "
+                    "Path=/; HttpOnly; SameSite=Lax"
+                )
+                message = {**message, "headers": [*message.get("headers", []), (b"set-cookie", cookie.encode())]}
+            await send(message)
+        
+        await self.app(scope, receive, send_with_cookie)
+
+
+async def get_db(request: Request):
+    """Session on the primary, for endpoints that write"""
+    async with get_session_factory()(info={"request": request}) as session:
+        yield session
+
+
+async def get_read_db(request: Request):
+    """Session that reads from the replica (when configured) and writes to the primary"""
+    async with get_session_factory()(info={"request": request, "replica_reads": True}) as session:
+        yield session